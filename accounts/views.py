@@ -4,7 +4,8 @@ from django.contrib import messages
 from .forms import CitizenRegistrationForm, CustomLoginForm
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import ensure_csrf_cookie
-from core.models import AuditLog
+from core.utils.audit_writer import log_event
+from core.decorators import redirect_to_role_home
 
 @ensure_csrf_cookie
 def register_view(request):
@@ -14,13 +15,14 @@ def register_view(request):
             user = form.save()
             
             # Log Audit
-            AuditLog.objects.create(
+            log_event(
                 user=user,
                 action='REGISTER',
                 entity_type='User',
                 entity_id=user.id,
                 description=f"New citizen account created: {user.username}",
-                ip_address=request.META.get('REMOTE_ADDR', '0.0.0.0')
+                ip_address=request.META.get('REMOTE_ADDR', '0.0.0.0'),
+                user_agent=request.META.get('HTTP_USER_AGENT', '')
             )
             
             login(request, user)
@@ -51,28 +53,20 @@ def login_view(request):
                 request.session.set_expiry(0)  # Expire on browser close
             
             # Log Audit
-            AuditLog.objects.create(
+            log_event(
                 user=user,
                 action='LOGIN',
                 entity_type='User',
                 entity_id=user.id,
                 description=f"User logged in successfully",
-                ip_address=request.META.get('REMOTE_ADDR', '0.0.0.0')
+                ip_address=request.META.get('REMOTE_ADDR', '0.0.0.0'),
+                user_agent=request.META.get('HTTP_USER_AGENT', '')
             )
             
             messages.success(request, f"Welcome back, {user.first_name if user.first_name else user.username}!")
             
             # Role-based redirection (3-tier architecture routing)
-            if user.role == 'citizen':
-                return redirect('citizen:dashboard')
-            elif user.role == 'officer':
-                return redirect('officer:dashboard')
-            elif user.role == 'department_head':
-                return redirect('mis:dashboard')
-            elif user.role == 'admin':
-                return redirect('admin_panel:dashboard')
-            else:
-                return redirect('core:home')
+            return redirect_to_role_home(user)
         else:
             messages.error(request, "Invalid username or password.")
     
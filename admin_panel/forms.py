@@ -0,0 +1,44 @@
+from django import forms
+from core.models import AuditLog, User
+from core.utils.audit_archive import decode_cursor
+
+class AuditLogFilterForm(forms.Form):
+    """
+    Filters for the audit log explorer; every field may be blank. `cursor`
+    is the keyset position of the last row on the previous page.
+    """
+    username = forms.CharField(required=False, max_length=150)
+    # Free text: views also log actions outside ACTION_CHOICES (APP_TRACK, APP_REVIEW, ...)
+    action = forms.CharField(required=False, max_length=50)
+    entity_type = forms.CharField(required=False, max_length=50)
+    entity_id = forms.IntegerField(required=False)
+    ip_address = forms.GenericIPAddressField(required=False)
+    date_from = forms.DateTimeField(required=False)
+    date_to = forms.DateTimeField(required=False)
+    cursor = forms.CharField(required=False, widget=forms.HiddenInput)
+
+    action_choices = AuditLog.ACTION_CHOICES
+
+    def clean_cursor(self):
+        cursor = self.cleaned_data['cursor']
+        if not cursor:
+            return None
+        try:
+            return decode_cursor(cursor)
+        except ValueError:
+            raise forms.ValidationError("Invalid page cursor.")
+
+    def query(self):
+        """
+        Keyword arguments for audit_events(); None if no user matches the username.
+        """
+        data = self.cleaned_data
+        filters = {field: data[field] for field in ('action', 'entity_type', 'entity_id', 'ip_address')
+                   if data[field] not in (None, '')}
+        if data['username']:
+            user_id = User.objects.filter(username=data['username']).values_list('id', flat=True).first()
+            if user_id is None:
+                return None
+            filters['user_id'] = user_id
+        filters.update(start=data['date_from'], end=data['date_to'], before=data['cursor'])
+        return filters
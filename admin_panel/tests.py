@@ -1,3 +1,129 @@
+from datetime import timedelta
+from unittest import mock
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from core.models import User, Department, Service, Application, OfficerAssignment, AuditLog
+from core.utils.system_config import get_config
 
-# Create your tests here.
+
+class AssignBacklogViewTests(TestCase):
+    def setUp(self):
+        User.objects.create_user(username='panel_admin', password='TestPass@123', role='admin')
+        User.objects.create_user(username='panel_officer', password='TestPass@123', role='officer')
+        citizen = User.objects.create_user(username='panel_citizen', password='TestPass@123', role='citizen')
+        dept = Department.objects.create(department_name='Revenue', description='Revenue', contact_email='rev@example.com')
+        service = Service.objects.create(
+            service_name='Income Certificate', department=dept,
+            description='Income', required_documents='Aadhaar', processing_days=10
+        )
+        for _ in range(3):
+            Application.objects.create(user=citizen, service=service)
+        self.client.login(username='panel_admin', password='TestPass@123')
+
+    def test_admin_can_drain_backlog(self):
+        response = self.client.post(reverse('admin_panel:assign_backlog'))
+        self.assertRedirects(response, reverse('admin_panel:dashboard'), fetch_redirect_response=False)
+        self.assertEqual(OfficerAssignment.objects.count(), 3)
+
+
+class AuditLogExplorerTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='audit_admin', password='TestPass@123', role='admin')
+        self.citizen = User.objects.create_user(username='audit_citizen', password='TestPass@123', role='citizen')
+        now = timezone.now()
+        # Shared timestamps make the id tie-break part of the cursor matter
+        AuditLog.objects.bulk_create([
+            AuditLog(user=self.citizen if i % 2 else self.admin, action='APP_TRACK' if i % 3 else 'LOGIN',
+                     entity_type='Application', entity_id=i % 5, description=f'event {i}',
+                     ip_address='10.0.0.1' if i % 4 else '10.0.0.2', timestamp=now - timedelta(minutes=i // 2))
+            for i in range(120)
+        ])
+        self.client.login(username='audit_admin', password='TestPass@123')
+        # Load the cached configuration now so the first page isn't charged for it
+        get_config()
+
+    def _walk(self, **params):
+        seen, queries = [], []
+        url = reverse('admin_panel:audit_logs_api')
+        while True:
+            with CaptureQueriesContext(connection) as ctx:
+                data = self.client.get(url, params).json()
+            queries.append(len(ctx))
+            seen.extend(data['results'])
+            if not data['next_cursor']:
+                return seen, queries
+            params['cursor'] = data['next_cursor']
+
+    def test_pages_cover_every_event_once_in_order(self):
+        seen, queries = self._walk()
+        self.assertEqual(len(seen), 120)
+        self.assertEqual(len({row['id'] for row in seen}), 120)
+        keys = [(row['timestamp'], row['id']) for row in seen]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+        # A deep page costs the same as the first one
+        self.assertEqual(len(set(queries)), 1)
+
+    def test_filters_match_the_queryset(self):
+        seen, _ = self._walk(username='audit_citizen', action='APP_TRACK', ip_address='10.0.0.1')
+        expected = AuditLog.objects.filter(user=self.citizen, action='APP_TRACK', ip_address='10.0.0.1')
+        self.assertEqual({row['id'] for row in seen}, set(expected.values_list('id', flat=True)))
+
+        seen, _ = self._walk(entity_type='Application', entity_id=3)
+        self.assertEqual(len(seen), 24)
+        self.assertEqual(self._walk(username='nobody')[0], [])
+
+    def test_html_view_links_to_next_page(self):
+        response = self.client.get(reverse('admin_panel:audit_logs'), {'action': 'LOGIN'})
+        self.assertEqual(len(response.context['logs']), 40)
+        self.assertIsNone(response.context['next_query'])
+        response = self.client.get(reverse('admin_panel:audit_logs'))
+        self.assertIn('cursor=', response.context['next_query'])
+
+    def test_bad_cursor_is_rejected(self):
+        response = self.client.get(reverse('admin_panel:audit_logs_api'), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 400)
+
+
+class PerformancePageTests(TestCase):
+    def setUp(self):
+        from core.utils import perf
+        perf.reset()
+        self.addCleanup(perf.reset)
+        User.objects.create_user(username='perf_admin', password='TestPass@123', role='admin')
+        self.client.login(username='perf_admin', password='TestPass@123')
+
+    def test_requests_are_summarized_per_view(self):
+        for _ in range(3):
+            self.client.get(reverse('api:service_list'))
+        response = self.client.get(reverse('admin_panel:perf'))
+        rows = {row['view']: row for row in response.context['summaries']}
+        self.assertEqual(rows['api:service_list']['count'], 3)
+        self.assertEqual(rows['api:service_list']['budget'], 3)
+        self.assertGreater(rows['api:service_list']['bytes']['p50'], 0)
+        self.assertContains(response, 'api:service_list')
+
+        self.client.post(reverse('admin_panel:perf'))
+        self.assertEqual(self.client.get(reverse('admin_panel:perf')).context['summaries'][0]['view'], 'admin_panel:perf')
+
+    def test_workers_publish_their_own_samples(self):
+        from core.utils import perf
+        sample = {'queries': 1, 'sql_ms': 1.0, 'render_ms': 0.0, 'total_ms': 5.0, 'bytes': 100}
+        workers = []
+        for pid in (101, 102):
+            with mock.patch('core.utils.workers.os.getpid', return_value=pid):
+                worker = perf.SampleBuffer()
+                worker.add('api:service_list', sample)
+                worker.flush()
+            workers.append(worker)
+        # A later flush by one worker leaves the other's samples alone
+        with mock.patch('core.utils.workers.os.getpid', return_value=101):
+            workers[0].add('api:service_list', sample)
+            workers[0].flush()
+
+        rows = {row['view']: row for row in perf.view_summaries()}
+        self.assertEqual(rows['api:service_list']['count'], 3)
+        perf.reset()
+        self.assertEqual(perf.view_summaries(), [])
@@ -5,10 +5,13 @@ app_name = 'admin_panel'
 
 urlpatterns = [
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('assign-backlog/', views.assign_backlog, name='assign_backlog'),
     path('departments/', views.manage_departments, name='departments'),
     path('services/', views.manage_services, name='services'),
     path('audit-logs/', views.view_audit_logs, name='audit_logs'),
+    path('audit-logs/api/', views.audit_logs_api, name='audit_logs_api'),
     path('users/', views.manage_users, name='users'),
+    path('perf/', views.performance, name='perf'),
     path('announcements/', views.manage_announcements, name='announcements'),
     path('announcements/create/', views.create_announcement, name='create_announcement'),
 ]
@@ -2,38 +2,32 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from core.models import Department, Service, User, Application
 from django.contrib import messages
+from django.http import JsonResponse
 
-from functools import wraps
+from core.decorators import role_required
 
-def admin_only(view_func):
-    @wraps(view_func)
-    def wrapper(request, *args, **kwargs):
-        if request.user.is_authenticated and request.user.role == 'admin':
-            return view_func(request, *args, **kwargs)
-        messages.error(request, "Access denied.")
-        return redirect('core:home')
-    return wrapper
+admin_only = role_required(['admin'], denied_message="Access denied.")
 
 @login_required
 @admin_only
 def dashboard(request):
-    from core.models import SystemConfiguration, AuditLog, GrievanceTicket
-    from django.db.models import Count, Avg, F
+    from core.models import AuditLog, GrievanceTicket
+    from django.db.models import Count, Avg, F, Q
+    from core.utils import application_stats, health
+    from core.utils.system_config import get_config
     from django.utils import timezone
     from datetime import timedelta
 
-    # Ensure config exists with fallback
-    try:
-        config = SystemConfiguration.objects.first()
-        if not config:
-            config = SystemConfiguration.objects.create(id=1)
-    except:
-        config = SystemConfiguration.objects.create(id=1)
+    # Cached singleton; created on first use
+    config = get_config()
     
     dept_count = Department.objects.count()
     service_count = Service.objects.count()
     user_count = User.objects.count()
-    total_apps = Application.objects.count()
+    app_stats = application_stats.summarize(extra={
+        'last_day': Q(applied_date__gte=timezone.now() - timedelta(days=1))
+    })
+    total_apps = app_stats['total']
     unassigned_apps = Application.objects.filter(officer_assignments__isnull=True).count()
     
     # User Management & Access Metrics
@@ -43,19 +37,17 @@ def dashboard(request):
     
     # Application & Performance Metrics
     recent_apps = Application.objects.select_related('user', 'service').order_by('-applied_date')[:5]
-    approved_apps = Application.objects.filter(status='approved').count()
-    rejected_apps = Application.objects.filter(status='rejected').count()
-    app_surge = Application.objects.filter(applied_date__gte=timezone.now() - timedelta(days=1)).count() > 50
+    approved_apps = app_stats['approved']
+    rejected_apps = app_stats['rejected']
+    app_surge = app_stats['last_day'] > 50
     
     # Audit & Security Metrics (Fix: description check can be case-sensitive depending on DB)
     failed_logins = AuditLog.objects.filter(action='LOGIN', description__icontains='fail').count()
     recent_logs = AuditLog.objects.order_by('-timestamp')[:10]
     
-    # System Health (Mock / Simple checks)
-    health_status = {
-        'cpu': 15, 'memory': 32, 'uptime': '99.99%', 'api_latency': '45ms',
-        'database': 'Healthy', 'storage': '14%'
-    }
+    # System Health, merged across workers
+    health_status = health.snapshot()
+    health_status['uptime'] = health.humanize_duration(health_status['uptime_seconds'])
     
     # Service Analytics
     top_services = Service.objects.annotate(num_apps=Count('application')).order_by('-num_apps')[:3]
@@ -95,6 +87,19 @@ def dashboard(request):
     }
     return render(request, 'admin_panel/dashboard.html', context)
 
+@login_required
+@admin_only
+def assign_backlog(request):
+    from core.utils.intelligent_routing import assign_backlog as drain_backlog
+    
+    if request.method == 'POST':
+        assigned = drain_backlog()
+        if assigned:
+            messages.success(request, f"{assigned} unassigned applications routed to officers.")
+        else:
+            messages.info(request, "No unassigned applications could be routed.")
+    return redirect('admin_panel:dashboard')
+
 @login_required
 @admin_only
 def manage_departments(request):
@@ -107,12 +112,59 @@ def manage_services(request):
     services = Service.objects.all()
     return render(request, 'admin_panel/services.html', {'services': services})
 
+AUDIT_PAGE_SIZE = 50
+
+def _audit_log_page(request):
+    """
+    One keyset page of the audit explorer: the filter form, up to
+    AUDIT_PAGE_SIZE events and the cursor for the next page (or None).
+    """
+    from .forms import AuditLogFilterForm
+    from core.utils.audit_archive import audit_events, encode_cursor
+
+    form = AuditLogFilterForm(request.GET or None)
+    logs, next_cursor = [], None
+    if not form.is_bound or form.is_valid():
+        query = form.query() if form.is_bound else {}
+        if query is not None:
+            logs = audit_events(limit=AUDIT_PAGE_SIZE + 1, **query)
+            if len(logs) > AUDIT_PAGE_SIZE:
+                logs = logs[:AUDIT_PAGE_SIZE]
+                next_cursor = encode_cursor(logs[-1])
+    params = request.GET.copy()
+    params.pop('cursor', None)
+    first_query = params.urlencode() if 'cursor' in request.GET else None
+    next_query = None
+    if next_cursor:
+        params['cursor'] = next_cursor
+        next_query = params.urlencode()
+    return {'form': form, 'logs': logs, 'next_cursor': next_cursor,
+            'first_query': first_query, 'next_query': next_query}
+
 @login_required
 @admin_only
 def view_audit_logs(request):
-    from core.models import AuditLog
-    logs = AuditLog.objects.all().order_by('-timestamp')[:100]
-    return render(request, 'admin_panel/audit_logs.html', {'logs': logs})
+    return render(request, 'admin_panel/audit_logs.html', _audit_log_page(request))
+
+@login_required
+@admin_only
+def audit_logs_api(request):
+    page = _audit_log_page(request)
+    if page['form'].errors:
+        return JsonResponse({'errors': page['form'].errors}, status=400)
+    return JsonResponse({
+        'results': [{
+            'id': log.id,
+            'timestamp': log.timestamp.isoformat(),
+            'user': log.user.username if log.user else None,
+            'action': log.action,
+            'entity_type': log.entity_type,
+            'entity_id': log.entity_id,
+            'description': log.description,
+            'ip_address': log.ip_address,
+        } for log in page['logs']],
+        'next_cursor': page['next_cursor'],
+    })
 
 @login_required
 @admin_only
@@ -158,3 +210,17 @@ def create_announcement(request):
         return redirect('admin_panel:announcements')
         
     return render(request, 'admin_panel/announcement_form.html')
+
+@login_required
+@admin_only
+def performance(request):
+    from core.utils import perf
+
+    if request.method == 'POST':
+        perf.reset()
+        messages.success(request, "Performance samples cleared.")
+        return redirect('admin_panel:perf')
+    return render(request, 'admin_panel/perf.html', {
+        'summaries': perf.view_summaries(),
+        'samples_per_view': perf.SAMPLES_PER_VIEW,
+    })
@@ -1,3 +1,32 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from core.models import User, Department, Service, Application
+from core.utils import system_config
+from core.utils.perf import QueryBudgetExceeded
 
-# Create your tests here.
+
+class DepartmentStatsApiTests(TestCase):
+    def setUp(self):
+        citizen = User.objects.create_user(username='api_citizen', password='TestPass@123', role='citizen')
+        for i in range(6):
+            dept = Department.objects.create(department_name=f'Dept {i}', description='x', contact_email=f'd{i}@example.com')
+            for j in range(2):
+                service = Service.objects.create(service_name=f'Service {i}-{j}', department=dept, description='x',
+                                                 required_documents='Aadhaar', processing_days=5)
+                for _ in range(i):
+                    Application.objects.create(user=citizen, service=service)
+        # Load the configuration row up front so it isn't counted against the view
+        system_config.get_config()
+
+    def test_counts_in_one_query(self):
+        # The middleware enforces the 'api:dept_stats' budget under tests
+        with self.assertNumQueries(1):
+            data = self.client.get(reverse('api:dept_stats')).json()['departments']
+        by_name = {d['name']: d for d in data}
+        self.assertEqual(by_name['Dept 3'], {'name': 'Dept 3', 'services_count': 2, 'total_applications': 6})
+        self.assertEqual(by_name['Dept 0']['total_applications'], 0)
+
+    @override_settings(QUERY_BUDGETS={'api:service_list': 0})
+    def test_over_budget_view_fails_in_tests(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('api:service_list'))
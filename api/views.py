@@ -1,9 +1,11 @@
 from django.http import JsonResponse
+from django.db.models import Count
 from core.models import Service, Application, Department
 from django.views.decorators.csrf import csrf_exempt
+from core.utils.application_lookup import find_application
 
 def service_list_api(request):
-    services = Service.objects.filter(is_active=True)
+    services = Service.objects.filter(is_active=True).select_related('department')
     data = []
     for s in services:
         data.append({
@@ -16,8 +18,8 @@ def service_list_api(request):
     return JsonResponse({'services': data})
 
 def application_status_api(request, app_no):
-    try:
-        app = Application.objects.get(application_number=app_no)
+    app, _ = find_application(app_no, by_id=False, queryset=Application.objects.select_related('service'))
+    if app:
         return JsonResponse({
             'application_number': app.application_number,
             'status': app.status,
@@ -25,16 +27,19 @@ def application_status_api(request, app_no):
             'service': app.service.service_name,
             'priority': app.priority
         })
-    except Application.DoesNotExist:
-        return JsonResponse({'error': 'Application not found'}, status=404)
+    return JsonResponse({'error': 'Application not found'}, status=404)
 
 def department_stats_api(request):
-    depts = Department.objects.all()
+    # One query for every department instead of two per department
+    depts = Department.objects.annotate(
+        services_count=Count('services', distinct=True),
+        total_applications=Count('services__application'),
+    )
     data = []
     for d in depts:
         data.append({
             'name': d.department_name,
-            'services_count': d.services.count(),
-            'total_applications': Application.objects.filter(service__department=d).count()
+            'services_count': d.services_count,
+            'total_applications': d.total_applications
         })
     return JsonResponse({'departments': data})
@@ -1,3 +1,72 @@
+from unittest import mock, skipUnless
+from django.db import connection
 from django.test import TestCase
+from django.urls import reverse
+from core.models import User, Department, Service, Application, AuditLog
+from core.utils.audit_timeline import application_timeline, application_timeline_page
+from core.utils.audit_writer import log_event
 
-# Create your tests here.
+
+class ApplicationTimelineTests(TestCase):
+    def setUp(self):
+        self.citizen = User.objects.create_user(username='timeline_citizen', password='TestPass@123', role='citizen')
+        officer = User.objects.create_user(username='timeline_officer', password='TestPass@123', role='officer')
+        dept = Department.objects.create(department_name='Revenue', description='Revenue', contact_email='rev@example.com')
+        service = Service.objects.create(
+            service_name='Income Certificate', department=dept,
+            description='Income', required_documents='Aadhaar', processing_days=10
+        )
+        self.application = Application.objects.create(user=self.citizen, service=service)
+        other = Application.objects.create(user=self.citizen, service=service)
+        for user, action, app in ((self.citizen, 'APP_SUBMIT', self.application),
+                                  (self.citizen, 'APP_TRACK', self.application),
+                                  (officer, 'APP_APPROVE', self.application),
+                                  (self.citizen, 'APP_SUBMIT', other)):
+            log_event(action, 'Application', f'{action} note', user=user, entity_id=app.id)
+
+    def test_officer_timeline_has_every_event(self):
+        events = application_timeline(self.application)
+        self.assertEqual([e.label for e in events], ['Approved', 'Status checked', 'Application submitted'])
+        self.assertEqual(events[0].user.username, 'timeline_officer')
+
+    def test_citizen_sees_their_timeline(self):
+        self.client.login(username='timeline_citizen', password='TestPass@123')
+        response = self.client.get(reverse('citizen:detail', args=[self.application.id]))
+        self.assertEqual([e.label for e in response.context['timeline']], ['Approved', 'Application submitted'])
+        self.assertContains(response, 'Application History')
+        self.assertNotContains(response, 'APP_APPROVE note')
+
+    @skipUnless(connection.vendor == 'sqlite', 'Small-table plans are only stable on SQLite')
+    def test_timeline_uses_entity_index(self):
+        plan = AuditLog.objects.filter(
+            entity_type='Application', entity_id=self.application.id, timestamp__gte=self.application.applied_date
+        ).order_by('-timestamp', '-id').explain()
+        self.assertIn('auditlog_entity_ts_idx', plan)
+
+    @mock.patch('core.utils.audit_timeline.TIMELINE_PAGE_SIZE', 2)
+    def test_older_history_loads_on_demand(self):
+        for action in ('DOC_UPLOAD', 'APP_TRACK', 'APP_TRACK'):
+            log_event(action, 'Application', f'{action} note', user=self.citizen, entity_id=self.application.id)
+        pages, older = [], None
+        while True:
+            events, older = application_timeline_page(self.application, cursor=older)
+            pages.append([e.label for e in events])
+            if older is None:
+                break
+        self.assertEqual(pages, [['Status checked', 'Status checked'], ['Document uploaded', 'Approved'],
+                                 ['Status checked', 'Application submitted']])
+        # Status checks are skipped before paging, so citizen pages stay full
+        events, older = application_timeline_page(self.application, for_citizen=True)
+        self.assertEqual([e.label for e in events], ['Document uploaded', 'Approved'])
+        events, older = application_timeline_page(self.application, for_citizen=True, cursor=older)
+        self.assertEqual([e.label for e in events], ['Application submitted'])
+        self.assertIsNone(older)
+
+        self.client.login(username='timeline_citizen', password='TestPass@123')
+        url = reverse('citizen:detail', args=[self.application.id])
+        response = self.client.get(url)
+        self.assertEqual([e.label for e in response.context['timeline']], ['Document uploaded', 'Approved'])
+        self.assertContains(response, 'Older activity')
+        response = self.client.get(url, {'history': response.context['older_history']})
+        self.assertEqual([e.label for e in response.context['timeline']], ['Application submitted'])
+        self.assertEqual(self.client.get(url, {'history': 'not-a-cursor'}).status_code, 400)
@@ -1,3 +1,4 @@
+from django.http import HttpResponseBadRequest
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
@@ -5,7 +6,11 @@ from core.models import Application, Service, GrievanceTicket, Document, Officer
 from .forms import ServiceApplicationForm, DocumentUploadForm, GrievanceForm
 from django.db import transaction, models
 from django.utils import timezone
+from core.utils import sla
 from core.utils.intelligent_routing import auto_assign_officer
+from core.utils.application_lookup import find_application
+from core.utils.audit_writer import log_event
+from core.utils.audit_timeline import application_timeline_page
 from core.decorators import role_required
 
 @login_required
@@ -37,50 +42,29 @@ def dashboard(request):
     
     # 1. Fetch Applications (Independent Block)
     try:
-        applications_qs = Application.objects.filter(user=request.user).select_related('service__department').order_by('-applied_date')
+        now = timezone.now()
+        applications_qs = sla.annotate_sla(
+            Application.objects.filter(user=request.user).select_related('service__department'), now
+        ).order_by('-applied_date')
         applications = list(applications_qs)
         context['applications'] = applications
         
-        # Process SLA & Stats
-        now = timezone.now()
+        # Process SLA & Stats (SLA bucket comes from the query)
         in_progress = 0
         approved = 0
         rejected = 0
         delayed = 0
         
         for app in applications:
-            try:
-                # Set default status tracking
-                if app.status == 'under_review': in_progress += 1
-                elif app.status == 'approved': approved += 1
-                elif app.status == 'rejected': rejected += 1
-                
-                # SLA Logic
-                if app.status in ['approved', 'rejected']:
-                    app.sla_status = 'completed'
-                    app.days_left = 0
-                else:
-                    deadline = app.sla_deadline
-                    if deadline:
-                        if timezone.is_naive(deadline):
-                            deadline = timezone.make_aware(deadline)
-                        
-                        time_diff = deadline - now
-                        app.days_left = time_diff.days
-                        
-                        if time_diff.total_seconds() < 0:
-                            app.sla_status = 'delayed'
-                            delayed += 1
-                        elif time_diff.days <= 2:
-                            app.sla_status = 'near_deadline'
-                        else:
-                            app.sla_status = 'on_time'
-                    else:
-                        app.sla_status = 'unknown'
-                        app.days_left = 0
-            except Exception as e:
-                logger.warning(f"SLA calc error for {app.id}: {str(e)}")
-                app.sla_status = 'unknown'
+            # Set default status tracking
+            if app.status == 'under_review': in_progress += 1
+            elif app.status == 'approved': approved += 1
+            elif app.status == 'rejected': rejected += 1
+            
+            if sla.describe(app, now, rank=app.sla_rank) == 'delayed':
+                delayed += 1
+            elif app.sla_status == 'completed':
+                app.days_left = 0
                 
         context['stats'] = {
             'total': len(applications),
@@ -210,8 +194,7 @@ def apply_service(request, service_id):
                 auto_assign_officer(application)
                 
                 # Audit Log
-                from core.models import AuditLog
-                AuditLog.objects.create(
+                log_event(
                     user=request.user,
                     action='APP_SUBMIT',
                     entity_type='Application',
@@ -240,26 +223,19 @@ def public_track(request):
     application = None
     
     if app_number:
-        # Normalize the input
-        app_number_clean = app_number.upper()
-        
-        # 1. Try exact match on application_number
-        application = Application.objects.filter(application_number__iexact=app_number_clean).first()
-        
-        # 2. Try partial match if exact doesn't work
-        if not application:
-            application = Application.objects.filter(application_number__icontains=app_number_clean).first()
-            
-        # 3. Try integer ID if input is numeric
-        if not application and app_number.isdigit():
-            application = Application.objects.filter(id=int(app_number)).first()
+        # Exact number, numeric ID, unique prefix, then a unique one-typo match
+        application, match = find_application(
+            app_number, partial=True,
+            queryset=Application.objects.select_related('service__department')
+        )
         
         if not application:
             messages.warning(request, f"Record '{app_number}' not found. Please check the ID and try again.")
         else:
+            if match in ('prefix', 'fuzzy'):
+                messages.info(request, f"Showing the closest match for '{app_number}': {application.application_number}.")
             # Audit the search
-            from core.models import AuditLog
-            AuditLog.objects.create(
+            log_event(
                 user=request.user,
                 action='APP_TRACK',
                 entity_type='Application',
@@ -286,20 +262,21 @@ def application_detail(request, app_id):
     
     # Calculate SLA status
     days_left = (application.sla_deadline - timezone.now()).days
-    if application.status in ['approved', 'rejected']:
-        sla_status = 'completed'
-    elif days_left < 0:
-        sla_status = 'overdue'
-    elif days_left <= 2:
-        sla_status = 'near_deadline'
-    else:
-        sla_status = 'on_time'
+    sla_status = sla.classify(application)
+    try:
+        timeline, older_history = application_timeline_page(
+            application, for_citizen=True, cursor=request.GET.get('history')
+        )
+    except ValueError:
+        return HttpResponseBadRequest("Invalid history cursor.")
         
     return render(request, 'citizen/track.html', {
         'app': application,
         'documents': documents,
         'days_left': days_left,
-        'sla_status': sla_status
+        'sla_status': sla_status,
+        'timeline': timeline,
+        'older_history': older_history,
     })
 
 @login_required
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import User, Department, Service, Application, Document, OfficerAssignment, CitizenDocumentLocker, GrievanceTicket, Feedback, AuditLog, ContactMessage
+from .models import User, Department, Service, Application, Document, OfficerAssignment, OfficerWorkload, CitizenDocumentLocker, GrievanceTicket, Feedback, AuditLog, AuditArchive, ContactMessage, DepartmentCalendar, Holiday
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
@@ -27,6 +27,27 @@ class ContactMessageAdmin(admin.ModelAdmin):
     list_filter = ('is_resolved', 'created_at', 'department')
     search_fields = ('name', 'email', 'subject')
 
+@admin.register(OfficerWorkload)
+class OfficerWorkloadAdmin(admin.ModelAdmin):
+    list_display = ('officer', 'department', 'open_assignments', 'total_assignments')
+    list_filter = ('department',)
+
+@admin.register(DepartmentCalendar)
+class DepartmentCalendarAdmin(admin.ModelAdmin):
+    list_display = ('department', 'working_days', 'closing_time')
+
+@admin.register(Holiday)
+class HolidayAdmin(admin.ModelAdmin):
+    list_display = ('date', 'name', 'department')
+    list_filter = ('department',)
+    date_hierarchy = 'date'
+
+@admin.register(AuditArchive)
+class AuditArchiveAdmin(admin.ModelAdmin):
+    list_display = ('month', 'row_count', 'file_name', 'created_at')
+    readonly_fields = ('month', 'file_name', 'row_count', 'first_timestamp', 'last_timestamp',
+                       'prev_hash', 'head_hash', 'file_sha256', 'created_at')
+
 admin.site.register(Document)
 admin.site.register(OfficerAssignment)
 admin.site.register(CitizenDocumentLocker)
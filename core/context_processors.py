@@ -1,17 +1,32 @@
-from .models import Notification
+from django.utils.functional import SimpleLazyObject
+from .utils import notification_cache, system_config as system_config_cache
 
 def notifications(request):
-    try:
-        if request.user.is_authenticated:
-            notifs = Notification.objects.filter(user=request.user, is_read=False).order_by('-created_at')[:5]
-            count = Notification.objects.filter(user=request.user, is_read=False).count()
-            return {
-                'user_notifications': notifs,
-                'unread_notification_count': count
-            }
-    except Exception:
-        pass
+    """
+    Exposes the user's unread notifications lazily: nothing is read from the
+    cache (or database) unless a template actually uses these variables.
+    """
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {
+            'user_notifications': [],
+            'unread_notification_count': 0
+        }
+
+    def summary(field):
+        try:
+            return notification_cache.get_summary(user.pk)[field]
+        except Exception:
+            return [] if field == 'recent' else 0
+
     return {
-        'user_notifications': [],
-        'unread_notification_count': 0
+        'user_notifications': SimpleLazyObject(lambda: summary('recent')),
+        'unread_notification_count': SimpleLazyObject(lambda: summary('count'))
     }
+
+def system_config(request):
+    """
+    The cached SystemConfiguration as `system_config` (see SystemConfigMiddleware).
+    """
+    config = getattr(request, 'system_config', None)
+    return {'system_config': config if config is not None else SimpleLazyObject(system_config_cache.get_config)}
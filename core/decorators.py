@@ -2,32 +2,66 @@ from django.shortcuts import redirect
 from django.contrib import messages
 from functools import wraps
 
-def role_required(allowed_roles):
+# Where each role lands after login or when it opens a page it may not use
+ROLE_HOME = {
+    'citizen': 'citizen:dashboard',
+    'officer': 'officer:dashboard',
+    'department_head': 'mis:dashboard',
+    'admin': 'admin_panel:dashboard',
+}
+DEFAULT_HOME = 'core:home'
+
+
+def role_home(user):
+    return ROLE_HOME.get(getattr(user, 'role', None), DEFAULT_HOME)
+
+
+def redirect_to_role_home(user):
+    return redirect(role_home(user))
+
+
+def headed_department_ids(user):
+    """
+    IDs of the departments `user` heads, queried at most once per request
+    (request.user is one object for the whole request, so it carries the memo).
+    """
+    ids = getattr(user, '_headed_department_ids', None)
+    if ids is None:
+        ids = frozenset(user.headed_departments.values_list('id', flat=True)) if user.is_authenticated else frozenset()
+        user._headed_department_ids = ids
+    return ids
+
+
+def can_manage_department(user, department_id):
+    """
+    Admins manage every department; department heads only the ones they head.
+    """
+    if getattr(user, 'role', None) == 'admin':
+        return True
+    return department_id is not None and department_id in headed_department_ids(user)
+
+
+def role_required(allowed_roles, denied_message=None):
     """
     Decorator to restrict access based on user roles.
     Usage: @role_required(['citizen', 'admin'])
     """
+    allowed = frozenset(allowed_roles)
+    if denied_message is None:
+        denied_message = f"Access denied. This page is restricted to {', '.join(allowed_roles)} only."
+
     def decorator(view_func):
         @wraps(view_func)
         def _wrapped_view(request, *args, **kwargs):
             if not request.user.is_authenticated:
                 messages.error(request, "Please login to access this page.")
                 return redirect('accounts:login')
-            
-            if request.user.role not in allowed_roles:
-                messages.error(request, f"Access denied. This page is restricted to {', '.join(allowed_roles)} only.")
+
+            if request.user.role not in allowed:
+                messages.error(request, denied_message)
                 # Redirect to appropriate dashboard based on role
-                if request.user.role == 'citizen':
-                    return redirect('citizen:dashboard')
-                elif request.user.role == 'officer':
-                    return redirect('officer:dashboard')
-                elif request.user.role == 'department_head':
-                    return redirect('mis:dashboard')
-                elif request.user.role == 'admin':
-                    return redirect('admin_panel:dashboard')
-                else:
-                    return redirect('core:home')
-            
+                return redirect_to_role_home(request.user)
+
             return view_func(request, *args, **kwargs)
         return _wrapped_view
     return decorator
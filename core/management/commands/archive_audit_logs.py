@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.utils.audit_archive import archive_cold_months, cold_months, verify_archives
+
+class Command(BaseCommand):
+    help = 'Moves audit log months older than the hot window into compressed, hash-chained archive files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hot-months', type=int, default=settings.AUDIT_HOT_MONTHS,
+                            help='Whole months (before the current one) kept in the AuditLog table')
+        parser.add_argument('--dry-run', action='store_true', help='Only list the months that would be archived')
+        parser.add_argument('--verify', action='store_true', help='Verify every archive file and the hash chain instead')
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            problems = verify_archives()
+            for problem in problems:
+                self.stderr.write(problem)
+            if problems:
+                raise CommandError(f'{len(problems)} audit archive problems found.')
+            self.stdout.write(self.style.SUCCESS('All audit archives verified.'))
+            return
+
+        if options['dry_run']:
+            months = cold_months(options['hot_months'])
+            self.stdout.write(', '.join(f'{m:%Y-%m}' for m in months) or 'Nothing to archive.')
+            return
+
+        for archive in archive_cold_months(options['hot_months']):
+            self.stdout.write(f'{archive.month:%Y-%m}: {archive.row_count} events -> {archive.file_name}')
+        self.stdout.write(self.style.SUCCESS('Audit log archival complete.'))
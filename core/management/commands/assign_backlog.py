@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from core.utils.intelligent_routing import assign_backlog
+
+class Command(BaseCommand):
+    help = 'Assigns every open application without an officer, in batches, using intelligent routing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Applications assigned per transaction')
+        parser.add_argument('--limit', type=int, default=None, help='Stop after assigning this many applications')
+
+    def handle(self, *args, **options):
+        assigned = assign_backlog(batch_size=options['batch_size'], limit=options['limit'])
+        self.stdout.write(self.style.SUCCESS(f'{assigned} applications assigned to officers.'))
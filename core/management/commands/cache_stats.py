@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.utils.caching import cache_metrics, reset_metrics
+
+class Command(BaseCommand):
+    help = 'Shows cache hit/miss counts per namespace, summed over all worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the counters after printing them')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Backend: {settings.CACHES["default"]["BACKEND"]} ({settings.CACHES["default"]["LOCATION"]})')
+        for namespace, counts in cache_metrics().items():
+            ratio = f"{counts['hit_ratio']:.1%}" if counts['hit_ratio'] is not None else 'n/a'
+            self.stdout.write(f"{namespace:<10} hits={counts['hits']:<10} misses={counts['misses']:<10} hit ratio={ratio}")
+        if options['reset']:
+            reset_metrics()
+            self.stdout.write(self.style.SUCCESS('Cache metrics reset.'))
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.utils.audit_writer import replay_spool
+
+class Command(BaseCommand):
+    help = 'Writes audit events left in the spool directory by stopped or crashed workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=float, default=30,
+                            help='Only replay segments untouched for this many seconds (protects live workers)')
+
+    def handle(self, *args, **options):
+        replayed = replay_spool(settings.AUDIT_LOG_SPOOL_DIR, options['older_than'])
+        self.stdout.write(self.style.SUCCESS(f'{replayed} spooled audit events written.'))
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from core.utils.mis_rollup import rebuild_rollups
+
+class Command(BaseCommand):
+    help = 'Rebuilds the pre-aggregated MIS application statistics from the Application table'
+
+    def handle(self, *args, **kwargs):
+        rows = rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(f'MIS rollups rebuilt: {rows} rows written.'))
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from core.utils.intelligent_routing import rebuild_workloads
+
+class Command(BaseCommand):
+    help = 'Recomputes the open workload counter used by intelligent routing for every officer'
+
+    def handle(self, *args, **kwargs):
+        officers = rebuild_workloads()
+        self.stdout.write(self.style.SUCCESS(f'Workloads rebuilt for {officers} officers.'))
@@ -0,0 +1,31 @@
+import time
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from core.utils.sla_calendar import recompute_deadlines
+
+class Command(BaseCommand):
+    help = 'Recomputes sla_deadline and sla_near_at of open applications on the current working-day calendars (run after adding or removing holidays)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--department', type=int, help='Only applications of this department ID')
+        parser.add_argument('--due-from', help='Only applications currently due on or after this date (YYYY-MM-DD), e.g. the new holiday')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--dry-run', action='store_true', help='Count the deadlines that would change without writing them')
+
+    def handle(self, *args, **options):
+        due_from = None
+        if options['due_from']:
+            try:
+                due_from = date.fromisoformat(options['due_from'])
+            except ValueError:
+                raise CommandError('--due-from must be a YYYY-MM-DD date.')
+
+        start = time.perf_counter()
+        scanned, changed = recompute_deadlines(
+            department_id=options['department'], due_from=due_from,
+            batch_size=options['batch_size'], dry_run=options['dry_run'],
+        )
+        verb = 'would change' if options['dry_run'] else 'changed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{scanned} open applications scanned, {changed} deadlines {verb} in {time.perf_counter() - start:.1f}s.'
+        ))
@@ -0,0 +1,28 @@
+import time
+from django.core.management.base import BaseCommand
+from core.utils.sla_scanner import scan
+
+class Command(BaseCommand):
+    help = 'Notifies officers, department heads and citizens of SLA deadlines approached or breached since the last scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep scanning every --interval seconds instead of exiting (for use without cron)')
+        parser.add_argument('--interval', type=float, default=300, help='Seconds between scans with --loop')
+
+    def report(self, result):
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['near_deadline']} near deadline, {result['breached']} breached; "
+            f"{result['notifications']} notifications sent, {result['escalated']} grievances escalated."
+        ))
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            self.report(scan())
+            return
+        self.stdout.write('SLA scanner started. Press Ctrl+C to stop.')
+        try:
+            while True:
+                self.report(scan())
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            return
@@ -0,0 +1,182 @@
+import time
+from django.conf import settings
+from django.core import signing
+from django.db import DatabaseError, connection
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from django.utils.html import escape
+from .utils import health, perf, system_config
+
+MAINTENANCE_BYPASS_COOKIE = 'maintenance_bypass'
+MAINTENANCE_BYPASS_SALT = 'core.maintenance.bypass'
+MAINTENANCE_BYPASS_MAX_AGE = 12 * 60 * 60
+DEFAULT_RETRY_AFTER = 600
+
+MAINTENANCE_PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Scheduled Maintenance | {portal}</title>
+<style>
+body {{ margin: 0; min-height: 100vh; display: flex; align-items: center; justify-content: center;
+       font-family: system-ui, -apple-system, "Segoe UI", Roboto, sans-serif; background: #f8fafc; color: #1e293b; }}
+main {{ max-width: 480px; padding: 48px 32px; text-align: center; background: #fff; border-radius: 24px;
+       box-shadow: 0 10px 40px rgba(15, 23, 42, .08); }}
+h1 {{ font-size: 1.5rem; margin: 0 0 12px; }}
+p {{ color: #64748b; line-height: 1.6; margin: 0; }}
+</style>
+</head>
+<body>
+<main>
+<h1>{portal} is under scheduled maintenance</h1>
+<p>We are upgrading our systems to serve you better. {until}</p>
+</main>
+</body>
+</html>
+"""
+
+
+class SystemConfigMiddleware:
+    """
+    Attaches the cached SystemConfiguration to every request as
+    `request.system_config`; it is only resolved when something reads it.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.system_config = SimpleLazyObject(system_config.get_config)
+        return self.get_response(request)
+
+
+class MaintenanceModeMiddleware:
+    """
+    While SystemConfiguration.maintenance_mode is on (and maintenance_end_time,
+    if set, is still ahead) every request outside MAINTENANCE_EXEMPT_PATHS gets
+    a pre-rendered 503 page. It runs before the session and auth middleware:
+    the decision costs no database query, session load or template render.
+
+    Admins keep working through a signed bypass cookie, issued when an admin
+    requests an exempt path (e.g. /admin-panel/) during maintenance.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.exempt_paths = tuple(getattr(settings, 'MAINTENANCE_EXEMPT_PATHS', ()))
+        self._pages = {}
+
+    def __call__(self, request):
+        try:
+            config = system_config.get_config()
+        except DatabaseError:
+            # No configuration table yet (fresh install, mid-migration): serve normally
+            return self.get_response(request)
+        if not self._active(config):
+            return self.get_response(request)
+
+        if request.path.startswith(self.exempt_paths):
+            response = self.get_response(request)
+            self._issue_bypass(request, response)
+            return response
+        if self._has_bypass(request):
+            return self.get_response(request)
+        return self._maintenance_response(config)
+
+    @staticmethod
+    def _active(config):
+        if not config.maintenance_mode:
+            return False
+        return config.maintenance_end_time is None or config.maintenance_end_time > timezone.now()
+
+    @staticmethod
+    def _has_bypass(request):
+        token = request.COOKIES.get(MAINTENANCE_BYPASS_COOKIE)
+        if not token:
+            return False
+        try:
+            signing.loads(token, salt=MAINTENANCE_BYPASS_SALT, max_age=MAINTENANCE_BYPASS_MAX_AGE)
+        except signing.BadSignature:
+            return False
+        return True
+
+    @staticmethod
+    def _issue_bypass(request, response):
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            return
+        if user.is_superuser or getattr(user, 'role', None) == 'admin':
+            response.set_cookie(
+                MAINTENANCE_BYPASS_COOKIE,
+                signing.dumps(user.pk, salt=MAINTENANCE_BYPASS_SALT),
+                max_age=MAINTENANCE_BYPASS_MAX_AGE,
+                httponly=True,
+                secure=request.is_secure(),
+                samesite='Lax',
+            )
+
+    def _maintenance_response(self, config):
+        end = config.maintenance_end_time
+        key = (config.portal_name, end)
+        if key not in self._pages:
+            until = f"Expected back by {timezone.localtime(end):%d %b %Y, %I:%M %p}." if end else "Please check back shortly."
+            self._pages = {key: MAINTENANCE_PAGE.format(portal=escape(config.portal_name), until=until).encode('utf-8')}
+        retry_after = DEFAULT_RETRY_AFTER
+        if end:
+            retry_after = max(1, int((end - timezone.now()).total_seconds()))
+        response = HttpResponse(self._pages[key], status=503, content_type='text/html; charset=utf-8')
+        response['Retry-After'] = str(retry_after)
+        response['Cache-Control'] = 'no-store'
+        return response
+
+
+# Load balancer probes would otherwise dominate the latency histograms
+HEALTH_EXCLUDED_VIEWS = {'core:health_check'}
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Records SQL query count, SQL time, template render time, total time and
+    response size for every request (see core.utils.perf), feeds the latency
+    histograms of core.utils.health and checks the view's query budget.
+    Disabled with settings.PERF_INSTRUMENTATION = False.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'PERF_INSTRUMENTATION', True)
+        if self.enabled:
+            perf.install_render_timer()
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        counter = perf.SQLCounter()
+        render = [0.0]
+        token = perf.current_render.set(render)
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(counter):
+                response = self.get_response(request)
+        finally:
+            perf.current_render.reset(token)
+        total = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = (match.view_name if match else None) or 'unresolved'
+        perf.record(view_name, {
+            'queries': counter.queries,
+            'sql_ms': round(counter.seconds * 1000, 2),
+            'render_ms': round(render[0] * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+            'bytes': 0 if response.streaming else len(response.content),
+        })
+        if view_name not in HEALTH_EXCLUDED_VIEWS:
+            health.collector.observe_request(
+                total * 1000, response.status_code,
+                query_counts=counter.histogram,
+                query_ms=counter.seconds * 1000,
+                query_max_ms=counter.max_seconds * 1000,
+            )
+        perf.check_budget(view_name, counter.queries)
+        return response
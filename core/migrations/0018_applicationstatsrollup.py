@@ -0,0 +1,40 @@
+# Generated by Django 4.2.8 on 2026-10-18 12:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_rollups(apps, schema_editor):
+    Application = apps.get_model('core', 'Application')
+    ApplicationStatsRollup = apps.get_model('core', 'ApplicationStatsRollup')
+    buckets = Application.objects.values('applied_date__date', 'service_id', 'status').annotate(
+        total=models.Count('id')
+    ).order_by()
+    ApplicationStatsRollup.objects.bulk_create([
+        ApplicationStatsRollup(day=b['applied_date__date'], service_id=b['service_id'], status=b['status'], count=b['total'])
+        for b in buckets
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_appointment_priority'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicationStatsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('draft', 'Draft'), ('pending', 'Pending'), ('under_review', 'Under Review'), ('approved', 'Approved'), ('rejected', 'Rejected')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stats_rollups', to='core.service')),
+            ],
+            options={
+                'unique_together': {('day', 'service', 'status')},
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
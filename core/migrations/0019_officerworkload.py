@@ -0,0 +1,43 @@
+# Generated by Django 4.2.8 on 2026-10-18 12:29
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_workloads(apps, schema_editor):
+    User = apps.get_model('core', 'User')
+    OfficerWorkload = apps.get_model('core', 'OfficerWorkload')
+    officers = User.objects.filter(role='officer').annotate(
+        open_count=models.Count(
+            'assigned_tasks',
+            filter=models.Q(assigned_tasks__application__status__in=['pending', 'under_review'])
+        )
+    )
+    OfficerWorkload.objects.bulk_create([
+        OfficerWorkload(officer_id=officer.id, open_assignments=officer.open_count)
+        for officer in officers
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_applicationstatsrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OfficerWorkload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('open_assignments', models.IntegerField(default=0)),
+                ('department', models.ForeignKey(blank=True, help_text='Restrict routing to this department (optional)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='officer_workloads', to='core.department')),
+                ('officer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='workload', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['department', 'open_assignments'], name='workload_dept_open_idx'), models.Index(fields=['open_assignments'], name='workload_open_idx')],
+            },
+        ),
+        migrations.RunPython(populate_workloads, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.8 on 2026-10-18 12:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_officerworkload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report_type', models.CharField(choices=[('applications', 'Application Report')], default='applications', max_length=30)),
+                ('output_format', models.CharField(choices=[('csv', 'CSV'), ('csv.gz', 'CSV (gzip)')], default='csv', max_length=10)),
+                ('parameters', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('progress', models.IntegerField(default=0, help_text='Percent complete')),
+                ('rows_written', models.IntegerField(default=0)),
+                ('artifact', models.FileField(blank=True, null=True, upload_to='reports/')),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='reportjob_queue_idx')],
+            },
+        ),
+    ]
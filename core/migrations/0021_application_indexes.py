@@ -0,0 +1,37 @@
+# Generated by Django 4.2.8 on 2026-10-18 12:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_reportjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['user', '-applied_date'], name='app_user_applied_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['status', 'sla_deadline'], name='app_status_sla_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'under_review'])), fields=['sla_deadline'], name='app_open_sla_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['service', 'applied_date'], name='app_service_applied_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['-applied_date'], name='app_applied_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='officerassignment',
+            index=models.Index(fields=['officer', '-assigned_date'], name='assign_officer_date_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.8 on 2026-10-18 12:45
+
+import re
+from django.db import migrations, models
+
+
+def populate_lookup_keys(apps, schema_editor):
+    Application = apps.get_model('core', 'Application')
+    batch = []
+    for app in Application.objects.only('id', 'application_number').iterator(chunk_size=2000):
+        app.lookup_key = re.sub(r'[^A-Z0-9]', '', app.application_number.upper())
+        batch.append(app)
+        if len(batch) >= 2000:
+            Application.objects.bulk_update(batch, ['lookup_key'])
+            batch = []
+    Application.objects.bulk_update(batch, ['lookup_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_application_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='application',
+            name='lookup_key',
+            field=models.CharField(db_index=True, default='', editable=False, help_text='Normalized application number for public tracking lookups', max_length=50),
+        ),
+        migrations.RunPython(populate_lookup_keys, migrations.RunPython.noop),
+    ]
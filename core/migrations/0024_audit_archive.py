@@ -0,0 +1,35 @@
+# Generated by Django 4.2.8 on 2026-10-18 12:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_auditlog_event_timestamp'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the archived month', unique=True)),
+                ('file_name', models.CharField(max_length=100)),
+                ('row_count', models.IntegerField(default=0)),
+                ('first_timestamp', models.DateTimeField(blank=True, null=True)),
+                ('last_timestamp', models.DateTimeField(blank=True, null=True)),
+                ('prev_hash', models.CharField(max_length=64)),
+                ('head_hash', models.CharField(max_length=64)),
+                ('file_sha256', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-month'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['timestamp'], name='auditlog_timestamp_idx'),
+        ),
+    ]
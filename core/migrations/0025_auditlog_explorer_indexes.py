@@ -0,0 +1,37 @@
+# Generated by Django 4.2.8 on 2026-10-18 12:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_audit_archive'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='auditlog',
+            name='auditlog_timestamp_idx',
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['timestamp', 'id'], name='auditlog_ts_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['user', 'timestamp'], name='auditlog_user_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['action', 'timestamp'], name='auditlog_action_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['entity_type', 'entity_id', 'timestamp'], name='auditlog_entity_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['ip_address', 'timestamp'], name='auditlog_ip_ts_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.8 on 2026-10-18 13:30
+
+import datetime
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_auditlog_explorer_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DepartmentCalendar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('working_days', models.CharField(default='01234', help_text='Weekdays the office works, Monday=0 to Sunday=6, e.g. 012345', max_length=7)),
+                ('closing_time', models.TimeField(default=datetime.time(17, 30), help_text='Applications received later count from the next day; deadlines fall at this time')),
+                ('department', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='calendar', to='core.department')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Holiday',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('name', models.CharField(max_length=100)),
+                ('department', models.ForeignKey(blank=True, help_text='Leave empty for a holiday in every department', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='holidays', to='core.department')),
+            ],
+            options={
+                'ordering': ['date'],
+                'indexes': [models.Index(fields=['date'], name='holiday_date_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='holiday',
+            constraint=models.UniqueConstraint(fields=('department', 'date'), name='holiday_department_date_uniq'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.8 on 2026-10-18 13:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_sla_calendar'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SLAScanState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scanned_until', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'SLA scan state',
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.8 on 2026-10-18 13:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_sla_scan_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicationSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('code', models.CharField(max_length=3)),
+                ('next_value', models.BigIntegerField(default=1)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='applicationsequence',
+            constraint=models.UniqueConstraint(fields=('year', 'code'), name='appseq_year_code_uniq'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.8 on 2026-10-18 14:15
+
+import os
+import shutil
+import uuid
+import core.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+def move_artifacts_out_of_media(apps, schema_editor):
+    # Reports used to sit in MEDIA_ROOT/reports/, which is served without authentication
+    ReportJob = apps.get_model('core', 'ReportJob')
+    storage = core.models.ReportArtifactStorage()
+    for job in ReportJob.objects.exclude(artifact='').exclude(artifact__isnull=True).only('id', 'artifact').iterator():
+        old_path = os.path.join(settings.MEDIA_ROOT, job.artifact.name)
+        if not os.path.exists(old_path):
+            continue
+        new_name = f"{uuid.uuid4().hex}/{os.path.basename(job.artifact.name)}"
+        os.makedirs(os.path.dirname(storage.path(new_name)), exist_ok=True)
+        shutil.move(old_path, storage.path(new_name))
+        ReportJob.objects.filter(pk=job.pk).update(artifact=new_name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_application_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='Last sign of life from the worker running the job', null=True),
+        ),
+        migrations.AlterField(
+            model_name='reportjob',
+            name='artifact',
+            field=models.FileField(blank=True, null=True, storage=core.models.ReportArtifactStorage(), upload_to=core.models.report_artifact_path),
+        ),
+        migrations.RunPython(move_artifacts_out_of_media, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.8 on 2026-10-18 14:44
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Min, Q
+
+
+def drop_duplicate_global_holidays(apps, schema_editor):
+    Holiday = apps.get_model('core', 'Holiday')
+    keep = Holiday.objects.filter(department__isnull=True).values('date').annotate(first=Min('id')).values('first')
+    Holiday.objects.filter(department__isnull=True).exclude(id__in=keep).delete()
+
+
+def populate_near_at(apps, schema_editor):
+    # WorkCalendar and near_window_days are plain functions of their arguments
+    from core.utils.sla import near_window_days
+    from core.utils.sla_calendar import WorkCalendar
+    Application = apps.get_model('core', 'Application')
+    DepartmentCalendar = apps.get_model('core', 'DepartmentCalendar')
+    Holiday = apps.get_model('core', 'Holiday')
+
+    calendars = {}
+
+    def calendar(department_id):
+        if department_id not in calendars:
+            config = DepartmentCalendar.objects.filter(department_id=department_id).first()
+            holidays = Holiday.objects.filter(Q(department__isnull=True) | Q(department_id=department_id)).values_list('date', flat=True)
+            if config is not None:
+                calendars[department_id] = WorkCalendar(config.working_days, config.closing_time, holidays)
+            else:
+                calendars[department_id] = WorkCalendar(settings.SLA_DEFAULT_WORKING_DAYS, settings.SLA_DEFAULT_CLOSING_TIME, holidays)
+        return calendars[department_id]
+
+    batch = []
+    rows = Application.objects.filter(status__in=['pending', 'under_review']).select_related('service')
+    for app in rows.only('id', 'sla_deadline', 'service__processing_days', 'service__department_id').iterator(chunk_size=2000):
+        app.sla_near_at = calendar(app.service.department_id).near_at(app.sla_deadline, near_window_days(app.service.processing_days))
+        batch.append(app)
+        if len(batch) >= 2000:
+            Application.objects.bulk_update(batch, ['sla_near_at'])
+            batch = []
+    Application.objects.bulk_update(batch, ['sla_near_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_report_artifact_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='application',
+            name='sla_near_at',
+            field=models.DateTimeField(blank=True, help_text='When the application becomes near_deadline (see core.utils.sla)', null=True),
+        ),
+        migrations.RunPython(populate_near_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'under_review'])), fields=['sla_near_at'], name='app_open_near_idx'),
+        ),
+        migrations.RunPython(drop_duplicate_global_holidays, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='holiday',
+            constraint=models.UniqueConstraint(condition=models.Q(('department__isnull', True)), fields=('date',), name='holiday_global_date_uniq'),
+        ),
+    ]
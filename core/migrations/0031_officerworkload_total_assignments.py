@@ -0,0 +1,28 @@
+# Generated by Django 4.2.8 on 2026-10-18 15:07
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_assignments(apps, schema_editor):
+    OfficerAssignment = apps.get_model('core', 'OfficerAssignment')
+    OfficerWorkload = apps.get_model('core', 'OfficerWorkload')
+    totals = OfficerAssignment.objects.values('officer_id').annotate(total=Count('id')).order_by()
+    for row in totals.iterator():
+        OfficerWorkload.objects.filter(officer_id=row['officer_id']).update(total_assignments=row['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0030_sla_near_at_global_holidays'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='officerworkload',
+            name='total_assignments',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(count_assignments, migrations.RunPython.noop),
+    ]
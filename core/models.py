@@ -1,8 +1,21 @@
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-import uuid
 import os
+import re
+import uuid
+from datetime import time as datetime_time
+
+
+def normalize_application_number(value):
+    """
+    Canonical form used for lookups: upper-case letters and digits only, so
+    'app-2025-rev-1a2b3c' and 'APP2025REV1A2B3C' resolve to the same key.
+    """
+    return re.sub(r'[^A-Z0-9]', '', (value or '').upper())
 
 class User(AbstractUser):
     ROLE_CHOICES = (
@@ -19,6 +32,14 @@ class User(AbstractUser):
     profile_picture = models.ImageField(upload_to='profiles/', blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # core.signals recounts an officer's workload only when these change
+        if 'role' in instance.__dict__ and 'is_active' in instance.__dict__:
+            instance._routing_loaded = (instance.role, instance.is_active)
+        return instance
+
     def __str__(self):
         return f"{self.username} ({self.get_role_display()})"
 
@@ -35,6 +56,39 @@ class Department(models.Model):
     def __str__(self):
         return self.department_name
 
+class DepartmentCalendar(models.Model):
+    """
+    Working week and closing time a department's SLA deadlines are counted
+    in (see core.utils.sla_calendar). Departments without one use
+    settings.SLA_DEFAULT_WORKING_DAYS and SLA_DEFAULT_CLOSING_TIME.
+    """
+    department = models.OneToOneField(Department, on_delete=models.CASCADE, related_name='calendar')
+    working_days = models.CharField(max_length=7, default='01234', help_text="Weekdays the office works, Monday=0 to Sunday=6, e.g. 012345")
+    closing_time = models.TimeField(default=datetime_time(17, 30), help_text="Applications received later count from the next day; deadlines fall at this time")
+
+    def __str__(self):
+        return f"Calendar for {self.department.department_name}"
+
+class Holiday(models.Model):
+    date = models.DateField()
+    name = models.CharField(max_length=100)
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, null=True, blank=True, related_name='holidays', help_text="Leave empty for a holiday in every department")
+
+    class Meta:
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(fields=['department', 'date'], name='holiday_department_date_uniq'),
+            # NULLs never collide in the constraint above, so global holidays need their own
+            models.UniqueConstraint(fields=['date'], condition=models.Q(department__isnull=True), name='holiday_global_date_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['date'], name='holiday_date_idx'),
+        ]
+
+    def __str__(self):
+        scope = self.department.department_name if self.department_id else 'All departments'
+        return f"{self.name} ({self.date}, {scope})"
+
 class Service(models.Model):
     service_name = models.CharField(max_length=100)
     department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='services')
@@ -61,6 +115,7 @@ class Application(models.Model):
         ('disaster', 'Disaster'),
     )
     application_number = models.CharField(max_length=50, unique=True, editable=False)
+    lookup_key = models.CharField(max_length=50, db_index=True, editable=False, default='', help_text="Normalized application number for public tracking lookups")
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='applications')
     service = models.ForeignKey(Service, on_delete=models.CASCADE)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
@@ -70,26 +125,102 @@ class Application(models.Model):
     approved_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='approved_applications')
     approved_date = models.DateTimeField(null=True, blank=True)
     sla_deadline = models.DateTimeField()
+    sla_near_at = models.DateTimeField(null=True, blank=True, help_text="When the application becomes near_deadline (see core.utils.sla)")
+
+    class Meta:
+        indexes = [
+            # Citizen dashboard: a user's applications, newest first
+            models.Index(fields=['user', '-applied_date'], name='app_user_applied_idx'),
+            # Status filters and SLA breach scans (status + deadline window)
+            models.Index(fields=['status', 'sla_deadline'], name='app_status_sla_idx'),
+            # Delayed / near-deadline counts only ever look at open applications
+            models.Index(fields=['sla_deadline'], name='app_open_sla_idx', condition=models.Q(status__in=['pending', 'under_review'])),
+            # Near-deadline scans: open applications whose window opened in a time range
+            models.Index(fields=['sla_near_at'], name='app_open_near_idx', condition=models.Q(status__in=['pending', 'under_review'])),
+            # Department-scoped exports and dashboards with a date range
+            models.Index(fields=['service', 'applied_date'], name='app_service_applied_idx'),
+            # Recent applications and daily trends
+            models.Index(fields=['-applied_date'], name='app_applied_idx'),
+        ]
+
+    ROLLUP_FIELDS = ('applied_date', 'service_id', 'status')
+    SLA_FIELDS = ('sla_deadline', 'service_id')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stats bucket inputs as loaded, so core.signals can move
+        # the row on save without touching deferred fields or the database
+        if len(values) == len(cls._meta.concrete_fields) or set(cls.ROLLUP_FIELDS) <= set(field_names):
+            instance._rollup_loaded = tuple(instance.__dict__[name] for name in cls.ROLLUP_FIELDS)
+        # Likewise the inputs of sla_near_at, so save() knows when it is stale
+        if len(values) == len(cls._meta.concrete_fields) or set(cls.SLA_FIELDS) <= set(field_names):
+            instance._sla_loaded = tuple(instance.__dict__[name] for name in cls.SLA_FIELDS)
+        return instance
 
     def save(self, *args, **kwargs):
         if not self.application_number:
-            # Generate APP-YYYY-DEPT-UUID
-            from django.utils import timezone
-            year = timezone.now().year
-            dept_code = self.service.department.department_name[:3].upper()
-            unique_id = uuid.uuid4().hex[:6].upper()
-            self.application_number = f"APP-{year}-{dept_code}-{unique_id}"
+            # APP-YYYY-DEPT-NNNNNN-C from a sequence per year and department code
+            from core.utils.application_numbers import next_number
+            self.application_number = next_number(self.service.department_id)
+        self.lookup_key = normalize_application_number(self.application_number)
         
         if not self.sla_deadline:
-            from datetime import timedelta
-            from django.utils import timezone
-            self.sla_deadline = timezone.now() + timedelta(days=self.service.processing_days)
-            
+            # processing_days counts working days on the department's calendar
+            from core.utils.sla_calendar import deadline_for
+            self.sla_deadline = deadline_for(self.service, timezone.now())
+        sla_inputs = (self.sla_deadline, self.service_id)
+        if not self.sla_near_at or getattr(self, '_sla_loaded', sla_inputs) != sla_inputs:
+            # New, or the deadline or service changed since it was loaded
+            from core.utils.sla_calendar import near_deadline_at
+            self.sla_near_at = near_deadline_at(self.service, self.sla_deadline)
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'sla_near_at' not in update_fields:
+                kwargs['update_fields'] = [*update_fields, 'sla_near_at']
+
         super().save(*args, **kwargs)
+        self._sla_loaded = sla_inputs
 
     def __str__(self):
         return self.application_number
 
+class ApplicationSequence(models.Model):
+    """
+    Next unallocated serial for application numbers with one department
+    code in one year; departments whose names share a code share the
+    sequence. core.utils.application_numbers reserves serials from here in
+    blocks.
+    """
+    year = models.IntegerField()
+    code = models.CharField(max_length=3)
+    next_value = models.BigIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['year', 'code'], name='appseq_year_code_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.year} {self.code}: next {self.next_value}"
+
+
+class ApplicationStatsRollup(models.Model):
+    """
+    Pre-aggregated application counts per applied day, service and status.
+    Kept up to date incrementally by core.signals and rebuilt with
+    `manage.py rebuild_mis_rollups`; the MIS dashboard reads from here.
+    """
+    day = models.DateField()
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='stats_rollups')
+    status = models.CharField(max_length=20, choices=Application.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('day', 'service', 'status')
+
+    def __str__(self):
+        return f"{self.day} {self.service_id} {self.status}: {self.count}"
+
 class Document(models.Model):
     application = models.ForeignKey(Application, on_delete=models.CASCADE, related_name='documents')
     document_type = models.CharField(max_length=100)
@@ -107,9 +238,36 @@ class OfficerAssignment(models.Model):
     assigned_date = models.DateTimeField(auto_now_add=True)
     workload_at_assignment = models.IntegerField(default=0)
 
+    class Meta:
+        indexes = [
+            # Officer worklist, most recent assignment first
+            models.Index(fields=['officer', '-assigned_date'], name='assign_officer_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.officer.username} assigned to {self.application.application_number}"
 
+class OfficerWorkload(models.Model):
+    """
+    Running count of open (pending / under review) applications per officer, so
+    intelligent routing can pick the least loaded officer without joining the
+    assignment history, and of all their assignments for the MIS dashboard.
+    Maintained by core.utils.intelligent_routing.
+    """
+    officer = models.OneToOneField(User, on_delete=models.CASCADE, related_name='workload')
+    department = models.ForeignKey(Department, on_delete=models.SET_NULL, null=True, blank=True, related_name='officer_workloads', help_text="Restrict routing to this department (optional)")
+    open_assignments = models.IntegerField(default=0)
+    total_assignments = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['department', 'open_assignments'], name='workload_dept_open_idx'),
+            models.Index(fields=['open_assignments'], name='workload_open_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.officer.username}: {self.open_assignments} open"
+
 class CitizenDocumentLocker(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='document_locker')
     document_name = models.CharField(max_length=100)
@@ -181,10 +339,21 @@ class AuditLog(models.Model):
     description = models.TextField()
     ip_address = models.GenericIPAddressField()
     user_agent = models.CharField(max_length=255, blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the event happens, not when the batched writer inserts it
+    timestamp = models.DateTimeField(default=timezone.now)
     
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            # Keyset pagination (-timestamp, -id) and month range scans for archival
+            models.Index(fields=['timestamp', 'id'], name='auditlog_ts_id_idx'),
+            # One per audit explorer filter, each ending in timestamp so a
+            # filtered page is still a range scan in timeline order
+            models.Index(fields=['user', 'timestamp'], name='auditlog_user_ts_idx'),
+            models.Index(fields=['action', 'timestamp'], name='auditlog_action_ts_idx'),
+            models.Index(fields=['entity_type', 'entity_id', 'timestamp'], name='auditlog_entity_ts_idx'),
+            models.Index(fields=['ip_address', 'timestamp'], name='auditlog_ip_ts_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user} - {self.action} - {self.timestamp}"
@@ -353,3 +522,105 @@ class SystemConfiguration(models.Model):
 
     def __str__(self):
         return f"System Config ({self.environment})"
+
+class ReportArtifactStorage(FileSystemStorage):
+    """
+    Report files under REPORT_ARTIFACT_DIR, outside the publicly served
+    MEDIA_ROOT. They have no URL; mis:download_report checks who may read one.
+    """
+    @property
+    def base_location(self):
+        return str(settings.REPORT_ARTIFACT_DIR)
+
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+
+    def url(self, name):
+        raise ValueError("Report artifacts are only served through mis:download_report")
+
+
+def report_artifact_path(job, filename):
+    # A random directory per file, so names cannot be guessed even if the folder is exposed
+    return f"{uuid.uuid4().hex}/{filename}"
+
+
+class ReportJob(models.Model):
+    """
+    A report requested from the MIS dashboard and generated out of band by
+    `manage.py run_report_worker`. The finished file is stored with
+    ReportArtifactStorage.
+    """
+    REPORT_CHOICES = (
+        ('applications', 'Application Report'),
+    )
+    FORMAT_CHOICES = (
+        ('csv', 'CSV'),
+        ('csv.gz', 'CSV (gzip)'),
+    )
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+    requested_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='report_jobs')
+    report_type = models.CharField(max_length=30, choices=REPORT_CHOICES, default='applications')
+    output_format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='csv')
+    parameters = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    progress = models.IntegerField(default=0, help_text="Percent complete")
+    rows_written = models.IntegerField(default=0)
+    artifact = models.FileField(upload_to=report_artifact_path, storage=ReportArtifactStorage(), blank=True, null=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True, help_text="Last sign of life from the worker running the job")
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='reportjob_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_report_type_display()} #{self.id} ({self.status})"
+
+
+class AuditArchive(models.Model):
+    """
+    One cold month of AuditLog rows moved out of the hot table into a
+    compressed, append-only JSONL file. Every record carries a hash chained
+    from the previous record, starting at the previous month's head_hash.
+    """
+    month = models.DateField(unique=True, help_text="First day of the archived month")
+    file_name = models.CharField(max_length=100)
+    row_count = models.IntegerField(default=0)
+    first_timestamp = models.DateTimeField(null=True, blank=True)
+    last_timestamp = models.DateTimeField(null=True, blank=True)
+    prev_hash = models.CharField(max_length=64)
+    head_hash = models.CharField(max_length=64)
+    file_sha256 = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-month']
+
+    def __str__(self):
+        return f"Audit archive {self.month:%Y-%m} ({self.row_count} events)"
+
+
+class SLAScanState(models.Model):
+    """
+    Watermark of core.utils.sla_scanner: SLA thresholds crossed before
+    scanned_until have already been notified. A single row.
+    """
+    scanned_until = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "SLA scan state"
+
+    def __str__(self):
+        return f"SLA scanned until {self.scanned_until:%Y-%m-%d %H:%M}"
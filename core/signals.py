@@ -0,0 +1,93 @@
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+from django.db import transaction
+from django.dispatch import receiver
+from core.models import Application, User, OfficerAssignment, OfficerWorkload, Notification, Announcement, Department, SystemConfiguration, Holiday, DepartmentCalendar
+from core.utils import home_cache, intelligent_routing, mis_rollup, notification_cache, sla_calendar, system_config
+
+
+@receiver(pre_save, sender=Application)
+@receiver(pre_delete, sender=Application)
+def remember_rollup_key(sender, instance, raw=False, **kwargs):
+    # The bucket the row is counted in before this write, so it can be moved
+    instance._rollup_key = None if raw else mis_rollup.stored_key(instance)
+
+
+@receiver(post_save, sender=Application)
+def invalidate_home_stats(sender, instance, created, raw=False, **kwargs):
+    # The home page shows total and approved counts only
+    old_status = instance._rollup_key[2] if instance._rollup_key else None
+    if created or (old_status != instance.status and 'approved' in (old_status, instance.status)):
+        home_cache.invalidate('stats')
+
+
+@receiver(post_save, sender=Application)
+def update_stats_rollup(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    mis_rollup.move(None if created else instance._rollup_key, mis_rollup.rollup_key(instance))
+    mis_rollup.remember(instance)
+
+
+@receiver(post_delete, sender=Application)
+def remove_from_stats_rollup(sender, instance, **kwargs):
+    mis_rollup.apply_delta(instance._rollup_key, -1)
+    home_cache.invalidate('stats')
+
+
+@receiver(post_save, sender=User)
+def ensure_officer_workload(sender, instance, created, raw=False, **kwargs):
+    # Every officer needs a workload row to be eligible for intelligent routing;
+    # saves that leave role and is_active alone (e.g. last_login) cost nothing
+    if raw:
+        return
+    state = (instance.role, instance.is_active)
+    loaded = getattr(instance, '_routing_loaded', None)
+    instance._routing_loaded = state
+    if state == loaded or instance.role != 'officer':
+        return
+    if created:
+        OfficerWorkload.objects.get_or_create(officer=instance)
+    else:
+        # Becoming (or returning as) an active officer: count what is still open
+        intelligent_routing.recount_workload(instance)
+
+
+@receiver(post_delete, sender=OfficerAssignment)
+def release_officer_workload(sender, instance, **kwargs):
+    intelligent_routing.release_assignment(instance)
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def invalidate_notification_summary(sender, instance, **kwargs):
+    notification_cache.invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=Announcement)
+@receiver(post_delete, sender=Announcement)
+def invalidate_home_announcements(sender, instance, **kwargs):
+    home_cache.invalidate(*home_cache.ANNOUNCEMENT_FRAGMENTS)
+
+
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+def invalidate_home_departments(sender, instance, **kwargs):
+    home_cache.invalidate('departments')
+
+
+@receiver(post_save, sender=SystemConfiguration)
+@receiver(post_delete, sender=SystemConfiguration)
+def invalidate_system_config(sender, instance, **kwargs):
+    system_config.invalidate()
+    # Again once committed, in case another worker reloaded the old row meanwhile
+    transaction.on_commit(system_config.invalidate)
+
+
+@receiver(post_save, sender=Holiday)
+@receiver(post_delete, sender=Holiday)
+@receiver(post_save, sender=DepartmentCalendar)
+@receiver(post_delete, sender=DepartmentCalendar)
+def invalidate_sla_calendars(sender, instance, **kwargs):
+    # Existing deadlines are left alone; see manage.py recompute_sla_deadlines
+    sla_calendar.invalidate()
+    transaction.on_commit(sla_calendar.invalidate)
@@ -1,3 +1,1192 @@
-from django.test import TestCase
+import gzip
+import os
+import re
+import tempfile
+import threading
+import unittest
+from io import StringIO
+from pathlib import Path
+from datetime import date, datetime, time, timedelta
+from unittest import mock
+from django.conf import settings
+from django.core.cache import caches
+from django.middleware.csrf import _unmask_cipher_token
+from django.test import Client, TestCase, TransactionTestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import IntegrityError, connection, transaction
+from django.urls import reverse
+from django.core.management import call_command
+from django.utils import timezone
+from core.models import User, Department, DepartmentCalendar, Holiday, Service, Application, ApplicationSequence, ApplicationStatsRollup, OfficerAssignment, OfficerWorkload, SystemConfiguration, Notification, AuditLog, GrievanceTicket, SLAScanState, normalize_application_number
+from core.utils import application_numbers, caching, health, home_cache, mis_rollup, sla, sla_calendar, sla_scanner, application_stats, notification_cache, system_config
+from core.context_processors import notifications
+from core.decorators import headed_department_ids, can_manage_department
+from core.utils.application_lookup import find_application
+from core.utils.audit_writer import AuditWriter, log_event, replay_spool
+from core.utils import audit_archive
+from core.utils.audit_archive import archive_cold_months, archive_index, audit_events, decode_cursor, encode_cursor, verify_archives
+from core.utils.intelligent_routing import auto_assign_officer, adjust_workload, assign_backlog
 
-# Create your tests here.
+
+def run_concurrently(target, args_list):
+    """
+    Runs target(*args) for every args tuple in its own thread, all released
+    at once, each on its own database connection. Returns raised exceptions.
+    """
+    errors = []
+    start = threading.Barrier(len(args_list))
+
+    def work(*args):
+        try:
+            start.wait()
+            target(*args)
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=work, args=args) for args in args_list]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+def needs_concurrent_connections(test):
+    """
+    Skips `test` on an in-memory SQLite test database, where a second
+    connection fails with 'database table is locked' instead of waiting.
+    """
+    return unittest.skipIf(connection.vendor == 'sqlite' and connection.is_in_memory_db(),
+                           'needs a test database that allows concurrent connections')(test)
+
+
+class MISRollupTests(TestCase):
+    def setUp(self):
+        self.citizen = User.objects.create_user(username='rollup_citizen', password='TestPass@123', role='citizen')
+        self.dept = Department.objects.create(department_name='Revenue', description='Revenue', contact_email='rev@example.com')
+        self.service = Service.objects.create(
+            service_name='Income Certificate', department=self.dept,
+            description='Income', required_documents='Aadhaar', processing_days=10
+        )
+
+    def _apply(self, status='pending'):
+        return Application.objects.create(user=self.citizen, service=self.service, status=status)
+
+    def test_create_and_status_change_are_counted_incrementally(self):
+        """Creating and reviewing applications moves counts between status buckets."""
+        app = self._apply()
+        self._apply()
+        self.assertEqual(mis_rollup.status_totals(), {'pending': 2})
+
+        app.status = 'approved'
+        app.save()
+        self.assertEqual(mis_rollup.status_totals(), {'pending': 1, 'approved': 1})
+
+        app.delete()
+        self.assertEqual(mis_rollup.status_totals(), {'pending': 1, 'approved': 0})
+
+    def test_deferred_loads_do_not_query_and_saves_still_move_counts(self):
+        self._apply()
+        self._apply()
+        with self.assertNumQueries(1):
+            numbers = [app.application_number for app in Application.objects.only('id', 'application_number')]
+        self.assertEqual(len(numbers), 2)
+
+        app = Application.objects.only('id', 'status').first()
+        app.status = 'approved'
+        app.save(update_fields=['status'])
+        self.assertEqual(mis_rollup.status_totals(), {'pending': 1, 'approved': 1})
+        Application.objects.defer('status').get(pk=app.pk).delete()
+        self.assertEqual(mis_rollup.status_totals(), {'pending': 1, 'approved': 0})
+
+    def test_rebuild_matches_application_table(self):
+        """The rebuild command recovers from updates that bypass the signals."""
+        self._apply()
+        self._apply()
+        Application.objects.update(status='rejected')
+        call_command('rebuild_mis_rollups', stdout=StringIO())
+
+        self.assertEqual(mis_rollup.status_totals(), {'rejected': 2})
+        self.assertEqual(mis_rollup.daily_totals(timezone.localdate()), {timezone.localdate(): 2})
+        self.assertEqual(ApplicationStatsRollup.objects.count(), 1)
+
+    def test_department_totals(self):
+        self._apply()
+        self._apply(status='approved')
+        dept = mis_rollup.department_totals()[0]
+        self.assertEqual(dept['department_name'], 'Revenue')
+        self.assertEqual((dept['app_count'], dept['approved_count'], dept['pending_count']), (2, 1, 1))
+
+
+class ApplicationStatsTests(TestCase):
+    def setUp(self):
+        self.citizen = User.objects.create_user(username='stats_citizen', password='TestPass@123', role='citizen')
+        dept = Department.objects.create(department_name='Revenue', description='Revenue', contact_email='rev@example.com')
+        self.service = Service.objects.create(
+            service_name='Income Certificate', department=dept,
+            description='Income', required_documents='Aadhaar', processing_days=10
+        )
+
+    def test_summarize_counts_all_buckets_in_one_query(self):
+        now = timezone.now()
+        Application.objects.create(user=self.citizen, service=self.service, status='approved')
+        Application.objects.create(user=self.citizen, service=self.service, priority='emergency')
+        Application.objects.create(user=self.citizen, service=self.service, sla_deadline=now - timedelta(days=1))
+        Application.objects.create(user=self.citizen, service=self.service, sla_deadline=now + timedelta(days=1))
+
+        with self.assertNumQueries(1):
+            stats = application_stats.summarize(now=now)
+        self.assertEqual(stats['total'], 4)
+        self.assertEqual((stats['approved'], stats['pending']), (1, 3))
+        self.assertEqual((stats['priority_normal'], stats['priority_emergency']), (3, 1))
+        self.assertEqual((stats['delayed'], stats['near_deadline'], stats['on_time']), (1, 1, 1))
+
+
+class SLAEngineTests(TestCase):
+    def setUp(self):
+        self.citizen = User.objects.create_user(username='sla_citizen', password='TestPass@123', role='citizen')
+        dept = Department.objects.create(department_name='Revenue', description='Revenue', contact_email='rev@example.com')
+        self.services = [
+            Service.objects.create(service_name=f'Service {days}', department=dept, description='x',
+                                   required_documents='Aadhaar', processing_days=days)
+            for days in (3, 10, 30)
+        ]
+
+    def test_sql_rank_matches_python_rule(self):
+        today = timezone.localdate()
+        tuesday = today + timedelta(days=8 - today.weekday())
+        now = timezone.make_aware(datetime.combine(tuesday, time(10)))
+        for service in self.services:
+            for days in (-2, 0, 1, 2, 6, 7, 8, 21):
+                deadline = timezone.make_aware(datetime.combine(tuesday + timedelta(days=days), time(17, 30)))
+                Application.objects.create(user=self.citizen, service=service, sla_deadline=deadline)
+            Application.objects.create(user=self.citizen, service=service, status='rejected', sla_deadline=now - timedelta(days=1))
+
+        apps = list(sla.annotate_sla(Application.objects.select_related('service'), now))
+        for app in apps:
+            self.assertEqual(sla.BUCKETS[app.sla_rank], sla.classify(app, now), (app.service.processing_days, app.sla_deadline - now))
+        # 2 working days below 10 processing days, a fifth of them above it
+        by_service = {(a.service.processing_days, (timezone.localdate(a.sla_deadline) - tuesday).days): sla.BUCKETS[a.sla_rank] for a in apps if a.status == 'pending'}
+        self.assertEqual(by_service[(3, 1)], 'near_deadline')
+        self.assertEqual(by_service[(3, 2)], 'on_time')
+        # Next Tuesday is 6 working days away from Monday's close, next Wednesday from today's
+        self.assertEqual(by_service[(30, 7)], 'near_deadline')
+        self.assertEqual(by_service[(30, 8)], 'on_time')
+
+        counts = application_stats.summarize(now=now)
+        for bucket in ('delayed', 'near_deadline', 'on_time'):
+            self.assertEqual(counts[bucket], sum(1 for app in apps if sla.BUCKETS[app.sla_rank] == bucket))
+        self.assertEqual(sla.annotate_sla(Application.objects.all(), now).filter(sla_rank=0).count(), counts['delayed'])
+
+
+class DashboardQueryCountTests(TestCase):
+    """
+    Dashboard statistics must not cost more queries as the Application table grows.
+    """
+    def setUp(self):
+        self.citizen = User.objects.create_user(username='qc_citizen', password='TestPass@123', role='citizen')
+        self.officer = User.objects.create_user(username='qc_officer', password='TestPass@123', role='officer')
+        self.head = User.objects.create_user(username='qc_head', password='TestPass@123', role='department_head')
+        self.admin = User.objects.create_user(username='qc_admin', password='TestPass@123', role='admin')
+        dept = Department.objects.create(department_name='Revenue', description='Revenue', contact_email='rev@example.com', head_officer=self.head)
+        self.services = [
+            Service.objects.create(
+                service_name=f'Service {i}', department=dept,
+                description='Service', required_documents='Aadhaar', processing_days=10
+            )
+            for i in range(3)
+        ]
+        SystemConfiguration.objects.create()
+        self._seed(3)
+
+    def _seed(self, count):
+        statuses = ['pending', 'under_review', 'approved', 'rejected']
+        for i in range(count):
+            app = Application.objects.create(
+                user=self.citizen, service=self.services[i % 3], status=statuses[i % 4]
+            )
+            OfficerAssignment.objects.create(officer=self.officer, application=app)
+
+    def _query_count(self, username, url):
+        caching.clear_all()
+        system_config.invalidate()
+        self.client.login(username=username, password='TestPass@123')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.client.logout()
+        return len(ctx.captured_queries)
+
+    def _assert_flat(self, username, url, budget):
+        small = self._query_count(username, url)
+        self._seed(40)
+        large = self._query_count(username, url)
+        self.assertEqual(small, large, f"{url} query count grew with data ({small} -> {large})")
+        self.assertLessEqual(large, budget)
+
+    def test_home_dashboard(self):
+        self._assert_flat('qc_citizen', reverse('core:home'), 10)
+
+    def test_officer_dashboard(self):
+        self._assert_flat('qc_officer', reverse('officer:dashboard'), 8)
+
+    def test_mis_dashboard(self):
+        self._assert_flat('qc_head', reverse('mis:dashboard'), 12)
+
+    def test_admin_dashboard(self):
+        self._assert_flat('qc_admin', reverse('admin_panel:dashboard'), 18)
+
+
+class IntelligentRoutingTests(TestCase):
+    def setUp(self):
+        self.citizen = User.objects.create_user(username='route_citizen', password='TestPass@123', role='citizen')
+        self.dept = Department.objects.create(department_name='Revenue', description='Revenue', contact_email='rev@example.com')
+        self.other_dept = Department.objects.create(department_name='Transport', description='Transport', contact_email='tr@example.com')
+        self.service = Service.objects.create(
+            service_name='Income Certificate', department=self.dept,
+            description='Income', required_documents='Aadhaar', processing_days=10
+        )
+        self.busy = User.objects.create_user(username='busy_officer', password='TestPass@123', role='officer')
+        self.idle = User.objects.create_user(username='idle_officer', password='TestPass@123', role='officer')
+        OfficerWorkload.objects.filter(officer=self.busy).update(open_assignments=5)
+
+    def _apply(self):
+        return Application.objects.create(user=self.citizen, service=self.service)
+
+    def test_assigns_least_loaded_officer_and_counts_workload(self):
+        app = self._apply()
+        self.assertEqual(auto_assign_officer(app), self.idle)
+        assignment = OfficerAssignment.objects.get(application=app)
+        self.assertEqual(assignment.workload_at_assignment, 0)
+        self.assertEqual(OfficerWorkload.objects.get(officer=self.idle).open_assignments, 1)
+
+    def test_routing_reads_counter_without_joining_assignments(self):
+        app = self._apply()
+        with CaptureQueriesContext(connection) as ctx:
+            auto_assign_officer(app)
+        self.assertFalse(any('core_officerassignment' in q['sql'] and 'COUNT' in q['sql'] for q in ctx.captured_queries))
+
+    def test_department_scoped_officers_are_preferred(self):
+        OfficerWorkload.objects.filter(officer=self.busy).update(department=self.dept)
+        OfficerWorkload.objects.filter(officer=self.idle).update(department=self.other_dept)
+        self.assertEqual(auto_assign_officer(self._apply()), self.busy)
+
+    def test_adjust_workload_and_rebuild(self):
+        app = self._apply()
+        auto_assign_officer(app)
+        adjust_workload(app, -1)
+        self.assertEqual(OfficerWorkload.objects.get(officer=self.idle).open_assignments, 0)
+
+        call_command('rebuild_officer_workloads', stdout=StringIO())
+        self.assertEqual(OfficerWorkload.objects.get(officer=self.idle).open_assignments, 1)
+        self.assertEqual(OfficerWorkload.objects.get(officer=self.busy).open_assignments, 0)
+
+    def test_deleted_and_reactivated_assignments_keep_counter_exact(self):
+        app = self._apply()
+        auto_assign_officer(app)
+        app.delete()
+        self.assertEqual(OfficerWorkload.objects.get(officer=self.idle).open_assignments, 0)
+
+        auto_assign_officer(self._apply())
+        self.idle.role = 'citizen'
+        self.idle.save()
+        OfficerWorkload.objects.filter(officer=self.idle).update(open_assignments=9)
+        self.idle.role = 'officer'
+        self.idle.save()
+        self.assertEqual(OfficerWorkload.objects.get(officer=self.idle).open_assignments, 1)
+
+    def test_saving_an_officer_without_role_changes_skips_workload(self):
+        officer = User.objects.get(pk=self.idle.pk)
+        officer.last_login = timezone.now()
+        with CaptureQueriesContext(connection) as ctx:
+            officer.save(update_fields=['last_login'])
+        self.assertFalse(any('core_officerworkload' in q['sql'] for q in ctx.captured_queries))
+
+    def test_assign_backlog_distributes_in_batches(self):
+        apps = [self._apply() for _ in range(7)]
+        Application.objects.create(user=self.citizen, service=self.service, status='draft')
+
+        self.assertEqual(assign_backlog(batch_size=3), 7)
+        self.assertFalse(Application.objects.filter(status='pending', officer_assignments__isnull=True).exists())
+        # the idle officer absorbs the first five, after which the two alternate
+        self.assertEqual(OfficerWorkload.objects.get(officer=self.idle).open_assignments, 6)
+        self.assertEqual(OfficerWorkload.objects.get(officer=self.busy).open_assignments, 6)
+        last = OfficerAssignment.objects.get(application=apps[-1])
+        self.assertEqual(last.workload_at_assignment, 5)
+
+
+class IntelligentRoutingConcurrencyTests(TransactionTestCase):
+    OFFICERS = 3
+    SUBMITS = 4
+
+    @needs_concurrent_connections
+    def test_concurrent_submits_never_read_the_same_workload(self):
+        citizen = User.objects.create_user(username='race_citizen', password='TestPass@123', role='citizen')
+        dept = Department.objects.create(department_name='Revenue', description='Revenue', contact_email='rev@example.com')
+        service = Service.objects.create(service_name='Income Certificate', department=dept, description='Income',
+                                         required_documents='Aadhaar', processing_days=10)
+        for i in range(self.OFFICERS):
+            User.objects.create_user(username=f'race_officer_{i}', password='TestPass@123', role='officer')
+        apps = [Application.objects.create(user=citizen, service=service) for _ in range(self.OFFICERS * self.SUBMITS)]
+
+        errors = run_concurrently(lambda app: auto_assign_officer(app), [(app,) for app in apps])
+        self.assertEqual(errors, [])
+        # Had two submits read the same row, one officer would hold duplicate snapshots
+        snapshots = list(OfficerAssignment.objects.values_list('officer_id', 'workload_at_assignment'))
+        self.assertEqual(len(set(snapshots)), len(apps))
+        self.assertEqual(set(OfficerWorkload.objects.values_list('open_assignments', flat=True)), {self.SUBMITS})
+
+
+class NotificationContextTests(TestCase):
+    def setUp(self):
+        caching.clear_all()
+        self.user = User.objects.create_user(username='notif_user', password='TestPass@123', role='citizen')
+        Notification.objects.create(user=self.user, title='Welcome', message='Hello')
+        self.client.login(username='notif_user', password='TestPass@123')
+
+    def _notification_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('core:about'))
+        self.assertEqual(response.status_code, 200)
+        return [q for q in ctx.captured_queries if 'core_notification' in q['sql']], response
+
+    def test_warm_cache_costs_no_queries(self):
+        cold, response = self._notification_queries()
+        self.assertEqual(len(cold), 2)
+        self.assertEqual(response.context['unread_notification_count'], 1)
+
+        warm, response = self._notification_queries()
+        self.assertEqual(warm, [])
+        self.assertEqual(len(response.context['user_notifications']), 1)
+
+    def test_context_is_lazy(self):
+        request = RequestFactory().get('/')
+        request.user = self.user
+        with self.assertNumQueries(0):
+            notifications(request)
+
+    def test_create_and_mark_read_invalidate(self):
+        self._notification_queries()
+        Notification.objects.create(user=self.user, title='Second', message='Hi')
+        self.assertEqual(notification_cache.get_summary(self.user.id)['count'], 2)
+
+        self.client.post(reverse('core:mark_all_read'))
+        self.assertEqual(notification_cache.get_summary(self.user.id)['count'], 0)
+
+
+class ApplicationLookupTests(TestCase):
+    def setUp(self):
+        citizen = User.objects.create_user(username='lookup_citizen', password='TestPass@123', role='citizen')
+        dept = Department.objects.create(department_name='Revenue', description='Revenue', contact_email='rev@example.com')
+        service = Service.objects.create(
+            service_name='Income Certificate', department=dept,
+            description='Income', required_documents='Aadhaar', processing_days=10
+        )
+        self.app = Application.objects.create(user=citizen, service=service)
+        Application.objects.filter(pk=self.app.pk).update(application_number='APP-2026-REV-7F3A9C', lookup_key='APP2026REV7F3A9C')
+        self.other = Application.objects.create(user=citizen, service=service)
+        Application.objects.filter(pk=self.other.pk).update(application_number='APP-2026-REV-7F3B11', lookup_key='APP2026REV7F3B11')
+
+    def test_exact_match_ignores_case_and_separators(self):
+        app, match = find_application(' app 2026-rev-7f3a9c ')
+        self.assertEqual((app, match), (self.app, 'exact'))
+
+    def test_numeric_id_fallback(self):
+        self.assertEqual(find_application(str(self.other.id)), (self.other, 'id'))
+        self.assertEqual(find_application(str(self.other.id), by_id=False), (None, None))
+
+    def test_partial_matches_must_be_unique(self):
+        self.assertEqual(find_application('APP-2026-REV-7F3A', partial=True), (self.app, 'prefix'))
+        self.assertEqual(find_application('APP-2026-REV-7F3', partial=True), (None, None))
+        self.assertEqual(find_application('APP-2026-REV-7F3A', partial=False), (None, None))
+
+    def test_single_typo_is_corrected(self):
+        self.assertEqual(find_application('APP-2026-REV-7F3A8C', partial=True), (self.app, 'fuzzy'))
+        self.assertEqual(find_application('APP-2026-REV-F73A9C', partial=True), (self.app, 'fuzzy'))
+
+    def test_save_populates_lookup_key(self):
+        self.assertEqual(Application.objects.get(pk=self.app.pk).lookup_key, 'APP2026REV7F3A9C')
+        fresh = Application.objects.create(user=self.app.user, service=self.app.service)
+        self.assertEqual(fresh.lookup_key, normalize_application_number(fresh.application_number))
+
+
+class AuditWriterTests(TestCase):
+    def setUp(self):
+        self.spool = tempfile.TemporaryDirectory()
+        self.addCleanup(self.spool.cleanup)
+        self.user = User.objects.create_user(username='audit_user', password='TestPass@123', role='citizen')
+
+    def _writer(self, **kwargs):
+        return AuditWriter(self.spool.name, background=False, **kwargs)
+
+    def _event(self, action='LOGIN'):
+        return {'user_id': self.user.id, 'action': action, 'entity_type': 'User',
+                'entity_id': self.user.id, 'description': 'test', 'ip_address': '127.0.0.1'}
+
+    def test_events_are_buffered_then_bulk_inserted(self):
+        writer = self._writer()
+        for _ in range(3):
+            writer.record(self._event())
+        self.assertEqual(AuditLog.objects.count(), 0)
+        self.assertEqual(len(os.listdir(self.spool.name)), 1)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(writer.flush(), 3)
+        self.assertEqual(AuditLog.objects.filter(action='LOGIN').count(), 3)
+        self.assertEqual(os.listdir(self.spool.name), [])
+
+    def test_spool_survives_lost_buffer(self):
+        writer = self._writer()
+        writer.record(self._event('APP_TRACK'))
+        writer.record(self._event('APP_TRACK'))
+        writer._segment.close()
+        # A new process never saw the buffer; the spool segment is all that is left
+        with open(next(Path(self.spool.name).iterdir()), 'a') as segment:
+            segment.write('{"torn": ')
+
+        self.assertEqual(replay_spool(self.spool.name, older_than=60), 0)
+        self.assertEqual(replay_spool(self.spool.name), 2)
+        self.assertEqual(AuditLog.objects.filter(action='APP_TRACK').count(), 2)
+        self.assertEqual(os.listdir(self.spool.name), [])
+
+    def test_event_time_is_kept(self):
+        writer = self._writer()
+        writer.record(self._event())
+        recorded = writer._buffer[0]['timestamp']
+        writer.flush()
+        self.assertEqual(AuditLog.objects.get().timestamp.isoformat(), recorded)
+
+    def test_batched_rows_stay_append_only(self):
+        writer = self._writer()
+        writer.record(self._event())
+        writer.flush()
+        log = AuditLog.objects.get()
+        with self.assertRaises(ValueError):
+            log.save()
+        with self.assertRaises(ValueError):
+            log.delete()
+
+    @override_settings(AUDIT_LOG_ASYNC=True)
+    def test_buffered_events_wait_for_commit(self):
+        writer = self._writer()
+        with mock.patch('core.utils.audit_writer.get_writer', return_value=writer):
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    log_event('APP_SUBMIT', 'Application', 'rolled back', user=self.user)
+                    raise RuntimeError
+            with self.captureOnCommitCallbacks(execute=True):
+                log_event('APP_SUBMIT', 'Application', 'committed', user=self.user)
+                self.assertEqual(writer._buffer, [])
+        self.assertEqual(writer.flush(), 1)
+        self.assertEqual(AuditLog.objects.get().description, 'committed')
+
+
+class AuditArchiveTests(TestCase):
+    def setUp(self):
+        archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_dir.cleanup)
+        self.settings_override = override_settings(AUDIT_ARCHIVE_DIR=Path(archive_dir.name))
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.archive_dir = Path(archive_dir.name)
+        self.user = User.objects.create_user(username='archive_user', password='TestPass@123', role='citizen')
+        self.now = timezone.now()
+
+    def _log(self, days_ago, entity_id=1, action='APP_TRACK'):
+        return AuditLog.objects.create(
+            user=self.user, action=action, entity_type='Application', entity_id=entity_id,
+            description=f'event {days_ago}', ip_address='127.0.0.1',
+            timestamp=self.now - timedelta(days=days_ago),
+        )
+
+    def test_cold_months_move_to_verified_archives(self):
+        for days_ago in (400, 390, 200, 5, 1):
+            self._log(days_ago)
+
+        archives = archive_cold_months(hot_months=3, now=self.now)
+
+        self.assertGreaterEqual(len(archives), 2)
+        self.assertEqual(sum(a.row_count for a in archives), 3)
+        self.assertEqual(AuditLog.objects.count(), 2)
+        for older, newer in zip(archives, archives[1:]):
+            self.assertEqual(newer.prev_hash, older.head_hash)
+        self.assertEqual(verify_archives(), [])
+        # Running again finds nothing new to move
+        self.assertEqual(archive_cold_months(hot_months=3, now=self.now), [])
+
+    def test_queries_span_hot_and_archived_events(self):
+        for days_ago in (400, 200, 5):
+            self._log(days_ago, entity_id=7)
+        self._log(300, entity_id=8)
+        archive_cold_months(hot_months=3, now=self.now)
+
+        events = audit_events(entity_type='Application', entity_id=7)
+        self.assertEqual([e.description for e in events], ['event 5', 'event 200', 'event 400'])
+        self.assertEqual(events[1].user, self.user)
+
+        window = audit_events(start=self.now - timedelta(days=250), end=self.now - timedelta(days=100))
+        self.assertEqual([e.description for e in window], ['event 200'])
+        self.assertEqual(len(audit_events(limit=2)), 2)
+
+    def test_index_limits_reads_to_matching_blocks(self):
+        for entity_id in range(1, 7):
+            self._log(400, entity_id=entity_id)
+        with mock.patch('core.utils.audit_archive.BLOCK_LINES', 2):
+            archive = archive_cold_months(hot_months=3, now=self.now)[0]
+        self.assertEqual(verify_archives(), [])
+
+        with mock.patch('core.utils.audit_archive.read_block', wraps=audit_archive.read_block) as read_block:
+            events = audit_events(entity_type='Application', entity_id=3)
+            self.assertEqual([e.entity_id for e in events], [3])
+            self.assertEqual(read_block.call_count, 1)
+            self.assertEqual(audit_events(entity_type='Application', entity_id=99), [])
+            self.assertEqual(read_block.call_count, 1)
+        self.assertEqual(len(audit_events(user_id=self.user.id)), 6)
+        self.assertEqual(archive_index(archive)['entity']['Application:5'], [2])
+
+    def test_pages_stop_at_the_newest_blocks(self):
+        logs = [self._log(400, entity_id=entity_id) for entity_id in range(1, 7)]
+        with mock.patch('core.utils.audit_archive.BLOCK_LINES', 2):
+            archive_cold_months(hot_months=3, now=self.now)
+
+        with mock.patch('core.utils.audit_archive.read_block', wraps=audit_archive.read_block) as read_block:
+            page = audit_events(limit=2)
+            self.assertEqual(read_block.call_count, 1)
+        self.assertEqual([e.id for e in page], [logs[5].id, logs[4].id])
+        page = audit_events(limit=3, before=decode_cursor(encode_cursor(page[-1])))
+        self.assertEqual([e.id for e in page], [logs[3].id, logs[2].id, logs[1].id])
+
+    def test_tampering_breaks_the_chain(self):
+        self._log(400, entity_id=1)
+        self._log(400, entity_id=2)
+        archive = archive_cold_months(hot_months=3, now=self.now)[0]
+        path = self.archive_dir / archive.file_name
+        os.chmod(path, 0o644)
+        with gzip.open(path, 'rt') as f:
+            lines = f.readlines()
+        with gzip.open(path, 'wt') as f:
+            f.writelines([lines[0].replace('event 400', 'event 401'), lines[1]])
+
+        problems = verify_archives()
+        self.assertTrue(any('checksum' in p for p in problems))
+        self.assertTrue(any('hash mismatch' in p for p in problems))
+
+    def test_keyset_pages_continue_into_archives(self):
+        for days_ago in (400, 200, 5, 1):
+            self._log(days_ago)
+        archive_cold_months(hot_months=3, now=self.now)
+
+        pages, before = [], None
+        while True:
+            page = audit_events(limit=2, before=before)
+            if not page:
+                break
+            pages.append([e.description for e in page])
+            before = decode_cursor(encode_cursor(page[-1]))
+        self.assertEqual(pages, [['event 1', 'event 5'], ['event 200', 'event 400']])
+
+
+class HomeCacheTests(TestCase):
+    def setUp(self):
+        caching.clear_all()
+        self.addCleanup(caching.clear_all)
+        Department.objects.create(department_name='Revenue', description='Revenue', contact_email='rev@example.com',
+                                  latitude=20.29, longitude=85.82)
+
+    def test_warm_home_page_skips_the_database(self):
+        self.client.get(reverse('core:home'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('core:home'))
+        self.assertEqual(response.context['dept_list'][0]['name'], 'Revenue')
+        self.assertIn('Cookie', response['Vary'])
+
+    def test_changes_invalidate_their_fragment(self):
+        from core.models import Announcement
+        self.client.get(reverse('core:home'))
+        Announcement.objects.create(title='Flood alert', category='alert')
+        Department.objects.create(department_name='Health', description='Health', contact_email='h@example.com',
+                                  latitude=20.3, longitude=85.8)
+        citizen = User.objects.create_user(username='home_citizen', password='TestPass@123', role='citizen')
+        service = Service.objects.create(service_name='Birth Certificate', department=Department.objects.first(),
+                                         description='Birth', required_documents='Aadhaar', processing_days=7)
+        Application.objects.create(user=citizen, service=service)
+
+        response = self.client.get(reverse('core:home'))
+        self.assertEqual([a.title for a in response.context['alerts']], ['Flood alert'])
+        self.assertEqual(len(response.context['dept_list']), 2)
+        self.assertEqual(response.context['stats']['total'], 1)
+
+    def test_stats_read_the_rollup(self):
+        citizen = User.objects.create_user(username='home_stats_citizen', password='TestPass@123', role='citizen')
+        service = Service.objects.create(service_name='Birth Certificate', department=Department.objects.first(),
+                                         description='Birth', required_documents='Aadhaar', processing_days=7)
+        Application.objects.create(user=citizen, service=service)
+        Application.objects.create(user=citizen, service=service, status='approved')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('core:home'))
+        self.assertEqual((response.context['stats']['total'], response.context['stats']['issued']), (2, 1))
+        self.assertFalse([q['sql'] for q in queries if '"core_application"' in q['sql']])
+
+    def test_expired_announcements_drop_out(self):
+        from core.models import Announcement
+        Announcement.objects.create(title='Old alert', category='alert', expires_at=timezone.now() - timedelta(minutes=1))
+        response = self.client.get(reverse('core:home'))
+        self.assertEqual(list(response.context['alerts']), [])
+
+    @override_settings(HOME_PAGE_CACHE_SECONDS=60)
+    def test_anonymous_page_cache_and_etag(self):
+        first = self.client.get(reverse('core:home'))
+        etag = first['ETag']
+        with self.assertNumQueries(0):
+            second = self.client.get(reverse('core:home'))
+        self.assertEqual(second['ETag'], etag)
+        self.assertEqual(self.client.get(reverse('core:home'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # Each visitor gets their own CSRF token, never the one cached with the page
+        cached, _ = home_cache.get_page()
+        self.assertIn(home_cache.CSRF_PLACEHOLDER.encode(), cached)
+        visitor = Client()
+        token = re.search(r"X-CSRFToken': '(\w+)'", visitor.get(reverse('core:home')).content.decode()).group(1)
+        self.assertEqual(_unmask_cipher_token(token), visitor.cookies['csrftoken'].value)
+
+        User.objects.create_user(username='home_user', password='TestPass@123', role='citizen')
+        self.client.login(username='home_user', password='TestPass@123')
+        response = self.client.get(reverse('core:home'))
+        self.assertFalse(response.has_header('ETag'))
+        self.assertContains(response, 'home_user')
+
+
+class CacheNamespaceTests(TestCase):
+    def setUp(self):
+        caching.clear_all()
+        caching.reset_metrics()
+        self.addCleanup(caching.clear_all)
+
+    def test_namespaces_do_not_collide(self):
+        caching.get_cache('core').set('summary', 'core value')
+        caching.get_cache('mis').set('summary', 'mis value')
+        self.assertEqual(caching.get_cache('core').get('summary'), 'core value')
+        self.assertEqual(caching.get_cache('mis').get('summary'), 'mis value')
+        self.assertIsNone(caching.get_cache('citizen').get('summary'))
+        with self.assertRaises(KeyError):
+            caching.get_cache('unknown')
+
+    def test_hits_and_misses_are_counted_and_shared(self):
+        core = caching.get_cache('core')
+        core.get('missing')
+        core.set('present', 1)
+        core.get('present')
+        core.get_many(['present', 'missing'])
+        core.flush_metrics()
+        self.assertEqual(core.local_counts(), (0, 0))
+
+        metrics = caching.cache_metrics()
+        self.assertEqual(metrics['core'], {'hits': 2, 'misses': 2, 'hit_ratio': 0.5})
+        self.assertIsNone(metrics['mis']['hit_ratio'])
+
+    def test_namespaces_are_stored_and_cleared_apart(self):
+        self.assertEqual(len({config['LOCATION'] for config in settings.CACHES.values()}), len(settings.CACHES))
+        caching.get_cache('state').set('token', 'kept', None)
+        caching.get_cache('core').set('summary', 'dropped')
+        caches['core'].clear()
+        self.assertEqual(caching.get_cache('state').get('token'), 'kept')
+        self.assertIsNone(caching.get_cache('core').get('summary'))
+
+    def test_timeout_none_never_expires(self):
+        core = caching.get_cache('core')
+        core.set('forever', 1, None)
+        core.set('default', 1)
+        later = timezone.now().timestamp() + 3600
+        with mock.patch('time.time', return_value=later):
+            self.assertEqual(core.get('forever'), 1)
+            self.assertIsNone(core.get('default'))
+
+    def test_file_cache_counts_its_directory_once_per_interval(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        store = caching.FileBasedCache(directory.name, {'OPTIONS': {'MAX_ENTRIES': 2, 'CULL_INTERVAL': 60}})
+        with mock.patch.object(store, '_list_cache_files', wraps=store._list_cache_files) as listing:
+            for key in range(5):
+                store.set(key, key)
+        self.assertEqual(listing.call_count, 1)
+
+    def test_falsy_values_are_hits(self):
+        core = caching.get_cache('core')
+        core.set('empty', [])
+        self.assertEqual(core.get_or_set('empty', lambda: ['rebuilt']), [])
+        self.assertEqual(caching.cache_metrics()['core']['hits'], 1)
+
+
+class SystemConfigCacheTests(TestCase):
+    def setUp(self):
+        caching.clear_all()
+        system_config.invalidate()
+        self.addCleanup(system_config.invalidate)
+
+    def test_singleton_is_created_then_served_from_memory(self):
+        config = system_config.get_config()
+        self.assertEqual(SystemConfiguration.objects.count(), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(system_config.get_config().pk, config.pk)
+
+    def test_save_publishes_a_new_version(self):
+        system_config.get_config()
+        row = SystemConfiguration.objects.get()
+        row.enable_grievances = False
+        row.save()
+        self.assertFalse(system_config.get_config().enable_grievances)
+
+    def test_other_workers_pick_up_changes_after_the_check_interval(self):
+        stale = system_config.get_config()
+        SystemConfiguration.objects.filter(pk=stale.pk).update(max_upload_size_mb=25)
+        # Another worker saved: only the shared version token changes here
+        caching.get_cache('core').set(system_config.VERSION_KEY, 'from-another-worker', None)
+        self.assertEqual(system_config.get_config().max_upload_size_mb, 5)
+
+        system_config._state['checked_at'] -= system_config.VERSION_CHECK_SECONDS
+        self.assertEqual(system_config.get_config().max_upload_size_mb, 25)
+
+    def test_exposed_on_request_and_templates(self):
+        response = self.client.get(reverse('core:home'))
+        self.assertEqual(response.wsgi_request.system_config.portal_name, 'e-Governance Portal')
+        self.assertEqual(response.context['system_config'].portal_name, 'e-Governance Portal')
+
+
+class MaintenanceModeTests(TestCase):
+    def setUp(self):
+        caching.clear_all()
+        system_config.invalidate()
+        self.addCleanup(system_config.invalidate)
+        SystemConfiguration.objects.create(maintenance_mode=True, portal_name='Odisha <Portal>')
+
+    def test_public_traffic_gets_static_page_without_queries(self):
+        system_config.get_config()
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('core:home'))
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+        self.assertContains(response, 'Odisha &lt;Portal&gt;', status_code=503)
+
+    def test_exempt_paths_and_admin_bypass(self):
+        self.assertEqual(self.client.get(reverse('accounts:login')).status_code, 200)
+
+        User.objects.create_user(username='maint_admin', password='TestPass@123', role='admin')
+        self.client.login(username='maint_admin', password='TestPass@123')
+        self.assertEqual(self.client.get(reverse('core:home')).status_code, 503)
+        self.client.get(reverse('admin_panel:dashboard'))
+        self.assertEqual(self.client.get(reverse('core:home')).status_code, 200)
+
+    def test_citizens_get_no_bypass(self):
+        User.objects.create_user(username='maint_citizen', password='TestPass@123', role='citizen')
+        self.client.login(username='maint_citizen', password='TestPass@123')
+        self.client.get(reverse('admin_panel:dashboard'))
+        self.assertEqual(self.client.get(reverse('core:home')).status_code, 503)
+        self.client.cookies['maintenance_bypass'] = 'forged'
+        self.assertEqual(self.client.get(reverse('core:home')).status_code, 503)
+
+    def test_maintenance_ends_at_end_time(self):
+        config = SystemConfiguration.objects.get()
+        config.maintenance_end_time = timezone.now() - timedelta(minutes=1)
+        config.save()
+        self.assertEqual(self.client.get(reverse('core:home')).status_code, 200)
+
+
+class AuthorizationTests(TestCase):
+    def setUp(self):
+        self.head = User.objects.create_user(username='auth_head', password='TestPass@123', role='department_head')
+        self.citizen = User.objects.create_user(username='auth_citizen', password='TestPass@123', role='citizen')
+        self.own = Department.objects.create(department_name='Revenue', description='Revenue',
+                                             contact_email='rev@example.com', head_officer=self.head)
+        self.other = Department.objects.create(department_name='Health', description='Health', contact_email='h@example.com')
+
+    def test_wrong_role_goes_to_its_own_dashboard(self):
+        self.client.login(username='auth_citizen', password='TestPass@123')
+        self.assertRedirects(self.client.get(reverse('mis:dashboard')), reverse('citizen:dashboard'),
+                             fetch_redirect_response=False)
+        self.assertRedirects(self.client.get(reverse('admin_panel:dashboard')), reverse('citizen:dashboard'),
+                             fetch_redirect_response=False)
+
+    def test_login_uses_role_home(self):
+        response = self.client.post(reverse('accounts:login'), {'username': 'auth_head', 'password': 'TestPass@123'})
+        self.assertRedirects(response, reverse('mis:dashboard'), fetch_redirect_response=False)
+
+    def test_headed_departments_are_memoized(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(headed_department_ids(self.head), {self.own.id})
+            self.assertTrue(can_manage_department(self.head, self.own.id))
+            self.assertFalse(can_manage_department(self.head, self.other.id))
+
+    def test_department_scoping_in_mis(self):
+        mine = Service.objects.create(service_name='Income', department=self.own, description='x',
+                                      required_documents='Aadhaar', processing_days=5)
+        theirs = Service.objects.create(service_name='Vaccination', department=self.other, description='x',
+                                        required_documents='Aadhaar', processing_days=5)
+        self.client.login(username='auth_head', password='TestPass@123')
+        response = self.client.get(reverse('mis:service_list'))
+        self.assertEqual(list(response.context['services']), [mine])
+        self.assertRedirects(self.client.get(reverse('mis:service_edit', args=[theirs.id])),
+                             reverse('mis:service_list'), fetch_redirect_response=False)
+        self.assertEqual(self.client.get(reverse('mis:service_edit', args=[mine.id])).status_code, 200)
+
+
+class HealthMetricsTests(TestCase):
+    def setUp(self):
+        caching.clear_all()
+        health.collector._start()
+        self.addCleanup(health.collector._start)
+        User.objects.create_user(username='health_admin', password='TestPass@123', role='admin')
+
+    def test_histogram_percentiles(self):
+        histogram = health.Histogram(health.REQUEST_BUCKETS_MS)
+        for ms in [5] * 90 + [80] * 9 + [7000]:
+            histogram.observe(ms)
+        summary = histogram.summary()
+        self.assertEqual((summary['p50'], summary['p95'], summary['max']), (10, 100, 7000))
+        # Beyond the last bucket the slowest observation is the best estimate
+        self.assertEqual(health.histogram_percentile(health.REQUEST_BUCKETS_MS, histogram.counts, 100, 7000), 7000)
+
+    def test_anonymous_healthz_is_status_only(self):
+        data = self.client.get('/healthz?full=1').json()
+        self.assertEqual(set(data), {'status', 'timestamp'})
+        self.assertEqual(data['status'], 'ok')
+
+    def test_basic_healthz_hides_runtime_metrics(self):
+        self.client.login(username='health_admin', password='TestPass@123')
+        data = self.client.get('/healthz').json()
+        self.assertEqual(data['status'], 'ok')
+        self.assertEqual(data['database']['status'], 'ok')
+        self.assertIn('percent', data['storage'])
+        self.assertNotIn('requests', data)
+
+    def test_full_healthz_merges_worker_reports(self):
+        self.client.get(reverse('api:service_list'))
+        self.client.get(reverse('api:service_list'))
+        # Another worker's report, published through the shared cache
+        with mock.patch('core.utils.health.os.getpid', return_value=os.getpid() + 100000):
+            other = health.Collector()
+            other.observe_request(3000, 500, query_counts=[0, 2] + [0] * 8, query_ms=3, query_max_ms=1.8)
+            other.flush()
+
+        self.client.login(username='health_admin', password='TestPass@123')
+        data = self.client.get('/healthz?full=1').json()
+        self.assertEqual(len(data['workers']), 2)
+        self.assertEqual(data['requests']['count'], 3)
+        self.assertEqual(data['requests']['errors'], 1)
+        self.assertEqual(data['requests']['max'], 3000)
+        self.assertGreaterEqual(data['queries']['count'], 2)
+        self.assertGreater(data['memory']['workers_rss_bytes'], 0)
+
+    @override_settings(HEALTHZ_TOKEN='probe-secret')
+    def test_token_unlocks_full_healthz(self):
+        self.assertNotIn('cpu', self.client.get('/healthz?full=1', HTTP_X_HEALTH_TOKEN='wrong').json())
+        self.assertIn('cpu', self.client.get('/healthz?full=1', HTTP_X_HEALTH_TOKEN='probe-secret').json())
+
+    def test_database_failure_returns_503(self):
+        broken = mock.Mock(vendor='sqlite')
+        broken.cursor.side_effect = health.DatabaseError('down')
+        with mock.patch('core.utils.health.connection', broken), self.assertLogs('django.request', 'ERROR'):
+            response = self.client.get('/healthz')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json(), {'status': 'error', 'timestamp': response.json()['timestamp']})
+
+    @override_settings(HEALTH_DISK_WARN_PERCENT=0)
+    def test_full_disk_is_degraded(self):
+        self.assertEqual(self.client.get('/healthz').json()['status'], 'degraded')
+
+    def test_admin_dashboard_shows_live_health(self):
+        self.client.login(username='health_admin', password='TestPass@123')
+        response = self.client.get(reverse('admin_panel:dashboard'))
+        self.assertEqual(response.context['health']['database']['status'], 'ok')
+        self.assertContains(response, 'Database Healthy')
+        self.assertNotContains(response, 'Math.random')
+
+
+class SLACalendarTests(TestCase):
+    def setUp(self):
+        caching.clear_all()
+        sla_calendar.invalidate()
+        self.citizen = User.objects.create_user(username='cal_citizen', password='TestPass@123', role='citizen')
+        self.dept = Department.objects.create(department_name='Revenue', description='Revenue', contact_email='rev@example.com')
+        self.service = Service.objects.create(
+            service_name='Income Certificate', department=self.dept,
+            description='Income', required_documents='Aadhaar', processing_days=3
+        )
+        today = timezone.localdate()
+        self.monday = today + timedelta(days=7 - today.weekday())
+
+    def _at(self, day, hour):
+        return timezone.make_aware(datetime.combine(day, time(hour)))
+
+    def test_working_days_skip_weekends_holidays_and_after_hours(self):
+        friday = self.monday - timedelta(days=3)
+        calendar = sla_calendar.WorkCalendar('01234', '17:30', [self.monday + timedelta(days=1)])
+        closing = lambda day: timezone.make_aware(datetime.combine(day, time(17, 30)))
+        # Friday afternoon: Monday is day 1
+        self.assertEqual(calendar.deadline(self._at(friday, 16), 1), closing(self.monday))
+        # Monday after closing counts from Tuesday, a holiday, so day 1 is Wednesday
+        self.assertEqual(calendar.deadline(self._at(self.monday, 18), 1), closing(self.monday + timedelta(days=2)))
+        self.assertEqual(calendar.deadline(self._at(self.monday, 9), 3), closing(self.monday + timedelta(days=4)))
+        # Beyond the precomputed table the slow path agrees
+        far = calendar.end + timedelta(days=30)
+        self.assertLess(calendar.add_working_days(far, 10).weekday(), 5)
+        self.assertEqual(calendar.add_working_days(calendar.end - timedelta(days=3), 10),
+                         sla_calendar.WorkCalendar('01234', '17:30', [self.monday + timedelta(days=1)], today=far).add_working_days(calendar.end - timedelta(days=3), 10))
+
+    def test_department_calendar_and_holidays_apply_on_submission(self):
+        DepartmentCalendar.objects.create(department=self.dept, working_days='0123456', closing_time=time(23, 59))
+        Holiday.objects.create(date=timezone.localdate() + timedelta(days=1), name='Festival')
+        application = Application.objects.create(user=self.citizen, service=self.service)
+        # Seven-day week, but tomorrow is off
+        self.assertEqual(timezone.localtime(application.sla_deadline).date(), timezone.localdate() + timedelta(days=4))
+
+    def test_near_window_counts_working_days(self):
+        closing = lambda day: timezone.make_aware(datetime.combine(day, time(17, 30)))
+        friday = self.monday - timedelta(days=3)
+        # From Thursday's close only Friday and Monday are left
+        application = Application.objects.create(user=self.citizen, service=self.service, sla_deadline=closing(self.monday))
+        self.assertEqual(application.sla_near_at, closing(friday - timedelta(days=1)))
+        self.assertEqual(sla.classify(application, self._at(friday, 10)), 'near_deadline')
+        self.assertEqual(sla.classify(application, self._at(friday - timedelta(days=1), 10)), 'on_time')
+
+        Holiday.objects.create(date=friday, name='Festival')
+        sla_calendar.invalidate()
+        self.assertEqual(sla_calendar.near_deadline_at(self.service, closing(self.monday)), closing(friday - timedelta(days=2)))
+
+    def test_moving_the_deadline_moves_the_near_window(self):
+        closing = lambda day: timezone.make_aware(datetime.combine(day, time(17, 30)))
+        friday = self.monday - timedelta(days=3)
+        application = Application.objects.create(user=self.citizen, service=self.service, sla_deadline=closing(self.monday))
+        application = Application.objects.get(pk=application.pk)
+        application.sla_deadline = closing(self.monday + timedelta(weeks=8))
+        application.save(update_fields=['sla_deadline'])
+        self.assertEqual(sla.classify(application, self._at(friday, 10)), 'on_time')
+        application.refresh_from_db()
+        self.assertEqual(application.sla_near_at, closing(self.monday + timedelta(weeks=8, days=-4)))
+        self.assertEqual(sla.annotate_sla(Application.objects.filter(pk=application.pk), self._at(friday, 10)).get().sla_rank, sla.BUCKETS.index('on_time'))
+
+    def test_global_holiday_dates_are_unique(self):
+        Holiday.objects.create(date=self.monday, name='Festival')
+        Holiday.objects.create(date=self.monday, name='Festival', department=self.dept)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Holiday.objects.create(date=self.monday, name='Festival again')
+
+    def test_recompute_after_holiday(self):
+        pending = Application.objects.create(user=self.citizen, service=self.service)
+        done = Application.objects.create(user=self.citizen, service=self.service, status='approved')
+        Application.objects.filter(pk__in=[pending.pk, done.pk]).update(
+            applied_date=self._at(self.monday, 10), sla_deadline=self._at(self.monday, 10) + timedelta(days=3)
+        )
+
+        out = StringIO()
+        call_command('recompute_sla_deadlines', stdout=out)
+        pending.refresh_from_db()
+        self.assertEqual(timezone.localtime(pending.sla_deadline), timezone.localtime(self._at(self.monday + timedelta(days=3), 17).replace(minute=30)))
+        self.assertIn('1 deadlines changed', out.getvalue())
+
+        Holiday.objects.create(date=self.monday + timedelta(days=2), name='Festival', department=self.dept)
+        out = StringIO()
+        call_command('recompute_sla_deadlines', '--due-from', str(self.monday + timedelta(days=2)), '--dry-run', stdout=out)
+        self.assertIn('1 deadlines would change', out.getvalue())
+        call_command('recompute_sla_deadlines', '--department', str(self.dept.id), stdout=StringIO())
+        pending.refresh_from_db()
+        done.refresh_from_db()
+        self.assertEqual(timezone.localtime(pending.sla_deadline).date(), self.monday + timedelta(days=4))
+        self.assertEqual(done.sla_deadline, self._at(self.monday, 10) + timedelta(days=3))
+
+
+class SLAScannerTests(TestCase):
+    def setUp(self):
+        caching.clear_all()
+        self.citizen = User.objects.create_user(username='scan_citizen', password='TestPass@123', role='citizen')
+        self.officer = User.objects.create_user(username='scan_officer', password='TestPass@123', role='officer')
+        self.head = User.objects.create_user(username='scan_head', password='TestPass@123', role='department_head')
+        self.dept = Department.objects.create(department_name='Revenue', description='Revenue', contact_email='rev@example.com', head_officer=self.head)
+        self.service = Service.objects.create(
+            service_name='Income Certificate', department=self.dept,
+            description='Income', required_documents='Aadhaar', processing_days=10
+        )
+        self.now = timezone.now()
+
+    def _app(self, deadline, status='pending'):
+        app = Application.objects.create(user=self.citizen, service=self.service, status=status)
+        Application.objects.filter(pk=app.pk).update(sla_deadline=deadline, sla_near_at=sla_calendar.near_deadline_at(self.service, deadline))
+        OfficerAssignment.objects.create(officer=self.officer, application=app)
+        return app
+
+    def test_notifies_crossings_since_watermark_once(self):
+        # Tuesday just after closing: Thursday's applications turned near at 17:30
+        today = timezone.localdate()
+        self.now = timezone.make_aware(datetime.combine(today + timedelta(days=8 - today.weekday()), time(17, 45)))
+        SLAScanState.objects.create(scanned_until=self.now - timedelta(hours=1))
+        near = self._app(self.now + timedelta(days=2, minutes=-30))
+        self._app(self.now - timedelta(minutes=30))
+        level_two = self._app(self.now - timedelta(days=3, minutes=10))
+        self._app(self.now - timedelta(hours=2))  # breached before the watermark
+        self._app(self.now - timedelta(minutes=30), status='approved')
+        grievance = GrievanceTicket.objects.create(user=self.citizen, application=level_two, subject='Late', description='Still waiting')
+
+        result = sla_scanner.scan(self.now)
+        self.assertEqual((result['near_deadline'], result['breached'], result['escalated']), (1, 2, 1))
+        # near: officer; level 1: officer + citizen; level 2: officer + head + citizen
+        self.assertEqual(result['notifications'], 6)
+        self.assertEqual(Notification.objects.filter(user=self.officer).count(), 3)
+        self.assertEqual(Notification.objects.filter(user=self.citizen).count(), 2)
+        self.assertTrue(Notification.objects.get(user=self.head).message.startswith(f"Application {level_two.application_number}"))
+        self.assertIn(near.application_number, Notification.objects.get(title="SLA deadline approaching").message)
+        grievance.refresh_from_db()
+        self.assertEqual((grievance.escalation_level, grievance.priority), (2, 'high'))
+
+        again = sla_scanner.scan(self.now + timedelta(minutes=1))
+        self.assertEqual((again['near_deadline'], again['breached'], again['notifications']), (0, 0, 0))
+        self.assertEqual(SLAScanState.objects.get().scanned_until, self.now + timedelta(minutes=1))
+
+    def test_bulk_notifications_refresh_cached_summary(self):
+        self.assertEqual(notification_cache.get_summary(self.officer.id)['count'], 0)
+        self._app(self.now - timedelta(minutes=5))
+        with self.captureOnCommitCallbacks(execute=True):
+            sla_scanner.scan(self.now)
+        self.assertEqual(notification_cache.get_summary(self.officer.id)['count'], 1)
+
+    def test_first_scan_covers_every_crossing(self):
+        old = self._app(self.now - timedelta(days=5))
+        recent = self._app(self.now - timedelta(hours=1))
+        grievance = GrievanceTicket.objects.create(user=self.citizen, application=old, subject='Late', description='Still waiting')
+        out = StringIO()
+        with mock.patch('core.utils.sla_scanner.timezone.now', return_value=self.now):
+            call_command('scan_sla_breaches', stdout=out)
+        self.assertIn('0 near deadline, 2 breached', out.getvalue())
+        messages = ' '.join(Notification.objects.filter(user=self.officer).values_list('message', flat=True))
+        self.assertIn(old.application_number, messages)
+        self.assertIn(recent.application_number, messages)
+        grievance.refresh_from_db()
+        self.assertEqual(grievance.escalation_level, 2)
+        self.assertEqual(SLAScanState.objects.get().scanned_until, self.now)
+
+    def test_scan_after_a_long_pause_misses_nothing(self):
+        SLAScanState.objects.create(scanned_until=self.now - timedelta(days=10))
+        self._app(self.now - timedelta(days=9))
+        result = sla_scanner.scan(self.now)
+        self.assertEqual(result['breached'], 1)
+        self.assertEqual(Notification.objects.get(user=self.head).title, 'SLA breached (level 3)')
+
+    def test_short_service_is_near_on_submission(self):
+        SLAScanState.objects.create(scanned_until=self.now)
+        express = Service.objects.create(
+            service_name='Express Certificate', department=self.dept,
+            description='Express', required_documents='Aadhaar', processing_days=1
+        )
+        app = Application.objects.create(user=self.citizen, service=express)
+        OfficerAssignment.objects.create(officer=self.officer, application=app)
+        # Its window opened before it was submitted
+        self.assertLess(app.sla_near_at, app.applied_date)
+        now = timezone.now()
+        result = sla_scanner.scan(now)
+        self.assertEqual((result['near_deadline'], result['notifications']), (1, 1))
+        self.assertIn(app.application_number, Notification.objects.get(user=self.officer).message)
+        self.assertEqual(sla_scanner.scan(now + timedelta(minutes=1))['near_deadline'], 0)
+
+
+class ApplicationNumberTests(TestCase):
+    def setUp(self):
+        self.citizen = User.objects.create_user(username='number_citizen', password='TestPass@123', role='citizen')
+        self.dept = Department.objects.create(department_name='Revenue', description='Revenue', contact_email='rev@example.com')
+        self.service = Service.objects.create(
+            service_name='Income Certificate', department=self.dept,
+            description='Income', required_documents='Aadhaar', processing_days=10
+        )
+        self.year = timezone.localdate().year
+        application_numbers.allocator = application_numbers.NumberAllocator(block_size=5)
+
+    def tearDown(self):
+        application_numbers.allocator = application_numbers.NumberAllocator()
+
+    def test_serials_come_from_a_reserved_block_without_queries(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = Application.objects.create(user=self.citizen, service=self.service)
+        with CaptureQueriesContext(connection) as queries:
+            second = Application.objects.create(user=self.citizen, service=self.service)
+        self.assertFalse([q['sql'] for q in queries if 'core_applicationsequence' in q['sql'] or 'core_department' in q['sql']])
+        self.assertTrue(first.application_number.startswith(f'APP-{self.year}-REV-000001-'))
+        self.assertTrue(second.application_number.startswith(f'APP-{self.year}-REV-000002-'))
+        self.assertTrue(application_numbers.is_valid(second.lookup_key))
+        self.assertEqual(ApplicationSequence.objects.get(year=self.year, code='REV').next_value, 6)
+
+    def test_rolled_back_block_is_not_reused(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Application.objects.create(user=self.citizen, service=self.service)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        app = Application.objects.create(user=self.citizen, service=self.service)
+        self.assertTrue(app.application_number.startswith(f'APP-{self.year}-REV-000001-'))
+
+    def test_check_character_flags_typos(self):
+        app = Application.objects.create(user=self.citizen, service=self.service)
+        number = app.application_number
+        key = app.lookup_key
+        for i in range(len(key)):
+            for char in application_numbers.ALPHABET:
+                if char != key[i]:
+                    self.assertFalse(application_numbers.is_valid(key[:i] + char + key[i + 1:]))
+        # Last serial digit mistyped: no exact lookup, and the typo search finds it
+        typo = number[:-3] + ('1' if number[-3] != '1' else '2') + number[-2:]
+        self.assertTrue(application_numbers.is_sequenced(typo))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(find_application(typo, by_id=False, partial=False), (None, None))
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(find_application(typo.lower(), partial=True), (app, 'fuzzy'))
+
+
+class ApplicationNumberConcurrencyTests(TransactionTestCase):
+    WORKERS = 4
+    PER_WORKER = 30
+    BLOCK_SIZE = 7
+
+    def setUp(self):
+        self.dept = Department.objects.create(department_name='Revenue', description='Revenue', contact_email='rev@example.com')
+
+    def _assert_unique_and_valid(self, numbers, reserved=None):
+        self.assertEqual(len(numbers), self.WORKERS * self.PER_WORKER)
+        self.assertEqual(len(set(numbers)), len(numbers))
+        self.assertTrue(all(application_numbers.is_valid(normalize_application_number(n)) for n in numbers))
+        next_value = ApplicationSequence.objects.get(code='REV').next_value
+        if reserved is None:
+            # Threads that ran dry together each reserve a block; the spares go unused
+            self.assertLessEqual(len(numbers), next_value - 1)
+            self.assertLess(next_value - 1, len(numbers) + self.WORKERS * self.BLOCK_SIZE)
+        else:
+            self.assertEqual(next_value, 1 + reserved)
+
+    @needs_concurrent_connections
+    def test_threads_share_one_allocator(self):
+        # Blocks far smaller than the demand, so threads keep reserving while others take
+        allocator = application_numbers.NumberAllocator(block_size=self.BLOCK_SIZE)
+        numbers = []
+        errors = run_concurrently(
+            lambda: numbers.extend(allocator.next_number(self.dept.id) for _ in range(self.PER_WORKER)),
+            [()] * self.WORKERS,
+        )
+        self.assertEqual(errors, [])
+        self._assert_unique_and_valid(numbers)
+
+    def test_interleaved_workers_never_share_a_number(self):
+        # One allocator per worker process, taking turns on the same sequence row
+        allocators = [application_numbers.NumberAllocator(block_size=self.BLOCK_SIZE) for _ in range(self.WORKERS)]
+        numbers = [allocators[i % self.WORKERS].next_number(self.dept.id) for i in range(self.WORKERS * self.PER_WORKER)]
+        self._assert_unique_and_valid(numbers, self.WORKERS * 5 * self.BLOCK_SIZE)
+
+    @needs_concurrent_connections
+    def test_concurrent_workers_never_share_a_number(self):
+        # One allocator per worker process, all reserving on the same sequence row at once
+        allocators = [application_numbers.NumberAllocator(block_size=self.BLOCK_SIZE) for _ in range(self.WORKERS)]
+        numbers = []
+        errors = run_concurrently(
+            lambda allocator: numbers.extend(allocator.next_number(self.dept.id) for _ in range(self.PER_WORKER)),
+            [(allocator,) for allocator in allocators],
+        )
+        self.assertEqual(errors, [])
+        self._assert_unique_and_valid(numbers, self.WORKERS * 5 * self.BLOCK_SIZE)
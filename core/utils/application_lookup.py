@@ -0,0 +1,88 @@
+import string
+from core.models import Application, normalize_application_number
+from core.utils import application_numbers
+
+MIN_PARTIAL_LENGTH = 6
+KEY_ALPHABET = string.ascii_uppercase + string.digits
+PROBE_BATCH = 500
+
+
+def _prefix_bounds(prefix):
+    # [prefix, next_prefix) is an index range scan on every backend, unlike LIKE
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _single_edits(key):
+    """
+    Every key one typo away from `key`: a dropped, extra, swapped or wrong character.
+    """
+    edits = set()
+    for i in range(len(key) + 1):
+        for ch in KEY_ALPHABET:
+            edits.add(key[:i] + ch + key[i:])
+        if i < len(key):
+            edits.add(key[:i] + key[i + 1:])
+            for ch in KEY_ALPHABET:
+                edits.add(key[:i] + ch + key[i + 1:])
+        if i < len(key) - 1:
+            edits.add(key[:i] + key[i + 1] + key[i] + key[i + 2:])
+    edits.discard(key)
+    return edits
+
+
+def _unique(queryset):
+    # Partial matches are only trusted when they point at exactly one application
+    matches = list(queryset[:2])
+    return matches[0] if len(matches) == 1 else None
+
+
+def find_application(query, by_id=True, partial=False, queryset=None):
+    """
+    Resolves user-typed tracking input to an application. Returns
+    (application, match) where match is 'exact', 'id', 'prefix', 'fuzzy' or None.
+
+    Every step is an index lookup on Application.lookup_key (or the primary
+    key): exact normalized number, then numeric ID if `by_id`, then - with
+    `partial` - a unique prefix match and finally a unique match one typo away.
+    Input in the APP-YYYY-DEPT-NNNNNN-C layout with a wrong check character
+    skips the exact lookup, and its typo candidates are narrowed to numbers
+    with a valid one.
+    """
+    if queryset is None:
+        queryset = Application.objects.all()
+    raw = (query or '').strip()
+    key = normalize_application_number(raw)
+    if not key:
+        return None, None
+
+    sequenced = application_numbers.is_sequenced(raw)
+    if not sequenced or application_numbers.is_valid(key):
+        app = queryset.filter(lookup_key=key).first()
+        if app:
+            return app, 'exact'
+
+    if by_id and raw.isdigit():
+        app = queryset.filter(id=int(raw)).first()
+        if app:
+            return app, 'id'
+
+    if not partial or len(key) < MIN_PARTIAL_LENGTH:
+        return None, None
+
+    low, high = _prefix_bounds(key)
+    app = _unique(queryset.filter(lookup_key__gte=low, lookup_key__lt=high).order_by('lookup_key'))
+    if app:
+        return app, 'prefix'
+
+    candidates = sorted(
+        candidate for candidate in _single_edits(key)
+        if not sequenced or application_numbers.is_valid(candidate)
+    )
+    found = []
+    for i in range(0, len(candidates), PROBE_BATCH):
+        found.extend(queryset.filter(lookup_key__in=candidates[i:i + PROBE_BATCH]).values_list('id', flat=True)[:2])
+        if len(found) > 1:
+            return None, None
+    if len(found) == 1:
+        return queryset.get(id=found[0]), 'fuzzy'
+    return None, None
@@ -0,0 +1,146 @@
+"""
+Application numbers: APP-YYYY-DEPT-NNNNNN-C.
+
+NNNNNN is a serial per year and department code (ApplicationSequence), so
+numbers never collide and new ones land at the end of the unique index
+rather than at random positions in it. C is a Luhn mod 36 check character
+over the normalized number: it catches any single mistyped character and
+almost every swap of two neighbours, so a mistyped number is recognised
+without a lookup.
+
+Each process reserves BLOCK_SIZE serials with one UPDATE and hands them
+out from memory, so the sequence row is locked once per block rather than
+per application. Reserving inside a transaction (apply_service) keeps the
+row locked until that transaction commits, so other processes running out
+of serials for the same year and code wait for it. Department codes are
+remembered per process too, so a save normally costs no query. A block
+reserved inside a transaction is only reused after that transaction
+commits; if it rolls back, so does the reservation, and the rest of the
+block is dropped. Serials still unused when a process exits are skipped,
+so numbers are unique and increasing within a process but not gap-free.
+"""
+import re
+import string
+import threading
+from collections import deque
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from core.models import ApplicationSequence, Department, normalize_application_number
+
+ALPHABET = string.digits + string.ascii_uppercase
+SERIAL_DIGITS = 6
+NUMBER_RE = re.compile(r'^APP-\d{4}-[A-Z0-9]{1,3}-\d{%d,}-[0-9A-Z]$' % SERIAL_DIGITS)
+
+
+def check_character(key):
+    """
+    Luhn mod 36 check character for a normalized number.
+    """
+    total = 0
+    for position, char in enumerate(reversed(key)):
+        value = ALPHABET.index(char)
+        if position % 2 == 0:
+            value *= 2
+            value = value // len(ALPHABET) + value % len(ALPHABET)
+        total += value
+    return ALPHABET[-total % len(ALPHABET)]
+
+
+def is_valid(key):
+    """
+    True when a normalized number ends in the right check character.
+    """
+    return len(key) > 1 and check_character(key[:-1]) == key[-1]
+
+
+def is_sequenced(value):
+    """
+    True for user input written in the APP-YYYY-DEPT-NNNNNN-C layout.
+    """
+    return bool(NUMBER_RE.match((value or '').strip().upper()))
+
+
+def department_code(name):
+    return re.sub(r'[^A-Z0-9]', '', name.upper())[:3] or 'GEN'
+
+
+def format_number(year, code, serial):
+    body = f"APP-{year}-{code}-{serial:0{SERIAL_DIGITS}d}"
+    return f"{body}-{check_character(normalize_application_number(body))}"
+
+
+class NumberAllocator:
+    def __init__(self, block_size=None):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        # department_id -> code; a renamed department keeps its code until restart
+        self._codes = {}
+        # (year, code) -> committed blocks, each [next serial, end]
+        self._blocks = {}
+
+    def _code(self, department_id):
+        code = self._codes.get(department_id)
+        if code is None:
+            code = department_code(Department.objects.values_list('department_name', flat=True).get(pk=department_id))
+            self._codes[department_id] = code
+        return code
+
+    def _take(self, key):
+        with self._lock:
+            blocks = self._blocks.get(key)
+            while blocks:
+                block = blocks[0]
+                if block[0] < block[1]:
+                    block[0] += 1
+                    return block[0] - 1
+                blocks.popleft()
+        return None
+
+    def _release(self, key, block):
+        with self._lock:
+            self._blocks.setdefault(key, deque()).append(block)
+
+    def _reserve(self, year, code, size):
+        """
+        First of `size` newly reserved serials.
+
+        Inside an outer transaction this block is a savepoint: the UPDATE's
+        row lock lasts until the outer transaction ends, which is what lets
+        a rollback take the reservation with it. Reserving on a separate
+        connection would release the row sooner but leave rolled-back
+        reservations in place; BLOCK_SIZE keeps the wait to once per block.
+        """
+        with transaction.atomic():
+            sequence = ApplicationSequence.objects.filter(year=year, code=code)
+            if not sequence.update(next_value=F('next_value') + size):
+                try:
+                    with transaction.atomic():
+                        ApplicationSequence.objects.create(year=year, code=code, next_value=1 + size)
+                except IntegrityError:
+                    # Another process started this year's sequence first
+                    sequence.update(next_value=F('next_value') + size)
+            end = sequence.values_list('next_value', flat=True).get()
+        return end - size
+
+    def next_number(self, department_id, year=None):
+        year = year or timezone.localdate().year
+        code = self._code(department_id)
+        key = (year, code)
+        serial = self._take(key)
+        if serial is None:
+            size = self.block_size or getattr(settings, 'APPLICATION_NUMBER_BLOCK_SIZE', 20)
+            serial = self._reserve(year, code, size)
+            if size > 1:
+                block = [serial + 1, serial + size]
+                # Runs at once outside a transaction, never if it rolls back
+                transaction.on_commit(lambda: self._release(key, block))
+        return format_number(year, code, serial)
+
+
+allocator = NumberAllocator()
+
+
+def next_number(department_id, year=None):
+    return allocator.next_number(department_id, year)
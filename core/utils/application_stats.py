@@ -0,0 +1,31 @@
+from django.db.models import Count, Q
+from django.utils import timezone
+from core.models import Application
+from core.utils.sla import COMPLETED_STATUSES, bucket_q
+
+
+def summarize(queryset=None, extra=None, now=None):
+    """
+    Counts applications in `queryset` by status, priority and SLA bucket using a
+    single aggregate() query. `extra` maps additional names to Q filters that are
+    counted in the same round-trip, e.g. {'approved_today': Q(...)}.
+
+    Returns a dict with `total`, one key per status and priority value, and the
+    SLA buckets `delayed`, `near_deadline` and `on_time` (open applications
+    only, as classified by core.utils.sla).
+    """
+    if queryset is None:
+        queryset = Application.objects.all()
+    now = now or timezone.now()
+
+    buckets = {'total': Count('id')}
+    for status, _ in Application.STATUS_CHOICES:
+        buckets[status] = Count('id', filter=Q(status=status))
+    for priority, _ in Application.PRIORITY_CHOICES:
+        buckets[f'priority_{priority}'] = Count('id', filter=Q(priority=priority))
+    for bucket in ('delayed', 'near_deadline', 'on_time'):
+        buckets[bucket] = Count('id', filter=bucket_q(bucket, now))
+    for name, condition in (extra or {}).items():
+        buckets[name] = Count('id', filter=condition)
+
+    return queryset.order_by().aggregate(**buckets)
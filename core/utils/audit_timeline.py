@@ -0,0 +1,63 @@
+"""
+Per-entity audit timelines (submit, track, review, approve, escalate, ...)
+read through audit_events(), i.e. the (entity_type, entity_id, timestamp)
+index on the hot table plus any archived months since the entity existed.
+Pages show the newest TIMELINE_PAGE_SIZE events; older history is loaded on
+demand with the cursor of the last event shown, so archived months are only
+read when someone asks for them.
+"""
+from core.utils.audit_archive import audit_events, decode_cursor, encode_cursor
+
+TIMELINE_PAGE_SIZE = 20
+
+APPLICATION_EVENT_LABELS = {
+    'APP_SUBMIT': 'Application submitted',
+    'APP_CREATE': 'Application submitted',
+    'APP_TRACK': 'Status checked',
+    'APP_REVIEW': 'Under review',
+    'APP_APPROVE': 'Approved',
+    'APP_REJECT': 'Rejected',
+    'APP_ESCALATE': 'Escalated',
+    'DOC_UPLOAD': 'Document uploaded',
+}
+
+# Status checks are the citizen's own lookups; they add noise to their timeline
+CITIZEN_HIDDEN_ACTIONS = {'APP_TRACK'}
+
+
+def entity_timeline(entity_type, entity_id, since=None, limit=None, before=None, labels=None, exclude_actions=()):
+    """
+    Audit events for one entity, newest first, each with a `label` taken
+    from `labels` (falling back to the action code).
+    """
+    events = audit_events(start=since, limit=limit, before=before, exclude_actions=exclude_actions,
+                          entity_type=entity_type, entity_id=entity_id)
+    labels = labels or {}
+    for event in events:
+        event.label = labels.get(event.action, event.action)
+    return events
+
+
+def application_timeline(application, for_citizen=False, limit=None, before=None):
+    """
+    The history of an application. The citizen view drops status checks and
+    is meant to be rendered without the acting user or raw descriptions.
+    """
+    return entity_timeline('Application', application.id, since=application.applied_date,
+                           limit=limit, before=before, labels=APPLICATION_EVENT_LABELS,
+                           exclude_actions=CITIZEN_HIDDEN_ACTIONS if for_citizen else ())
+
+
+def application_timeline_page(application, for_citizen=False, cursor=None):
+    """
+    One page of application_timeline(): up to TIMELINE_PAGE_SIZE events
+    older than `cursor` and the cursor of the next older page (None on the
+    last one). Raises ValueError for a malformed cursor.
+    """
+    before = decode_cursor(cursor) if cursor else None
+    events = application_timeline(application, for_citizen, limit=TIMELINE_PAGE_SIZE + 1, before=before)
+    older = None
+    if len(events) > TIMELINE_PAGE_SIZE:
+        events = events[:TIMELINE_PAGE_SIZE]
+        older = encode_cursor(events[-1])
+    return events, older
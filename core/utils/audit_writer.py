@@ -0,0 +1,202 @@
+"""
+Buffered, batched AuditLog writer.
+
+Views call `log_event()`. With settings.AUDIT_LOG_ASYNC enabled the event is
+appended to a spool file (so it survives a crash), kept in an in-process
+buffer and written by a background thread with bulk_create once
+AUDIT_LOG_BATCH_SIZE events are waiting or AUDIT_LOG_FLUSH_INTERVAL seconds
+have passed. A spool segment is deleted only after its events are committed;
+segments left behind by a dead worker (or a failed flush) are replayed by any
+process once they are older than the stale threshold, so delivery is
+at-least-once. Rows are only ever inserted, never updated or deleted.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from core.models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+
+def _to_model(event):
+    return AuditLog(
+        user_id=event.get('user_id'),
+        action=event['action'],
+        entity_type=event['entity_type'],
+        entity_id=event.get('entity_id'),
+        description=event['description'],
+        ip_address=event.get('ip_address') or '0.0.0.0',
+        user_agent=event.get('user_agent', ''),
+        timestamp=datetime.fromisoformat(event['timestamp']),
+    )
+
+
+def write_events(events):
+    AuditLog.objects.bulk_create([_to_model(e) for e in events], batch_size=500)
+
+
+def _read_segment(path):
+    events = []
+    with open(path, encoding='utf-8') as segment:
+        for line in segment:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                # A torn last line from a crash mid-write; everything before it is intact
+                logger.warning(f"Skipping unreadable audit spool line in {path}")
+    return events
+
+
+def replay_spool(spool_dir, older_than=0):
+    """
+    Writes the events of every spool segment not modified for `older_than`
+    seconds and deletes the segment. Returns the number of events replayed.
+    """
+    spool_dir = Path(spool_dir)
+    if not spool_dir.exists():
+        return 0
+    cutoff = time.time() - older_than
+    replayed = 0
+    for path in sorted(list(spool_dir.glob('*.jsonl')) + list(spool_dir.glob('*.replaying'))):
+        try:
+            if path.stat().st_mtime > cutoff:
+                continue
+            # Claim the segment atomically so two processes never replay it twice
+            claimed = path.with_name(f"{path.stem.split('.')[0]}.{os.getpid()}-{uuid.uuid4().hex[:6]}.replaying")
+            os.rename(path, claimed)
+            os.utime(claimed)
+        except OSError:
+            continue
+        events = _read_segment(claimed)
+        try:
+            if events:
+                write_events(events)
+        except Exception:
+            logger.exception(f"Audit spool replay failed for {claimed}; will retry")
+            continue
+        claimed.unlink(missing_ok=True)
+        replayed += len(events)
+    return replayed
+
+
+class AuditWriter:
+    def __init__(self, spool_dir, batch_size=100, flush_interval=2.0, stale_after=None, background=True):
+        self.spool_dir = Path(spool_dir)
+        self.background = background
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.stale_after = stale_after if stale_after is not None else max(30.0, flush_interval * 10)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._buffer = []
+        self._segment = None
+        self._segment_path = None
+        self._pid = None
+
+    def _start(self):
+        # Called under the lock; also re-runs in a forked gunicorn worker
+        self._pid = os.getpid()
+        self._buffer = []
+        self._segment = self._segment_path = None
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        if self.background:
+            threading.Thread(target=self._run, name='audit-writer', daemon=True).start()
+            atexit.register(self.flush)
+
+    def record(self, event):
+        event.setdefault('timestamp', timezone.now().isoformat())
+        line = json.dumps(event, default=str) + '\n'
+        with self._lock:
+            if self._pid != os.getpid():
+                self._start()
+            if self._segment is None:
+                self._segment_path = self.spool_dir / f"audit-{self._pid}-{uuid.uuid4().hex}.jsonl"
+                self._segment = open(self._segment_path, 'a', encoding='utf-8')
+            self._segment.write(line)
+            self._segment.flush()
+            self._buffer.append(event)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """
+        Writes buffered events now. Returns the number of events written.
+        """
+        with self._lock:
+            events, self._buffer = self._buffer, []
+            segment, path = self._segment, self._segment_path
+            self._segment = self._segment_path = None
+        if segment:
+            segment.close()
+        if not events:
+            return 0
+        try:
+            write_events(events)
+        except Exception:
+            logger.exception(f"Audit flush failed; {len(events)} events kept in {path} for replay")
+            return 0
+        path.unlink(missing_ok=True)
+        return len(events)
+
+    def _run(self):
+        next_replay = time.monotonic()
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+                if time.monotonic() >= next_replay:
+                    replay_spool(self.spool_dir, self.stale_after)
+                    next_replay = time.monotonic() + self.stale_after
+            except Exception:
+                logger.exception("Audit writer loop error")
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = AuditWriter(
+                settings.AUDIT_LOG_SPOOL_DIR,
+                batch_size=settings.AUDIT_LOG_BATCH_SIZE,
+                flush_interval=settings.AUDIT_LOG_FLUSH_INTERVAL,
+            )
+    return _writer
+
+
+def log_event(action, entity_type, description, user=None, entity_id=None, ip_address='0.0.0.0', user_agent=''):
+    """
+    Records an audit event, buffered when AUDIT_LOG_ASYNC is on and written
+    immediately otherwise. Inside a transaction a buffered event is only
+    recorded once the transaction commits, so a rolled-back action leaves no
+    trace; it keeps the time log_event() was called.
+    """
+    event = {
+        'user_id': getattr(user, 'pk', user),
+        'action': action,
+        'entity_type': entity_type,
+        'entity_id': entity_id,
+        'description': description,
+        'ip_address': ip_address,
+        'user_agent': (user_agent or '')[:255],
+    }
+    event['timestamp'] = timezone.now().isoformat()
+    if not settings.AUDIT_LOG_ASYNC:
+        # Part of the caller's transaction, so it rolls back with it
+        _to_model(event).save()
+        return
+    transaction.on_commit(lambda: get_writer().record(event))
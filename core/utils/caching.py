@@ -0,0 +1,173 @@
+"""
+Namespaced, instrumented access to the shared cache.
+
+settings.CACHES defines one alias per app namespace (see CACHE_NAMESPACES),
+all on the same backend but each with its own KEY_PREFIX and LOCATION, so
+`core`, `mis`, `citizen` and `state` keys never collide and culling or
+clearing one namespace leaves the others alone. `get_cache(namespace)`
+wraps an alias and counts hits and misses; the counts are pushed to the
+default cache every METRICS_FLUSH_INTERVAL seconds so `cache_metrics()`
+reports totals across all worker processes (approximate: file and database
+backends don't increment atomically).
+"""
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends import filebased
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+METRICS_FLUSH_INTERVAL = 10
+_MISSING = object()
+
+
+def metrics_key(namespace, kind):
+    return f'cache_metrics:{namespace}:{kind}'
+
+
+class FileBasedCache(filebased.FileBasedCache):
+    """
+    Django's file cache, except that the directory is listed to check
+    MAX_ENTRIES at most once every OPTIONS['CULL_INTERVAL'] seconds per
+    process instead of on every write.
+    """
+    _culled_at = {}
+    _culled_lock = threading.Lock()
+
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        self._cull_interval = params.get('OPTIONS', {}).get('CULL_INTERVAL', 60)
+
+    def _cull(self):
+        now = time.monotonic()
+        with self._culled_lock:
+            culled_at = self._culled_at.get(self._dir)
+            if culled_at is not None and now - culled_at < self._cull_interval:
+                return
+            self._culled_at[self._dir] = now
+        super()._cull()
+
+
+class InstrumentedCache:
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._hits = self._misses = 0
+        self._flushed_at = time.monotonic()
+
+    @property
+    def backend(self):
+        # caches[] is per thread; look it up on every call
+        return caches[self.namespace]
+
+    def _record(self, hits, misses):
+        with self._lock:
+            self._hits += hits
+            self._misses += misses
+            due = time.monotonic() - self._flushed_at >= METRICS_FLUSH_INTERVAL
+        if due:
+            self.flush_metrics()
+
+    def flush_metrics(self):
+        with self._lock:
+            hits, misses = self._hits, self._misses
+            self._hits = self._misses = 0
+            self._flushed_at = time.monotonic()
+        store = caches['default']
+        for kind, count in (('hits', hits), ('misses', misses)):
+            if not count:
+                continue
+            key = metrics_key(self.namespace, kind)
+            if not store.add(key, count, None):
+                try:
+                    store.incr(key, count)
+                except ValueError:
+                    store.set(key, count, None)
+
+    def get(self, key, default=None):
+        value = self.backend.get(key, _MISSING)
+        if value is _MISSING:
+            self._record(0, 1)
+            return default
+        self._record(1, 0)
+        return value
+
+    def get_many(self, keys):
+        keys = list(keys)
+        found = self.backend.get_many(keys)
+        self._record(len(found), len(keys) - len(found))
+        return found
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = default() if callable(default) else default
+            self.set(key, value, timeout)
+        return value
+
+    # timeout=None stores without expiry, as with Django's cache API
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        self.backend.set(key, value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT):
+        return self.backend.set_many(data, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT):
+        return self.backend.add(key, value, timeout)
+
+    def delete(self, key):
+        return self.backend.delete(key)
+
+    def delete_many(self, keys):
+        return self.backend.delete_many(keys)
+
+    def local_counts(self):
+        with self._lock:
+            return self._hits, self._misses
+
+
+_namespaces = {}
+_namespaces_lock = threading.Lock()
+
+
+def get_cache(namespace):
+    if namespace not in settings.CACHE_NAMESPACES:
+        raise KeyError(f"Unknown cache namespace '{namespace}'")
+    with _namespaces_lock:
+        if namespace not in _namespaces:
+            _namespaces[namespace] = InstrumentedCache(namespace)
+        return _namespaces[namespace]
+
+
+def cache_metrics():
+    """
+    {namespace: {'hits', 'misses', 'hit_ratio'}} across all processes,
+    including this process's counts not yet flushed.
+    """
+    store = caches['default']
+    metrics = {}
+    for namespace in settings.CACHE_NAMESPACES:
+        hits = store.get(metrics_key(namespace, 'hits'), 0)
+        misses = store.get(metrics_key(namespace, 'misses'), 0)
+        if namespace in _namespaces:
+            local_hits, local_misses = _namespaces[namespace].local_counts()
+            hits, misses = hits + local_hits, misses + local_misses
+        total = hits + misses
+        metrics[namespace] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 3) if total else None,
+        }
+    return metrics
+
+
+def clear_all():
+    for alias in ('default',) + tuple(settings.CACHE_NAMESPACES):
+        caches[alias].clear()
+
+
+def reset_metrics():
+    caches['default'].delete_many([metrics_key(ns, kind) for ns in settings.CACHE_NAMESPACES for kind in ('hits', 'misses')])
+    for cache in _namespaces.values():
+        with cache._lock:
+            cache._hits = cache._misses = 0
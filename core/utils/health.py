@@ -0,0 +1,320 @@
+"""
+Runtime health metrics shared across worker processes.
+
+Each process keeps one Collector, fed by
+core.middleware.QueryInstrumentationMiddleware: request and SQL query
+latency histograms plus request and 5xx counts. Every FLUSH_INTERVAL seconds
+the collector publishes its latest interval, resident memory and CPU use to
+the shared `state` cache under its pid (core.utils.workers). Workers that
+stop reporting age out after WORKER_TTL seconds.
+
+`snapshot()` merges the live workers' intervals from the last
+WINDOW_SECONDS. It also checks the database connection and the disk that
+holds MEDIA_ROOT at the time of the call. /healthz and the admin dashboard
+both use it.
+"""
+import bisect
+import os
+import shutil
+import time
+from django.conf import settings
+from django.db import connection, DatabaseError
+from django.utils import timezone
+from core.utils.workers import WorkerCollector, live_worker_reports, publish_worker_report
+
+# Bucket upper bounds in ms; one extra bucket catches anything slower
+REQUEST_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+QUERY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+FLUSH_INTERVAL = 10
+WINDOW_SECONDS = 5 * 60
+WORKER_TTL = WINDOW_SECONDS + 3 * FLUSH_INTERVAL
+WORKER_PREFIX = 'health'
+
+
+def bucket_index(bounds, ms):
+    return bisect.bisect_left(bounds, ms)
+
+
+def histogram_percentile(bounds, counts, pct, max_ms):
+    """
+    Upper bound of the bucket holding the pct-th percentile, or the slowest
+    observation when that falls in the overflow bucket. None without data.
+    """
+    total = sum(counts)
+    if not total:
+        return None
+    rank = pct / 100 * total
+    seen = 0
+    for index, count in enumerate(counts):
+        seen += count
+        if seen >= rank and count:
+            return min(bounds[index], max_ms) if index < len(bounds) else max_ms
+    return max_ms
+
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def observe(self, ms):
+        self.counts[bucket_index(self.bounds, ms)] += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def merge(self, data):
+        for index, count in enumerate(data['counts']):
+            self.counts[index] += count
+        self.total_ms += data['total_ms']
+        self.max_ms = max(self.max_ms, data['max_ms'])
+
+    def to_dict(self):
+        return {'counts': list(self.counts), 'total_ms': round(self.total_ms, 3), 'max_ms': round(self.max_ms, 3)}
+
+    def summary(self):
+        count = self.count
+        return {
+            'count': count,
+            'mean': round(self.total_ms / count, 2) if count else None,
+            'p50': histogram_percentile(self.bounds, self.counts, 50, round(self.max_ms, 2)),
+            'p95': histogram_percentile(self.bounds, self.counts, 95, round(self.max_ms, 2)),
+            'p99': histogram_percentile(self.bounds, self.counts, 99, round(self.max_ms, 2)),
+            'max': round(self.max_ms, 2) if count else None,
+        }
+
+
+def process_rss_bytes():
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Peak rather than current RSS; ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def system_memory():
+    """
+    (total_bytes, available_bytes) from /proc/meminfo, or (None, None).
+    """
+    values = {}
+    try:
+        with open('/proc/meminfo') as meminfo:
+            for line in meminfo:
+                name, _, rest = line.partition(':')
+                if name in ('MemTotal', 'MemAvailable'):
+                    values[name] = int(rest.split()[0]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return values.get('MemTotal'), values.get('MemAvailable')
+
+
+def load_average():
+    try:
+        return [round(value, 2) for value in os.getloadavg()]
+    except (OSError, AttributeError):
+        return None
+
+
+class Collector(WorkerCollector):
+    def _start(self):
+        super()._start()
+        self.started_at = time.time()
+        self._intervals = []
+        self._new_interval()
+        self._flushed_at = time.monotonic()
+        self._cpu_mark = (time.monotonic(), time.process_time())
+
+    def _new_interval(self):
+        self._requests = Histogram(REQUEST_BUCKETS_MS)
+        self._queries = Histogram(QUERY_BUCKETS_MS)
+        self._errors = 0
+
+    def observe_request(self, total_ms, status_code, query_counts=None, query_ms=0.0, query_max_ms=0.0):
+        """
+        query_counts is a QUERY_BUCKETS_MS histogram of the request's queries.
+        """
+        with self._lock:
+            self._own_process()
+            self._requests.observe(total_ms)
+            if status_code >= 500:
+                self._errors += 1
+            if query_counts:
+                self._queries.merge({'counts': query_counts, 'total_ms': query_ms, 'max_ms': query_max_ms})
+            due = time.monotonic() - self._flushed_at >= FLUSH_INTERVAL
+        if due:
+            self.flush()
+
+    def _cpu_percent(self):
+        wall, cpu = time.monotonic(), time.process_time()
+        last_wall, last_cpu = self._cpu_mark
+        self._cpu_mark = (wall, cpu)
+        if wall - last_wall <= 0:
+            return 0.0
+        return round(100 * (cpu - last_cpu) / (wall - last_wall), 1)
+
+    def flush(self):
+        """
+        Publishes this worker's report to the shared cache.
+        """
+        now = time.time()
+        with self._lock:
+            self._own_process()
+            if self._requests.count:
+                self._intervals.append({
+                    'ended_at': now,
+                    'requests': self._requests.to_dict(),
+                    'queries': self._queries.to_dict(),
+                    'errors': self._errors,
+                })
+                self._new_interval()
+            self._intervals = [i for i in self._intervals if now - i['ended_at'] <= WINDOW_SECONDS]
+            self._flushed_at = time.monotonic()
+            report = {
+                'pid': self.pid,
+                'started_at': self.started_at,
+                'updated_at': now,
+                'rss_bytes': process_rss_bytes(),
+                'cpu_percent': self._cpu_percent(),
+                'intervals': list(self._intervals),
+            }
+        publish_worker_report(WORKER_PREFIX, report['pid'], report, WORKER_TTL)
+
+
+collector = Collector()
+
+
+def worker_reports():
+    """
+    Reports of the workers that published within WORKER_TTL.
+    """
+    return list(live_worker_reports(WORKER_PREFIX).values())
+
+
+def database_status():
+    start = time.perf_counter()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    except DatabaseError as exc:
+        return {'status': 'error', 'vendor': connection.vendor, 'error': exc.__class__.__name__}
+    return {
+        'status': 'ok',
+        'vendor': connection.vendor,
+        'latency_ms': round((time.perf_counter() - start) * 1000, 2),
+    }
+
+
+def storage_status(path=None):
+    path = str(path or settings.MEDIA_ROOT)
+    try:
+        usage = shutil.disk_usage(path)
+    except OSError as exc:
+        return {'status': 'error', 'path': path, 'error': exc.__class__.__name__}
+    percent = round(100 * usage.used / usage.total, 1) if usage.total else 0.0
+    warn_at = getattr(settings, 'HEALTH_DISK_WARN_PERCENT', 90)
+    return {
+        'status': 'degraded' if percent >= warn_at else 'ok',
+        'path': path,
+        'total_bytes': usage.total,
+        'used_bytes': usage.used,
+        'free_bytes': usage.free,
+        'percent': percent,
+    }
+
+
+def runtime_metrics(reports=None):
+    """
+    Request/query latency, error rate, memory and CPU merged across the live
+    workers' reports over the last WINDOW_SECONDS.
+    """
+    if reports is None:
+        reports = worker_reports()
+    now = time.time()
+    requests = Histogram(REQUEST_BUCKETS_MS)
+    queries = Histogram(QUERY_BUCKETS_MS)
+    errors = 0
+    for report in reports:
+        for interval in report['intervals']:
+            if now - interval['ended_at'] > WINDOW_SECONDS:
+                continue
+            requests.merge(interval['requests'])
+            queries.merge(interval['queries'])
+            errors += interval['errors']
+
+    cores = os.cpu_count() or 1
+    rss = sum(report['rss_bytes'] or 0 for report in reports)
+    total_memory, available_memory = system_memory()
+    return {
+        'window_seconds': WINDOW_SECONDS,
+        'uptime_seconds': int(now - min(report['started_at'] for report in reports)) if reports else 0,
+        'workers': [
+            {'pid': r['pid'], 'rss_bytes': r['rss_bytes'], 'cpu_percent': r['cpu_percent'],
+             'last_report_seconds': round(now - r['updated_at'], 1)}
+            for r in reports
+        ],
+        'requests': {**requests.summary(), 'errors': errors,
+                     'error_rate': round(errors / requests.count, 4) if requests.count else None},
+        'queries': queries.summary(),
+        'cpu': {
+            'cores': cores,
+            'percent': round(min(100.0, sum(r['cpu_percent'] for r in reports) / cores), 1),
+            'load_average': load_average(),
+        },
+        'memory': {
+            'workers_rss_bytes': rss,
+            'system_total_bytes': total_memory,
+            'system_available_bytes': available_memory,
+            'percent': round(100 * (1 - available_memory / total_memory), 1)
+            if total_memory and available_memory is not None else None,
+        },
+    }
+
+
+def snapshot(include_metrics=True):
+    """
+    Overall status ('ok', 'degraded' or 'error'), the database and storage
+    checks and, with include_metrics, runtime_metrics() after publishing
+    this process's pending interval.
+    """
+    database = database_status()
+    storage = storage_status()
+    if database['status'] == 'error':
+        status = 'error'
+    elif storage['status'] != 'ok':
+        status = 'degraded'
+    else:
+        status = 'ok'
+    health = {
+        'status': status,
+        'timestamp': timezone.now().isoformat(),
+        'database': database,
+        'storage': storage,
+    }
+    if include_metrics:
+        collector.flush()
+        health.update(runtime_metrics())
+    return health
+
+
+def humanize_duration(seconds):
+    days, rest = divmod(int(seconds), 86400)
+    hours, rest = divmod(rest, 3600)
+    minutes = rest // 60
+    if days:
+        return f'{days}d {hours}h'
+    if hours:
+        return f'{hours}h {minutes}m'
+    return f'{minutes}m'
@@ -0,0 +1,130 @@
+"""
+Cached building blocks of the public home page.
+
+Each fragment (department map data, headline stats, alerts, news, notices)
+is cached separately and dropped by signals when its source changes, so a
+new announcement does not throw away the department map. Announcement
+fragments also expire no later than the first item in them does.
+
+With settings.HOME_PAGE_CACHE_SECONDS > 0 the whole rendered page is cached
+for anonymous visitors as well; any fragment invalidation drops it too. That
+page is rendered with CSRF_PLACEHOLDER as its csrf_token, which
+fill_csrf_token() replaces with the visitor's own token on every response.
+"""
+import hashlib
+from django.conf import settings
+from core.utils.caching import get_cache
+from django.db.models import Q
+from django.middleware.csrf import get_token
+from django.utils import timezone
+
+FRAGMENT_TIMEOUT = 300
+PAGE_KEY = 'home:page'
+CSRF_PLACEHOLDER = 'home-page-csrf-token'
+ANNOUNCEMENT_FRAGMENTS = ('alerts', 'news', 'notices')
+
+
+def fragment_key(name):
+    return f'home:fragment:{name}'
+
+
+def _departments():
+    from core.models import Department
+    dept_list = []
+    for name, lat, lng in Department.objects.filter(is_active=True).values_list('department_name', 'latitude', 'longitude'):
+        if lat and lng:
+            try:
+                dept_list.append({'name': name, 'lat': float(lat), 'lng': float(lng)})
+            except (ValueError, TypeError):
+                continue
+    return dept_list
+
+
+def _stats():
+    try:
+        from core.utils import mis_rollup
+        totals = mis_rollup.status_totals()
+        total_apps = sum(totals.values())
+        issued_certs = totals.get('approved', 0)
+    except Exception:
+        total_apps = 12500
+        issued_certs = 9800
+    return {
+        'total': total_apps,
+        'issued': issued_certs,
+        'satisfaction': 98,
+        'time': 3
+    }
+
+
+def _announcements(categories, limit=None):
+    from core.models import Announcement
+    now = timezone.now()
+    items = Announcement.objects.filter(category__in=categories, is_active=True).filter(
+        Q(expires_at__isnull=True) | Q(expires_at__gte=now)
+    )
+    return list(items[:limit] if limit else items)
+
+
+# name -> builder returning a picklable value
+BUILDERS = {
+    'departments': _departments,
+    'stats': _stats,
+    'alerts': lambda: _announcements(['alert']),
+    'news': lambda: _announcements(['news', 'policy'], limit=3),
+    'notices': lambda: _announcements(['circular', 'tender', 'deadline'], limit=5),
+}
+
+
+def _timeout(value):
+    # Don't keep showing an announcement after it expires
+    expiries = [item.expires_at for item in value if getattr(item, 'expires_at', None)] if isinstance(value, list) else []
+    if not expiries:
+        return FRAGMENT_TIMEOUT
+    seconds = int((min(expiries) - timezone.now()).total_seconds()) + 1
+    return max(1, min(FRAGMENT_TIMEOUT, seconds))
+
+
+def get_fragments():
+    """
+    All home page fragments, fetching the cached ones in a single round trip.
+    """
+    cached = get_cache('core').get_many([fragment_key(name) for name in BUILDERS])
+    fragments = {}
+    for name, builder in BUILDERS.items():
+        value = cached.get(fragment_key(name))
+        if value is None:
+            value = builder()
+            get_cache('core').set(fragment_key(name), value, _timeout(value))
+        fragments[name] = value
+    return fragments
+
+
+def invalidate(*names):
+    get_cache('core').delete_many([fragment_key(name) for name in (names or BUILDERS)] + [PAGE_KEY])
+
+
+def page_timeout():
+    return getattr(settings, 'HOME_PAGE_CACHE_SECONDS', 0)
+
+
+def get_page():
+    """
+    Returns (content, etag) of the cached anonymous page, or None.
+    """
+    return get_cache('core').get(PAGE_KEY) if page_timeout() else None
+
+
+def fill_csrf_token(request, content):
+    return content.replace(CSRF_PLACEHOLDER.encode(), get_token(request).encode())
+
+
+def set_page(content, fragments):
+    """
+    Caches the rendered anonymous page (never longer than its fragments stay
+    valid) and returns its ETag.
+    """
+    etag = f'"{hashlib.md5(content).hexdigest()}"'
+    timeout = min([page_timeout()] + [_timeout(value) for value in fragments.values()])
+    get_cache('core').set(PAGE_KEY, (content, etag), timeout)
+    return etag
@@ -1,20 +1,188 @@
-from django.db.models import Count, Q
-from core.models import User, OfficerAssignment
+from django.db import connection, transaction
+from django.db.models import Count, Exists, F, Q
+from core.models import User, OfficerAssignment, OfficerWorkload
 
-def auto_assign_officer(application):
+OPEN_STATUSES = ('pending', 'under_review')
+
+
+def _candidates(department_id=None):
+    workloads = OfficerWorkload.objects.filter(officer__role='officer', officer__is_active=True)
+    if department_id is not None:
+        scoped = workloads.filter(department_id=department_id)
+        if scoped.exists():
+            return scoped
+    return workloads
+
+
+def _lock_options():
+    # Lock only the workload rows, not the joined user rows, where supported
+    if connection.features.has_select_for_update_of:
+        return {'of': ('self',)}
+    return {}
+
+
+def _serialize_without_row_locks():
+    """
+    SQLite ignores select_for_update(). Writing first makes the transaction
+    take the database write lock before it reads any workload, so concurrent
+    submits run one at a time instead of all picking the same officer.
+    """
+    if not connection.features.has_select_for_update:
+        OfficerWorkload.objects.filter(pk=0).update(open_assignments=0)
+
+
+def _lock_least_loaded(workloads):
+    """
+    Locks and returns the least loaded workload row. On backends with row locks,
+    SKIP LOCKED lets concurrent submits fan out to different officers instead of
+    queueing on the same row.
+    """
+    workloads = workloads.order_by('open_assignments', 'officer_id')
+    if connection.features.has_select_for_update_skip_locked:
+        row = workloads.select_for_update(skip_locked=True, **_lock_options()).first()
+        if row:
+            return row
+    return workloads.select_for_update(**_lock_options()).first()
+
+
+def auto_assign_officer(application, department_id=None):
     """
     Intelligent routing: Assigns application to the officer with the least current workload.
+    Officers whose workload is scoped to the application's department are preferred;
+    if the department has none, the whole officer pool is used.
     """
-    officers = User.objects.filter(role='officer', is_active=True)
-    
-    officer = officers.annotate(
-        workload=Count('assigned_tasks', filter=Q(assigned_tasks__application__status__in=['pending', 'under_review']))
-    ).order_by('workload').first()
-    
-    if officer:
+    if department_id is None:
+        department_id = application.service.department_id
+
+    with transaction.atomic():
+        _serialize_without_row_locks()
+        workload = _lock_least_loaded(_candidates(department_id))
+        if not workload:
+            return None
         OfficerAssignment.objects.create(
-            officer=officer,
-            application=application
+            officer_id=workload.officer_id,
+            application=application,
+            workload_at_assignment=workload.open_assignments
+        )
+        OfficerWorkload.objects.filter(pk=workload.pk).update(
+            open_assignments=F('open_assignments') + 1, total_assignments=F('total_assignments') + 1
         )
-        return officer
-    return None
+    return workload.officer
+
+
+def adjust_workload(application, delta):
+    """
+    Adds `delta` to the open workload of every officer assigned to `application`.
+    Call with -1 when the application is closed (approved / rejected) and +1 if
+    a closed application is reopened for review.
+    """
+    officer_ids = OfficerAssignment.objects.filter(application=application).values('officer_id')
+    workloads = OfficerWorkload.objects.filter(officer_id__in=officer_ids)
+    if delta < 0:
+        workloads = workloads.filter(open_assignments__gte=-delta)
+    workloads.update(open_assignments=F('open_assignments') + delta)
+
+
+def release_assignment(assignment):
+    """
+    Takes a deleted assignment off its officer's total, and off their open
+    workload if its application was still open.
+    """
+    from core.models import Application
+
+    workloads = OfficerWorkload.objects.filter(officer_id=assignment.officer_id)
+    workloads.filter(total_assignments__gte=1).update(total_assignments=F('total_assignments') - 1)
+    is_open = Exists(Application.objects.filter(pk=assignment.application_id, status__in=OPEN_STATUSES))
+    workloads.filter(open_assignments__gte=1).filter(is_open).update(
+        open_assignments=F('open_assignments') - 1
+    )
+
+
+def recount_workload(officer):
+    """
+    Recomputes one officer's workload counters, creating the row if needed.
+    """
+    counts = OfficerAssignment.objects.filter(officer=officer).aggregate(
+        open_count=Count('id', filter=Q(application__status__in=OPEN_STATUSES)),
+        total_count=Count('id'),
+    )
+    OfficerWorkload.objects.update_or_create(officer=officer, defaults={
+        'open_assignments': counts['open_count'], 'total_assignments': counts['total_count'],
+    })
+
+
+def rebuild_workloads():
+    """
+    Recomputes every officer's workload counters from the assignment table
+    and creates missing rows. Returns the number of officers processed.
+    """
+    officers = User.objects.filter(role='officer').annotate(
+        open_count=Count('assigned_tasks', filter=Q(assigned_tasks__application__status__in=OPEN_STATUSES)),
+        total_count=Count('assigned_tasks'),
+    )
+    with transaction.atomic():
+        processed = 0
+        for officer in officers.iterator():
+            OfficerWorkload.objects.update_or_create(
+                officer=officer, defaults={'open_assignments': officer.open_count, 'total_assignments': officer.total_count}
+            )
+            processed += 1
+    return processed
+
+
+def _pick(officers, department_id):
+    """
+    Picks the least loaded officer from the in-memory `officers` list, preferring
+    those scoped to `department_id`. Each entry is [open_count, officer_id, department_id].
+    """
+    scoped = [o for o in officers if o[2] == department_id]
+    return min(scoped or officers)
+
+
+def assign_backlog(batch_size=500, limit=None):
+    """
+    Drains the unassigned backlog of open applications in batches. For each batch
+    the officers' workload rows are locked and read once, applications are
+    distributed in memory, and the assignments are written with a single
+    bulk_create in the same transaction. Returns the number of applications assigned.
+    """
+    from core.models import Application
+
+    assigned = 0
+    while limit is None or assigned < limit:
+        size = batch_size if limit is None else min(batch_size, limit - assigned)
+        with transaction.atomic():
+            _serialize_without_row_locks()
+            workloads = OfficerWorkload.objects.filter(officer__role='officer', officer__is_active=True)
+            officers = [
+                [w.open_assignments, w.officer_id, w.department_id]
+                for w in workloads.select_for_update(**_lock_options())
+            ]
+            if not officers:
+                break
+            backlog = list(
+                Application.objects.filter(status__in=OPEN_STATUSES, officer_assignments__isnull=True)
+                .order_by('applied_date', 'id')
+                .values_list('id', 'service__department_id')[:size]
+            )
+            if not backlog:
+                break
+
+            assignments = []
+            for app_id, department_id in backlog:
+                officer = _pick(officers, department_id)
+                assignments.append(OfficerAssignment(
+                    officer_id=officer[1], application_id=app_id, workload_at_assignment=officer[0]
+                ))
+                officer[0] += 1
+            OfficerAssignment.objects.bulk_create(assignments, batch_size=batch_size)
+
+            added = {}
+            for assignment in assignments:
+                added[assignment.officer_id] = added.get(assignment.officer_id, 0) + 1
+            for officer_id, count in added.items():
+                OfficerWorkload.objects.filter(officer_id=officer_id).update(
+                    open_assignments=F('open_assignments') + count, total_assignments=F('total_assignments') + count
+                )
+        assigned += len(backlog)
+    return assigned
@@ -0,0 +1,137 @@
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+from core.models import Application, ApplicationStatsRollup
+
+
+def rollup_key(application):
+    """
+    Returns the (day, service_id, status) bucket an application is counted in,
+    or None if it has not been saved yet.
+    """
+    return _key(application.applied_date, application.service_id, application.status)
+
+
+def _key(applied_date, service_id, status):
+    if not applied_date:
+        return None
+    return (timezone.localdate(applied_date), service_id, status)
+
+
+def stored_key(application):
+    """
+    The bucket a saved application is counted in right now: from the values
+    it was loaded with (Application.from_db), or read from the database when
+    one of them was deferred or the instance was built by hand.
+    """
+    if application._state.adding or application.pk is None:
+        return None
+    loaded = getattr(application, '_rollup_loaded', None)
+    if loaded is None:
+        loaded = Application.objects.filter(pk=application.pk).values_list(*Application.ROLLUP_FIELDS).first()
+        if loaded is None:
+            return None
+    return _key(*loaded)
+
+
+def remember(application):
+    """
+    Records the values just written as the ones stored_key() starts from.
+    """
+    values = application.__dict__
+    loaded = all(name in values for name in Application.ROLLUP_FIELDS)
+    application._rollup_loaded = tuple(values[name] for name in Application.ROLLUP_FIELDS) if loaded else None
+
+
+def apply_delta(key, delta):
+    """
+    Atomically adds `delta` to the counter for `key`, creating the row on first use.
+    """
+    if key is None or delta == 0:
+        return
+    day, service_id, status = key
+    rows = ApplicationStatsRollup.objects.filter(day=day, service_id=service_id, status=status)
+    if rows.update(count=F('count') + delta) or delta < 0:
+        return
+    row, _ = ApplicationStatsRollup.objects.get_or_create(day=day, service_id=service_id, status=status)
+    ApplicationStatsRollup.objects.filter(pk=row.pk).update(count=F('count') + delta)
+
+
+def move(old_key, new_key):
+    """
+    Moves one application from the `old_key` bucket to `new_key`.
+    """
+    if old_key == new_key:
+        return
+    apply_delta(old_key, -1)
+    apply_delta(new_key, 1)
+
+
+def rebuild_rollups():
+    """
+    Recomputes every rollup row from the Application table. Needed after bulk
+    `.update()` calls or raw SQL, which bypass the incremental signal handlers.
+    Returns the number of rows written.
+    """
+    buckets = Application.objects.values('applied_date__date', 'service_id', 'status').annotate(
+        total=Count('id')
+    ).order_by()
+    rows = [
+        ApplicationStatsRollup(
+            day=b['applied_date__date'],
+            service_id=b['service_id'],
+            status=b['status'],
+            count=b['total'],
+        )
+        for b in buckets.iterator()
+    ]
+    with transaction.atomic():
+        ApplicationStatsRollup.objects.all().delete()
+        ApplicationStatsRollup.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def status_totals():
+    """
+    Returns {status: count} over all applications.
+    """
+    totals = ApplicationStatsRollup.objects.values('status').annotate(total=Sum('count')).order_by()
+    return {row['status']: row['total'] for row in totals}
+
+
+def daily_totals(since):
+    """
+    Returns {date: count} of applications applied on or after `since`.
+    """
+    totals = ApplicationStatsRollup.objects.filter(day__gte=since).values('day').annotate(
+        total=Sum('count')
+    ).order_by()
+    return {row['day']: row['total'] for row in totals}
+
+
+def top_services(limit=10):
+    """
+    Returns the `limit` services with the most applications as dicts with
+    `service_name` and `app_count`.
+    """
+    return list(
+        ApplicationStatsRollup.objects.values('service_id', service_name=F('service__service_name')).annotate(
+            app_count=Sum('count')
+        ).filter(app_count__gt=0).order_by('-app_count')[:limit]
+    )
+
+
+def department_totals():
+    """
+    Returns per-department total/approved/pending counts as dicts shaped like
+    the old annotated Department queryset used by the MIS template.
+    """
+    return list(
+        ApplicationStatsRollup.objects.values(
+            'service__department_id', department_name=F('service__department__department_name')
+        ).annotate(
+            app_count=Sum('count'),
+            approved_count=Sum('count', filter=Q(status='approved'), default=0),
+            pending_count=Sum('count', filter=Q(status='pending'), default=0),
+        ).filter(app_count__gt=0).order_by('-app_count')
+    )
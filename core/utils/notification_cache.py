@@ -0,0 +1,34 @@
+from core.models import Notification
+from core.utils.caching import get_cache
+
+SUMMARY_TIMEOUT = 300
+RECENT_LIMIT = 5
+
+
+def summary_key(user_id):
+    return f'notifications:summary:{user_id}'
+
+
+def get_summary(user_id):
+    """
+    Returns {'recent': [up to 5 unread notifications], 'count': unread total}
+    for the user, from cache when warm.
+    """
+    key = summary_key(user_id)
+    summary = get_cache('core').get(key)
+    if summary is None:
+        unread = Notification.objects.filter(user_id=user_id, is_read=False)
+        summary = {
+            'recent': list(unread.order_by('-created_at')[:RECENT_LIMIT]),
+            'count': unread.count(),
+        }
+        get_cache('core').set(key, summary, SUMMARY_TIMEOUT)
+    return summary
+
+
+def invalidate(user_id):
+    get_cache('core').delete(summary_key(user_id))
+
+
+def invalidate_many(user_ids):
+    get_cache('core').delete_many([summary_key(user_id) for user_id in user_ids])
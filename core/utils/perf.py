@@ -0,0 +1,218 @@
+"""
+Per-view request metrics collected by core.middleware.QueryInstrumentationMiddleware.
+
+Every request produces one sample: SQL query count, SQL time, template
+render time, total time and response size. Samples are logged to the
+`egovernance.perf` logger, and each process keeps the last
+SAMPLES_PER_VIEW samples of each view. Every FLUSH_INTERVAL seconds a
+process publishes them to the shared `state` cache under its own pid
+(core.utils.workers), so workers never overwrite each other's samples;
+the /admin-panel/perf/ page merges the workers' samples on read.
+
+settings.QUERY_BUDGETS maps view names (e.g. 'api:dept_stats') to the most
+queries one request may run. Over-budget requests are logged as warnings,
+or raise QueryBudgetExceeded when settings.QUERY_BUDGET_ENFORCE is on (as it
+is for the test suite).
+"""
+import contextvars
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from django.conf import settings
+from core.utils import health
+from core.utils.caching import get_cache
+from core.utils.workers import WorkerCollector, live_worker_reports, publish_worker_report
+
+logger = logging.getLogger('egovernance.perf')
+
+METRICS = ('queries', 'sql_ms', 'render_ms', 'total_ms', 'bytes')
+SAMPLES_PER_VIEW = 500
+FLUSH_INTERVAL = 10
+# A worker's samples outlive it by a day, then drop out of the summaries
+WORKER_TTL = 24 * 3600
+WORKER_PREFIX = 'perf'
+RESET_KEY = 'perf:reset_at'
+
+# Render time of the request currently being handled on this thread/task
+current_render = contextvars.ContextVar('perf_current_render', default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class PerfLogFormatter(logging.Formatter):
+    """
+    One JSON object per line: timestamp, level, message, view and metrics.
+    """
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record),
+            'level': record.levelname,
+            'message': record.getMessage(),
+            'view': getattr(record, 'view', None),
+        }
+        entry.update({metric: getattr(record, metric) for metric in METRICS if hasattr(record, metric)})
+        return json.dumps(entry)
+
+
+def query_budget(view_name):
+    budgets = getattr(settings, 'QUERY_BUDGETS', {})
+    return budgets.get(view_name, getattr(settings, 'QUERY_BUDGET_DEFAULT', None))
+
+
+def check_budget(view_name, queries):
+    budget = query_budget(view_name)
+    if budget is None or queries <= budget:
+        return
+    message = f"{view_name} ran {queries} SQL queries (budget {budget})"
+    if getattr(settings, 'QUERY_BUDGET_ENFORCE', False):
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+class SQLCounter:
+    """
+    connection.execute_wrapper() hook counting queries and their time, with
+    a core.utils.health.QUERY_BUCKETS_MS histogram of query latency.
+    """
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.histogram = [0] * (len(health.QUERY_BUCKETS_MS) + 1)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.seconds += elapsed
+            self.max_seconds = max(self.max_seconds, elapsed)
+            self.histogram[health.bucket_index(health.QUERY_BUCKETS_MS, elapsed * 1000)] += 1
+            self.queries += 1
+
+
+_installed = False
+_install_lock = threading.Lock()
+
+
+def install_render_timer():
+    """
+    Times every top-level template render (the backend Template.render that
+    django.shortcuts.render goes through) into `current_render`.
+    """
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        from django.template.backends.django import Template
+        original = Template.render
+
+        def timed_render(self, context=None, request=None):
+            timer = current_render.get()
+            if timer is None:
+                return original(self, context, request)
+            start = time.perf_counter()
+            try:
+                return original(self, context, request)
+            finally:
+                timer[0] += time.perf_counter() - start
+
+        Template.render = timed_render
+        _installed = True
+
+
+class SampleBuffer(WorkerCollector):
+    """
+    This process's last SAMPLES_PER_VIEW (time, sample) pairs per view.
+    """
+    def _start(self):
+        super()._start()
+        self._samples = {}
+        self._changed = False
+        self._flushed_at = time.monotonic()
+
+    def add(self, view_name, sample):
+        with self._lock:
+            self._own_process()
+            if view_name not in self._samples:
+                self._samples[view_name] = deque(maxlen=SAMPLES_PER_VIEW)
+            self._samples[view_name].append((time.time(), sample))
+            self._changed = True
+            due = time.monotonic() - self._flushed_at >= FLUSH_INTERVAL
+        if due:
+            self.flush()
+
+    def clear(self):
+        with self._lock:
+            self._samples = {}
+
+    def flush(self):
+        """
+        Publishes this worker's samples to the shared cache.
+        """
+        with self._lock:
+            self._own_process()
+            changed, self._changed = self._changed, False
+            self._flushed_at = time.monotonic()
+            report = {view: list(samples) for view, samples in self._samples.items() if samples}
+        if not changed:
+            return
+        publish_worker_report(WORKER_PREFIX, self.pid, report, WORKER_TTL)
+
+
+buffer = SampleBuffer()
+
+
+def record(view_name, sample):
+    logger.info("request metrics", extra={'view': view_name, **sample})
+    buffer.add(view_name, sample)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def view_summaries():
+    """
+    [{'view', 'count', 'budget', '<metric>': {'p50', 'p95', 'p99', 'max'}}]
+    over every worker's samples since the last reset(), slowest first.
+    """
+    buffer.flush()
+    reset_at = get_cache('state').get(RESET_KEY, 0)
+    by_view = defaultdict(list)
+    for report in live_worker_reports(WORKER_PREFIX).values():
+        for view, samples in report.items():
+            by_view[view].extend(sample for at, sample in samples if at > reset_at)
+    summaries = []
+    for view, samples in by_view.items():
+        if not samples:
+            continue
+        summary = {'view': view, 'count': len(samples), 'budget': query_budget(view)}
+        for metric in METRICS:
+            values = sorted(s[metric] for s in samples)
+            summary[metric] = {
+                'p50': percentile(values, 50),
+                'p95': percentile(values, 95),
+                'p99': percentile(values, 99),
+                'max': values[-1],
+            }
+        summaries.append(summary)
+    summaries.sort(key=lambda s: s['total_ms']['p95'], reverse=True)
+    return summaries
+
+
+def reset():
+    """
+    Drops the samples recorded so far by every worker: older samples still
+    held by other workers are ignored from now on.
+    """
+    get_cache('state').set(RESET_KEY, time.time(), None)
+    buffer.clear()
@@ -0,0 +1,100 @@
+"""
+The one SLA classification used by every view, report and count.
+
+An application is
+    completed      approved or rejected
+    delayed        open and past its sla_deadline
+    near_deadline  open and past sla_near_at: within its last
+                   near_window_days() working days, i.e. NEAR_DEADLINE_SHARE
+                   of the service's processing days but never fewer than
+                   NEAR_DEADLINE_DAYS, counted on the same department
+                   calendar as the deadline (see core.utils.sla_calendar)
+    on_time        any other open application
+
+`annotate_sla()` computes this in the database as `sla_rank` (an index into
+BUCKETS, most urgent first), so lists can be filtered and sorted by bucket
+without loading rows; `bucket_q()` gives the same buckets as filters for
+Count(). `classify()` applies the rule to one instance already in memory.
+"""
+import math
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.utils import timezone
+
+COMPLETED_STATUSES = ('approved', 'rejected')
+NEAR_DEADLINE_DAYS = 2
+NEAR_DEADLINE_SHARE = 0.2
+
+BUCKETS = ('delayed', 'near_deadline', 'on_time', 'completed')
+LABELS = {
+    'delayed': 'Delayed',
+    'near_deadline': 'Near Deadline',
+    'on_time': 'On Time',
+    'completed': 'Completed',
+}
+
+
+def near_window_days(processing_days):
+    """
+    Working days before the deadline that an application is near_deadline.
+    """
+    return max(NEAR_DEADLINE_DAYS, math.ceil(NEAR_DEADLINE_SHARE * processing_days))
+
+
+def bucket_q(bucket, now, prefix=''):
+    """
+    `prefix` reaches Application through a relation (e.g. 'application__'
+    from OfficerAssignment).
+    """
+    deadline, near_at = f'{prefix}sla_deadline', f'{prefix}sla_near_at'
+    completed = Q(**{f'{prefix}status__in': COMPLETED_STATUSES})
+    if bucket == 'completed':
+        return completed
+    if bucket == 'delayed':
+        return ~completed & Q(**{f'{deadline}__lt': now})
+    if bucket == 'near_deadline':
+        return ~completed & Q(**{f'{deadline}__gte': now, f'{near_at}__lte': now})
+    if bucket == 'on_time':
+        return ~completed & Q(**{f'{deadline}__gte': now}) & (Q(**{f'{near_at}__gt': now}) | Q(**{f'{near_at}__isnull': True}))
+    raise ValueError(f"Unknown SLA bucket '{bucket}'")
+
+
+def sla_rank(now, prefix=''):
+    return Case(
+        When(bucket_q('completed', now, prefix), then=Value(BUCKETS.index('completed'))),
+        When(**{f'{prefix}sla_deadline__lt': now}, then=Value(BUCKETS.index('delayed'))),
+        When(**{f'{prefix}sla_near_at__lte': now}, then=Value(BUCKETS.index('near_deadline'))),
+        default=Value(BUCKETS.index('on_time')),
+        output_field=IntegerField(),
+    )
+
+
+def annotate_sla(queryset, now=None, prefix=''):
+    return queryset.annotate(sla_rank=sla_rank(now or timezone.now(), prefix))
+
+
+def classify(application, now=None):
+    now = now or timezone.now()
+    if application.status in COMPLETED_STATUSES:
+        return 'completed'
+    if application.sla_deadline < now:
+        return 'delayed'
+    if application.sla_near_at and application.sla_near_at <= now:
+        return 'near_deadline'
+    return 'on_time'
+
+
+def describe(application, now=None, rank=None):
+    """
+    Sets `sla_status` on `application` (from an annotated `rank` when given,
+    else classify()) plus `days_left` for open applications and
+    `days_overdue` for delayed ones. Returns the status.
+    """
+    now = now or timezone.now()
+    status = BUCKETS[rank] if rank is not None else classify(application, now)
+    application.sla_status = status
+    days_remaining = (application.sla_deadline - now).days
+    if status == 'delayed':
+        application.days_overdue = abs(days_remaining)
+    if status != 'completed':
+        application.days_left = days_remaining
+    return status
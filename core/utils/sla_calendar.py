@@ -0,0 +1,239 @@
+"""
+Working-day SLA deadlines.
+
+A service's processing_days are working days on its department's calendar
+(DepartmentCalendar working week, plus global and department Holidays).
+Counting starts the day after receipt; an application received after the
+closing time counts as received the next day. The deadline is the closing
+time of the last working day. The near_deadline window (sla_near_at) is
+measured on the same calendar: it opens at the closing time
+core.utils.sla.near_window_days() working days before the deadline.
+
+Each calendar is precomputed into a business-day offset table spanning
+TABLE_PAST_DAYS back to TABLE_FUTURE_DAYS ahead: for every date, the number
+of working days up to it, and the list of working dates. That makes
+`deadline()` two list lookups. Tables stay in process memory and are
+rebuilt when core.signals bumps the version on a Holiday or
+DepartmentCalendar change; the version is checked in the shared `state`
+cache at most every VERSION_CHECK_SECONDS.
+
+`recompute_deadlines()` (manage.py recompute_sla_deadlines) rewrites
+sla_deadline and sla_near_at for open applications after a calendar change.
+"""
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from core.models import Application, DepartmentCalendar, Holiday
+from core.utils import sla
+from core.utils.caching import get_cache
+from core.utils.intelligent_routing import OPEN_STATUSES
+
+TABLE_PAST_DAYS = 400
+TABLE_FUTURE_DAYS = 3 * 366
+VERSION_KEY = 'sla_calendar:version'
+VERSION_CHECK_SECONDS = 2
+UPDATE_CHUNK = 500
+
+
+def _parse_time(value):
+    if isinstance(value, str):
+        return datetime.strptime(value, '%H:%M').time()
+    return value
+
+
+class WorkCalendar:
+    def __init__(self, working_days, closing_time, holidays, today=None):
+        self.weekdays = frozenset(int(day) for day in working_days)
+        self.closing_time = _parse_time(closing_time)
+        self.holidays = frozenset(holidays)
+        self.tz = timezone.get_current_timezone()
+        # (received date, working days) -> deadline; few distinct keys per calendar
+        self._deadlines = {}
+        today = today or timezone.localdate()
+        self.built_on = today
+        self.start = today - timedelta(days=TABLE_PAST_DAYS)
+        self.end = today + timedelta(days=TABLE_FUTURE_DAYS)
+        # _worked_by[i]: working days in [start, start + i]; _working[k]: the (k+1)-th working date
+        self._worked_by = []
+        self._working = []
+        day = self.start
+        while day <= self.end:
+            if self.is_working_day(day):
+                self._working.append(day)
+            self._worked_by.append(len(self._working))
+            day += timedelta(days=1)
+
+    def is_working_day(self, day):
+        return day.weekday() in self.weekdays and day not in self.holidays
+
+    def add_working_days(self, day, count):
+        """
+        The count-th working day after `day` (`day` itself for count <= 0).
+        """
+        if count <= 0:
+            return day
+        offset = (day - self.start).days
+        if 0 <= offset < len(self._worked_by):
+            index = self._worked_by[offset] + count - 1
+            if index < len(self._working):
+                return self._working[index]
+        if not self.weekdays:
+            raise ValueError("Calendar has no working days")
+        # Outside the precomputed table: walk day by day
+        while count:
+            day += timedelta(days=1)
+            if self.is_working_day(day):
+                count -= 1
+        return day
+
+    def subtract_working_days(self, day, count):
+        """
+        The count-th working day before `day`.
+        """
+        offset = (day - self.start).days
+        if 0 <= offset < len(self._worked_by):
+            # Working days strictly before `day`
+            before = self._worked_by[offset] - (1 if self.is_working_day(day) else 0)
+            if before >= count:
+                return self._working[before - count]
+        if not self.weekdays:
+            raise ValueError("Calendar has no working days")
+        while count:
+            day -= timedelta(days=1)
+            if self.is_working_day(day):
+                count -= 1
+        return day
+
+    def near_at(self, deadline, working_days):
+        """
+        When `working_days` working days are left before `deadline`: the
+        closing time of the working day that many working days earlier.
+        """
+        day = self.subtract_working_days(deadline.astimezone(self.tz).date(), working_days)
+        return datetime.combine(day, self.closing_time, tzinfo=self.tz)
+
+    def deadline(self, received_at, working_days):
+        local = received_at.astimezone(self.tz)
+        received = local.date()
+        if local.time() > self.closing_time:
+            received += timedelta(days=1)
+        key = (received, working_days)
+        due = self._deadlines.get(key)
+        if due is None:
+            due = datetime.combine(self.add_working_days(received, working_days), self.closing_time, tzinfo=self.tz)
+            self._deadlines[key] = due
+        return due
+
+
+_lock = threading.Lock()
+_state = {'version': None, 'calendars': {}, 'checked_at': 0.0}
+
+
+def _current_version():
+    cache = get_cache('state')
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(VERSION_KEY, version, None):
+            version = cache.get(VERSION_KEY) or version
+    return version
+
+
+def _build(department_id):
+    config = DepartmentCalendar.objects.filter(department_id=department_id).first() if department_id else None
+    holidays = Holiday.objects.filter(Q(department__isnull=True) | Q(department_id=department_id)).values_list('date', flat=True)
+    if config is not None:
+        return WorkCalendar(config.working_days, config.closing_time, holidays)
+    return WorkCalendar(
+        getattr(settings, 'SLA_DEFAULT_WORKING_DAYS', '01234'),
+        getattr(settings, 'SLA_DEFAULT_CLOSING_TIME', '17:30'),
+        holidays,
+    )
+
+
+def get_calendar(department_id):
+    now = time.monotonic()
+    with _lock:
+        stale = now - _state['checked_at'] >= VERSION_CHECK_SECONDS
+    if stale:
+        version = _current_version()
+        with _lock:
+            if version != _state['version']:
+                _state.update(version=version, calendars={})
+            _state['checked_at'] = now
+    with _lock:
+        calendar = _state['calendars'].get(department_id)
+        # Tables are anchored on the day they were built
+        if calendar is not None and calendar.built_on == timezone.localdate():
+            return calendar
+    calendar = _build(department_id)
+    with _lock:
+        _state['calendars'][department_id] = calendar
+    return calendar
+
+
+def invalidate():
+    """
+    Publishes a new version so every process rebuilds its calendars.
+    """
+    get_cache('state').set(VERSION_KEY, uuid.uuid4().hex, None)
+    with _lock:
+        _state.update(version=None, calendars={}, checked_at=0.0)
+
+
+def deadline_for(service, received_at):
+    return get_calendar(service.department_id).deadline(received_at, service.processing_days)
+
+
+def near_deadline_at(service, deadline):
+    return get_calendar(service.department_id).near_at(deadline, sla.near_window_days(service.processing_days))
+
+
+def recompute_deadlines(department_id=None, due_from=None, batch_size=2000, dry_run=False):
+    """
+    Recomputes sla_deadline and sla_near_at for open applications
+    (optionally one department's, or only those currently due on or after
+    `due_from`). Rows are streamed as tuples in one pass; changed rows are
+    written every `batch_size` changes with one UPDATE per distinct new
+    (deadline, near) pair. Returns (scanned, changed).
+    """
+    apps = Application.objects.filter(status__in=OPEN_STATUSES)
+    if department_id is not None:
+        apps = apps.filter(service__department_id=department_id)
+    if due_from is not None:
+        apps = apps.filter(sla_deadline__gte=timezone.make_aware(datetime.combine(due_from, datetime.min.time())))
+    rows = apps.order_by().values_list(
+        'id', 'applied_date', 'sla_deadline', 'sla_near_at', 'service__processing_days', 'service__department_id',
+    )
+
+    scanned = changed = 0
+    calendars = {}
+    moved = defaultdict(list)
+
+    def flush():
+        for (deadline, near_at), ids in moved.items():
+            for start in range(0, len(ids), UPDATE_CHUNK):
+                Application.objects.filter(id__in=ids[start:start + UPDATE_CHUNK]).update(sla_deadline=deadline, sla_near_at=near_at)
+        moved.clear()
+
+    # A row moved by an earlier flush may be read again; it is then unchanged
+    for app_id, applied, current, current_near, days, dept_id in rows.iterator(chunk_size=batch_size):
+        scanned += 1
+        if dept_id not in calendars:
+            calendars[dept_id] = get_calendar(dept_id)
+        deadline = calendars[dept_id].deadline(applied, days)
+        near_at = calendars[dept_id].near_at(deadline, sla.near_window_days(days))
+        if (deadline, near_at) == (current, current_near):
+            continue
+        changed += 1
+        if not dry_run:
+            moved[deadline, near_at].append(app_id)
+            if changed % batch_size == 0:
+                flush()
+    flush()
+    return scanned, changed
@@ -0,0 +1,178 @@
+"""
+Proactive SLA monitoring.
+
+`scan()` finds open applications that crossed an SLA threshold since the
+previous scan and notifies the people involved:
+
+    near deadline   reached sla_near_at, i.e. entered core.utils.sla's
+                    near_deadline bucket -> assigned officers
+    breach level N  overdue by ESCALATION_STEPS[N - 1]
+                    -> assigned officers and the citizen, plus the
+                       department head from HEAD_FROM_LEVEL; open
+                       grievances about the application rise to level N
+
+Every threshold is a stored point in time (sla_near_at, or sla_deadline
+plus a step), so "crossed since the last scan" is a range between the
+previous watermark and now, read off app_open_near_idx or
+app_status_sla_idx instead of scanning every open application. An
+application submitted already inside its near window (a one or two
+working-day service) never crosses sla_near_at after submission, so it
+counts as crossing when it is submitted.
+
+The watermark is the SLAScanState row, locked for the length of the scan
+so two scanners never notify twice. However long the scanner was stopped,
+the next scan picks up everything crossed in between; the very first scan
+picks up everything already crossed.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from core.models import Application, GrievanceTicket, Notification, OfficerAssignment, SLAScanState
+from core.utils import notification_cache, system_config
+from core.utils.intelligent_routing import OPEN_STATUSES
+
+ESCALATION_STEPS = (timedelta(0), timedelta(days=3), timedelta(days=7))
+HEAD_FROM_LEVEL = 2
+OPEN_GRIEVANCE_STATUSES = ('open', 'in_progress')
+CHUNK_SIZE = 500
+
+ROW_FIELDS = ('id', 'application_number', 'user_id', 'sla_deadline', 'service__service_name', 'service__department__head_officer_id')
+
+
+def _open_applications():
+    return Application.objects.filter(status__in=OPEN_STATUSES).order_by()
+
+
+def near_deadline_crossings(since, now):
+    """
+    Open applications not yet overdue that became near_deadline in
+    (since, now]: their window opened then, or they were submitted then
+    inside it. With no `since`, every one near its deadline at `now`.
+    """
+    near = _open_applications().filter(sla_near_at__lte=now, sla_deadline__gte=now)
+    if since is None:
+        return near
+    return near.filter(Q(sla_near_at__gt=since) | Q(applied_date__gt=since))
+
+
+def breach_crossings(since, now, step):
+    """
+    Open applications that became overdue by `step` in [since, now), or
+    before `now` with no `since`.
+    """
+    breached = _open_applications().filter(sla_deadline__lt=now - step)
+    if since is None:
+        return breached
+    return breached.filter(sla_deadline__gte=since - step)
+
+
+def _assigned_officers(application_ids):
+    officers = defaultdict(set)
+    for start in range(0, len(application_ids), CHUNK_SIZE):
+        pairs = OfficerAssignment.objects.filter(
+            application_id__in=application_ids[start:start + CHUNK_SIZE]
+        ).values_list('application_id', 'officer_id')
+        for application_id, officer_id in pairs:
+            officers[application_id].add(officer_id)
+    return officers
+
+
+def _escalate_grievances(levels):
+    by_level = defaultdict(list)
+    for application_id, level in levels.items():
+        by_level[level].append(application_id)
+    escalated = 0
+    for level, application_ids in by_level.items():
+        for start in range(0, len(application_ids), CHUNK_SIZE):
+            escalated += GrievanceTicket.objects.filter(
+                application_id__in=application_ids[start:start + CHUNK_SIZE],
+                status__in=OPEN_GRIEVANCE_STATUSES,
+                escalation_level__lt=level,
+            ).update(escalation_level=level, priority='high')
+    return escalated
+
+
+def _near_notifications(row, officers):
+    app_id, number, _, deadline, service_name, _ = row
+    due = timezone.localtime(deadline)
+    return [
+        Notification(
+            user_id=officer_id,
+            title="SLA deadline approaching",
+            message=f"Application {number} ({service_name}) is due by {due:%d %b %Y %H:%M}.",
+            notification_type='warning',
+        )
+        for officer_id in officers[app_id]
+    ]
+
+
+def _breach_notifications(row, level, officers):
+    app_id, number, citizen_id, deadline, service_name, head_id = row
+    due = timezone.localtime(deadline)
+    staff = set(officers[app_id])
+    if level >= HEAD_FROM_LEVEL and head_id:
+        staff.add(head_id)
+    staff.discard(citizen_id)
+    notifications = [
+        Notification(
+            user_id=user_id,
+            title=f"SLA breached (level {level})",
+            message=f"Application {number} ({service_name}) was due by {due:%d %b %Y %H:%M} and is still open.",
+            notification_type='error',
+        )
+        for user_id in staff
+    ]
+    notifications.append(Notification(
+        user_id=citizen_id,
+        title="Your application is delayed",
+        message=f"Application {number} ({service_name}) has passed its service timeline and has been escalated to the department.",
+        notification_type='warning',
+    ))
+    return notifications
+
+
+def scan(now=None):
+    """
+    Notifies every threshold crossed since the last scan and advances the
+    watermark to `now`; the first scan has no watermark and covers every
+    threshold crossed so far. Returns counts of near-deadline and breached
+    applications, notifications created and grievances escalated.
+    """
+    now = now or timezone.now()
+    notify = system_config.get_config().enable_notifications
+    with transaction.atomic():
+        state, first = SLAScanState.objects.select_for_update().get_or_create(
+            id=1, defaults={'scanned_until': now},
+        )
+        since = None if first else state.scanned_until
+        result = {'since': since, 'until': now, 'near_deadline': 0, 'breached': 0, 'notifications': 0, 'escalated': 0}
+        if since is not None and since >= now:
+            return result
+
+        near = {row[0]: row for row in near_deadline_crossings(since, now).values_list(*ROW_FIELDS)}
+        # An application crossing several levels in one scan only hears about the highest
+        breached, levels = {}, {}
+        for level, step in enumerate(ESCALATION_STEPS, start=1):
+            for row in breach_crossings(since, now, step).values_list(*ROW_FIELDS):
+                breached[row[0]] = row
+                levels[row[0]] = level
+
+        result.update(near_deadline=len(near), breached=len(breached), escalated=_escalate_grievances(levels))
+        if notify and (near or breached):
+            officers = _assigned_officers(list(near) + list(breached))
+            notifications = []
+            for row in near.values():
+                notifications.extend(_near_notifications(row, officers))
+            for app_id, row in breached.items():
+                notifications.extend(_breach_notifications(row, levels[app_id], officers))
+            Notification.objects.bulk_create(notifications, batch_size=CHUNK_SIZE)
+            # bulk_create skips the post_save signal that drops cached summaries
+            user_ids = {notification.user_id for notification in notifications}
+            transaction.on_commit(lambda: notification_cache.invalidate_many(user_ids))
+            result['notifications'] = len(notifications)
+
+        state.scanned_until = now
+        state.save(update_fields=['scanned_until', 'updated_at'])
+    return result
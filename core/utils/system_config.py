@@ -0,0 +1,76 @@
+"""
+Process-wide cached SystemConfiguration singleton.
+
+`get_config()` keeps the row in process memory. At most every
+VERSION_CHECK_SECONDS it compares a version token kept in the shared `state`
+cache; saving or deleting the row (see core.signals) writes a new token, so
+every worker reloads within that window while a request in between costs
+nothing. A reload takes the row from the shared cache when another worker
+already loaded that version (`core` cache), and from the database otherwise.
+
+Treat the returned instance as read-only; edit configuration through a
+fresh SystemConfiguration.objects.get() so the save bumps the version.
+"""
+import threading
+import time
+import uuid
+from core.models import SystemConfiguration
+from core.utils.caching import get_cache
+
+VERSION_KEY = 'system_config:version'
+VERSION_CHECK_SECONDS = 2
+# Superseded versions simply age out
+CONFIG_TIMEOUT = 24 * 60 * 60
+
+_lock = threading.Lock()
+_state = {'version': None, 'config': None, 'checked_at': 0.0}
+
+
+def config_key(version):
+    return f'system_config:{version}'
+
+
+def _load_from_db():
+    config = SystemConfiguration.objects.first()
+    if config is None:
+        config, _ = SystemConfiguration.objects.get_or_create(id=1)
+    return config
+
+
+def _load(version):
+    if version is None:
+        state = get_cache('state')
+        version = uuid.uuid4().hex
+        if not state.add(VERSION_KEY, version, None):
+            version = state.get(VERSION_KEY) or version
+    cache = get_cache('core')
+    config = cache.get(config_key(version))
+    if config is None:
+        config = _load_from_db()
+        cache.set(config_key(version), config, CONFIG_TIMEOUT)
+    return version, config
+
+
+def get_config():
+    now = time.monotonic()
+    with _lock:
+        if _state['config'] is not None and now - _state['checked_at'] < VERSION_CHECK_SECONDS:
+            return _state['config']
+        known = _state['version']
+    version = get_cache('state').get(VERSION_KEY)
+    if version is None or version != known or _state['config'] is None:
+        version, config = _load(version)
+        with _lock:
+            _state.update(version=version, config=config)
+    with _lock:
+        _state['checked_at'] = now
+        return _state['config']
+
+
+def invalidate():
+    """
+    Publishes a new version so every process reloads the configuration.
+    """
+    get_cache('state').set(VERSION_KEY, uuid.uuid4().hex, None)
+    with _lock:
+        _state.update(version=None, config=None, checked_at=0.0)
@@ -0,0 +1,66 @@
+"""
+Per-process reports shared through the `state` cache.
+
+core.utils.health and core.utils.perf each keep one collector per worker
+process. A collector publishes its report under `{prefix}:worker:{pid}`
+with a TTL and lists its pid under `{prefix}:workers`; readers fetch the
+reports of the listed pids and prune the pids whose reports have expired,
+so stopped workers age out on their own.
+"""
+import os
+import threading
+from core.utils.caching import get_cache
+
+
+def worker_key(prefix, pid):
+    return f'{prefix}:worker:{pid}'
+
+
+def workers_key(prefix):
+    return f'{prefix}:workers'
+
+
+class WorkerCollector:
+    """
+    Base for per-process collectors. `_start()` sets up the process's state
+    and runs again when the process turns out to be a fork of the one that
+    built the collector.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._start()
+
+    def _start(self):
+        self.pid = os.getpid()
+
+    def _own_process(self):
+        # Call with the lock held
+        if os.getpid() != self.pid:
+            # Forked after import (gunicorn --preload): start over as a new worker
+            self._start()
+
+
+def publish_worker_report(prefix, pid, report, ttl):
+    """
+    Stores `report` as worker `pid`'s latest and lists the pid if needed.
+    """
+    cache = get_cache('state')
+    cache.set(worker_key(prefix, pid), report, ttl)
+    pids = cache.get(workers_key(prefix)) or []
+    if pid not in pids:
+        # Racing workers may drop each other's pid; each re-adds its own on the next flush
+        cache.set(workers_key(prefix), pids + [pid], None)
+
+
+def live_worker_reports(prefix):
+    """
+    {pid: report} of the listed workers whose reports have not expired;
+    the other pids are dropped from the list.
+    """
+    cache = get_cache('state')
+    pids = cache.get(workers_key(prefix)) or []
+    found = cache.get_many([worker_key(prefix, pid) for pid in pids])
+    reports = {pid: found[worker_key(prefix, pid)] for pid in pids if worker_key(prefix, pid) in found}
+    if len(reports) != len(pids):
+        cache.set(workers_key(prefix), list(reports), None)
+    return reports
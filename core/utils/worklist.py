@@ -0,0 +1,105 @@
+"""
+Officer worklist: an officer's assignments one keyset page at a time, with
+the SLA bucket computed in SQL so the list can be filtered and sorted by
+urgency without loading the officer's whole assignment history.
+
+SLA buckets depend on the current time, so an application can move to a
+more urgent bucket while an officer pages through the list. The `sla`
+cursor therefore carries the time its first page was computed at, and later
+pages rank (and describe) rows as of that time; starting again from the
+first page picks up the current buckets.
+"""
+from datetime import datetime
+from django.db.models import Q
+from django.utils import timezone
+from core.models import OfficerAssignment
+from core.utils import sla
+
+PAGE_SIZE = 25
+
+FILTERS = {
+    'all': Q(),
+    'pending': Q(application__status='pending'),
+    'in_progress': Q(application__status='under_review'),
+    'history': Q(application__status__in=sla.COMPLETED_STATUSES),
+}
+
+SORTS = {
+    'newest': ('-assigned_date', '-id'),
+    'sla': ('sla_rank', 'application__sla_deadline', 'id'),
+}
+
+
+def encode_cursor(assignment, sort, now=None):
+    if sort == 'sla':
+        now = now or timezone.now()
+        deadline = assignment.application.sla_deadline
+        return f"{now.isoformat()}_{assignment.sla_rank}_{deadline.isoformat()}_{assignment.id}"
+    return f"{assignment.assigned_date.isoformat()}_{assignment.id}"
+
+
+def _parse_datetime(value):
+    parsed = datetime.fromisoformat(value)
+    if timezone.is_naive(parsed):
+        raise ValueError("Cursor timestamp has no timezone")
+    return parsed
+
+
+def _after(sort, cursor):
+    """
+    (time the listing is ranked at or None, Q selecting the rows after
+    `cursor` in `sort` order); raises ValueError.
+    """
+    if sort == 'sla':
+        ranked_at, rank, deadline, assignment_id = cursor.split('_')
+        ranked_at, deadline = _parse_datetime(ranked_at), _parse_datetime(deadline)
+        rank, assignment_id = int(rank), int(assignment_id)
+        return ranked_at, (
+            Q(sla_rank__gt=rank)
+            | Q(sla_rank=rank, application__sla_deadline__gt=deadline)
+            | Q(sla_rank=rank, application__sla_deadline=deadline, id__gt=assignment_id)
+        )
+    assigned, _, assignment_id = cursor.rpartition('_')
+    assigned, assignment_id = _parse_datetime(assigned), int(assignment_id)
+    return None, Q(assigned_date__lt=assigned) | Q(assigned_date=assigned, id__lt=assignment_id)
+
+
+def worklist_page(officer, filter_type='all', search='', sort='newest', cursor=None, now=None):
+    """
+    Up to PAGE_SIZE assignments of `officer` after `cursor`, and the cursor
+    of the next page (or None). Each application carries the attributes set
+    by core.utils.sla.describe(). Raises ValueError for an unreadable
+    cursor.
+    """
+    sort = sort if sort in SORTS else 'newest'
+    after = None
+    if cursor:
+        ranked_at, after = _after(sort, cursor)
+        now = ranked_at or now
+    now = now or timezone.now()
+    assignments = sla.annotate_sla(
+        OfficerAssignment.objects.filter(officer=officer).filter(FILTERS.get(filter_type, Q())),
+        now, prefix='application__',
+    ).select_related(
+        'application',
+        'application__service',
+        'application__user',
+    )
+    if search:
+        assignments = assignments.filter(
+            Q(application__application_number__icontains=search) |
+            Q(application__user__username__icontains=search) |
+            Q(application__user__email__icontains=search)
+        )
+    if after is not None:
+        assignments = assignments.filter(after)
+
+    page = list(assignments.order_by(*SORTS[sort])[:PAGE_SIZE + 1])
+    next_cursor = None
+    if len(page) > PAGE_SIZE:
+        page = page[:PAGE_SIZE]
+        next_cursor = encode_cursor(page[-1], sort, now)
+
+    for assignment in page:
+        sla.describe(assignment.application, now, rank=assignment.sla_rank)
+    return page, next_cursor
@@ -1,72 +1,56 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
-from django.db.models import Q
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.crypto import constant_time_compare
 from .forms import ContactForm
 from .models import Notification
+from .utils import health, home_cache, notification_cache
+
+def _cacheable_home_request(request):
+    # Pending flash messages (e.g. "logged out") are per-visitor, so bypass the shared page
+    return (
+        home_cache.page_timeout() > 0
+        and request.method == 'GET'
+        and not request.user.is_authenticated
+        and 'messages' not in request.COOKIES
+        and '_messages' not in request.session
+    )
+
+def _home_response(request, content, etag):
+    response = HttpResponse(home_cache.fill_csrf_token(request, content))
+    response['ETag'] = etag
+    patch_cache_control(response, max_age=home_cache.page_timeout())
+    return get_conditional_response(request, etag=etag, response=response)
 
 def home(request):
-    from core.models import Department
-    import json
-    departments = Department.objects.filter(is_active=True)
-
-    # Serialize for Map
-    dept_list = []
-    for dept in departments:
-        if dept.latitude and dept.longitude:
-            try:
-                dept_list.append({
-                    'name': dept.department_name,
-                    'lat': float(dept.latitude),
-                    'lng': float(dept.longitude)
-                })
-            except (ValueError, TypeError):
-                continue
-    
-    # Pass list directly for json_script
-    # departments_json = json.dumps(dept_list)
-    
-    # Live Stats
-    try:
-        from core.models import Application
-        total_apps = Application.objects.count()
-        issued_certs = Application.objects.filter(status='approved').count()
-    except:
-        total_apps = 12500
-        issued_certs = 9800
-        
-    stats = {
-        'total': total_apps,
-        'issued': issued_certs,
-        'satisfaction': 98,
-        'time': 3
-    }
-    
-    # Announcements & Notices
-    from core.models import Announcement
-    from django.utils import timezone
-    now = timezone.now()
-    
-    # Alerts (For Ticker and Emergency Bar)
-    alerts = Announcement.objects.filter(category='alert', is_active=True).filter(Q(expires_at__isnull=True) | Q(expires_at__gte=now))
-    
-    # News (For Cards)
-    latest_news = Announcement.objects.filter(category__in=['news', 'policy'], is_active=True).filter(Q(expires_at__isnull=True) | Q(expires_at__gte=now))[:3]
-    
-    # Circulars & Downloads (For Sidebar list)
-    notices = Announcement.objects.filter(category__in=['circular', 'tender', 'deadline'], is_active=True).filter(Q(expires_at__isnull=True) | Q(expires_at__gte=now))[:5]
-    
+    cacheable = _cacheable_home_request(request)
+    if cacheable:
+        cached = home_cache.get_page()
+        if cached:
+            response = _home_response(request, *cached)
+            patch_vary_headers(response, ['Cookie'])
+            return response
+
+    fragments = home_cache.get_fragments()
     context = {
-        'departments': departments,
-        'stats': stats,
-        'dept_list': dept_list,
-        'alerts': alerts,
-        'latest_news': latest_news,
-        'notices': notices
+        'stats': fragments['stats'],
+        'dept_list': fragments['departments'],
+        'alerts': fragments['alerts'],
+        'latest_news': fragments['news'],
+        'notices': fragments['notices'],
     }
-    
-    return render(request, 'home.html', context)
+    if cacheable:
+        # The shared page must not carry this visitor's token
+        context['csrf_token'] = home_cache.CSRF_PLACEHOLDER
+    response = render(request, 'home.html', context)
+    if cacheable:
+        response = _home_response(request, response.content, home_cache.set_page(response.content, fragments))
+    # Anonymous and signed-in visitors get different pages from the same URL
+    patch_vary_headers(response, ['Cookie'])
+    return response
 
 def contact_us(request):
     if request.method == 'POST':
@@ -95,6 +79,7 @@ def mark_notification_read(request, notif_id):
 def mark_all_read(request):
     if request.method == 'POST':
         Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+        notification_cache.invalidate(request.user.id)
         return JsonResponse({'status': 'success'})
     return JsonResponse({'status': 'error'}, status=400)
     
@@ -136,14 +121,10 @@ def verify_public_certificate(request):
         return JsonResponse({'valid': False, 'message': 'Please provide an Application ID.'})
     
     try:
-        from core.models import Application
-        
-        # Try finding by Application Number first
-        app = Application.objects.filter(application_number__iexact=app_id).first()
+        from core.utils.application_lookup import find_application
         
-        # Fallback to PK if it's numeric
-        if not app and app_id.isdigit():
-            app = Application.objects.filter(id=app_id).first()
+        # Application Number first, then PK if it's numeric (no partial matches for verification)
+        app, _ = find_application(app_id)
             
         if not app:
             return JsonResponse({'valid': False, 'message': 'Certificate not found.'})
@@ -164,6 +145,23 @@ def verify_public_certificate(request):
     except Exception as e:
         return JsonResponse({'valid': False, 'message': 'An error occurred during verification.'})
 
-from django.utils import timezone
+def _health_details_allowed(request):
+    token = getattr(settings, 'HEALTHZ_TOKEN', None)
+    if token and constant_time_compare(request.headers.get('X-Health-Token', ''), token):
+        return True
+    return request.user.is_authenticated and request.user.role == 'admin'
+
 def health_check(request):
-    return JsonResponse({'status': 'ok', 'timestamp': timezone.now().isoformat()})
+    """
+    Overall status for load balancers (503 when the database is unreachable).
+    Admins and monitoring that sends settings.HEALTHZ_TOKEN as X-Health-Token
+    also get the database and storage checks, and with ?full=1 the runtime
+    metrics; anyone else sees only the status and timestamp.
+    """
+    details = _health_details_allowed(request)
+    snapshot = health.snapshot(include_metrics=details and request.GET.get('full') == '1')
+    if not details:
+        snapshot = {'status': snapshot['status'], 'timestamp': snapshot['timestamp']}
+    response = JsonResponse(snapshot, status=503 if snapshot['status'] == 'error' else 200)
+    response['Cache-Control'] = 'no-store'
+    return response
@@ -74,11 +74,14 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # For static files in production
+    'core.middleware.MaintenanceModeMiddleware',  # Before sessions: maintenance pages cost no DB work
+    'core.middleware.QueryInstrumentationMiddleware',  # Counts session/auth queries too
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'core.middleware.SystemConfigMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -96,6 +99,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.notifications',
+                'core.context_processors.system_config',
             ],
         },
     },
@@ -142,6 +146,9 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            # A file rather than in-memory, so tests can open several
+            # connections at once (routing and numbering concurrency tests)
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
         }
     }
 
@@ -199,6 +206,9 @@ if DEBUG:
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# `manage.py test` applies TestRunner.TEST_SETTINGS over these settings
+TEST_RUNNER = 'egovernance.test_runner.TestRunner'
+
 # Logging Configuration to see errors in Render logs
 LOGGING = {
     'version': 1,
@@ -208,12 +218,19 @@ LOGGING = {
             'format': '{levelname} {asctime} {module} {process:d} {thread:d} {message}',
             'style': '{',
         },
+        'perf_json': {
+            '()': 'core.utils.perf.PerfLogFormatter',
+        },
     },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
             'formatter': 'verbose',
         },
+        'perf': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'perf_json',
+        },
     },
     'root': {
         'handlers': ['console'],
@@ -225,9 +242,99 @@ LOGGING = {
             'level': 'INFO',
             'propagate': True,
         },
+        # Per-request metrics from QueryInstrumentationMiddleware, one JSON line each
+        'egovernance.perf': {
+            'handlers': ['perf'],
+            'level': os.getenv('PERF_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
     },
 }
 
+# Audit Log Writer: events are spooled to disk, buffered in-process and
+# inserted in batches by a background thread (TEST_SETTINGS turns it off)
+AUDIT_LOG_ASYNC = os.getenv('AUDIT_LOG_ASYNC', 'True') == 'True'
+AUDIT_LOG_BATCH_SIZE = int(os.getenv('AUDIT_LOG_BATCH_SIZE', 100))
+AUDIT_LOG_FLUSH_INTERVAL = float(os.getenv('AUDIT_LOG_FLUSH_INTERVAL', 2.0))  # seconds
+AUDIT_LOG_SPOOL_DIR = BASE_DIR / 'audit_spool'
+# Months older than AUDIT_HOT_MONTHS are moved by `manage.py archive_audit_logs`
+# into hash-chained, gzip-compressed files under AUDIT_ARCHIVE_DIR
+AUDIT_HOT_MONTHS = int(os.getenv('AUDIT_HOT_MONTHS', 6))
+AUDIT_ARCHIVE_DIR = Path(os.getenv('AUDIT_ARCHIVE_DIR', BASE_DIR / 'audit_archive'))
+
+# Cache: shared by every gunicorn worker without an external service.
+# CACHE_BACKEND=filesystem (default), database (run `manage.py createcachetable`)
+# or locmem (private to each process).
+# Each app gets its own alias, KEY_PREFIX and LOCATION (directory, table or
+# store), so culling or clearing one never touches another; use
+# core.utils.caching.get_cache(). 'state' holds the few keys workers
+# coordinate through (config version tokens, perf samples, health reports)
+# and is sized so that it is never culled.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'filesystem')
+CACHE_DIR = os.getenv('CACHE_DIR', str(BASE_DIR / 'cache'))
+CACHE_NAMESPACES = ('core', 'mis', 'citizen', 'state')
+_CACHE_BACKENDS = {
+    'filesystem': ('core.utils.caching.FileBasedCache', os.path.join(CACHE_DIR, '{alias}')),
+    'database': ('django.core.cache.backends.db.DatabaseCache', 'django_cache_{alias}'),
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'egovernance-{alias}'),
+}
+CACHES = {
+    alias: {
+        'BACKEND': _CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': _CACHE_BACKENDS[CACHE_BACKEND][1].format(alias=alias),
+        'KEY_PREFIX': '' if alias == 'default' else alias,
+        'TIMEOUT': 300,
+        # The file cache counts its directory at most every CULL_INTERVAL seconds
+        'OPTIONS': {'MAX_ENTRIES': 1000000 if alias == 'state' else 10000, 'CULL_INTERVAL': 60},
+    }
+    for alias in ('default',) + CACHE_NAMESPACES
+}
+
+# Whole-page cache for anonymous visitors to the home page (0 disables it;
+# the home page fragments are cached and invalidated regardless)
+HOME_PAGE_CACHE_SECONDS = int(os.getenv('HOME_PAGE_CACHE_SECONDS', 0))
+
+# SLA calendar for departments without a DepartmentCalendar: working
+# weekdays (Monday=0) and the closing time deadlines fall at
+SLA_DEFAULT_WORKING_DAYS = os.getenv('SLA_DEFAULT_WORKING_DAYS', '01234')
+SLA_DEFAULT_CLOSING_TIME = os.getenv('SLA_DEFAULT_CLOSING_TIME', '17:30')
+
+# Application number serials each process reserves at a time; unused
+# serials of a block are skipped when the process exits
+APPLICATION_NUMBER_BLOCK_SIZE = int(os.getenv('APPLICATION_NUMBER_BLOCK_SIZE', 20))
+
+# Paths still served while SystemConfiguration.maintenance_mode is on; admins
+# who visit one of them get a cookie that lets them through everywhere else
+MAINTENANCE_EXEMPT_PATHS = ['/admin/', '/admin-panel/', '/accounts/login/', '/accounts/logout/', '/static/', '/healthz']
+
+# Per-view request metrics (/admin-panel/perf/, 'egovernance.perf' logger) and
+# SQL query budgets by view name; over-budget requests fail when
+# QUERY_BUDGET_ENFORCE is on (TEST_SETTINGS turns it on for the suite)
+PERF_INSTRUMENTATION = os.getenv('PERF_INSTRUMENTATION', 'True') == 'True'
+QUERY_BUDGET_ENFORCE = os.getenv('QUERY_BUDGET_ENFORCE', 'False') == 'True'
+QUERY_BUDGET_DEFAULT = None
+QUERY_BUDGETS = {
+    'core:home': 10,
+    'officer:dashboard': 8,
+    'mis:dashboard': 12,
+    'admin_panel:dashboard': 18,
+    'admin_panel:audit_logs': 8,
+    'api:service_list': 3,
+    'api:dept_stats': 3,
+    'api:app_status': 4,
+}
+
+# Generated MIS report files. Kept outside MEDIA_ROOT, which is served
+# publicly; they are downloaded only through mis:download_report
+REPORT_ARTIFACT_DIR = Path(os.getenv('REPORT_ARTIFACT_DIR', BASE_DIR / 'report_artifacts'))
+
+# Runtime health (/healthz, admin dashboard): MEDIA_ROOT's disk reports
+# 'degraded' from this usage on. Anonymous /healthz shows only the status;
+# monitoring sends HEALTHZ_TOKEN as the X-Health-Token header to get the
+# checks (and ?full=1 metrics) without an admin session
+HEALTH_DISK_WARN_PERCENT = int(os.getenv('HEALTH_DISK_WARN_PERCENT', 90))
+HEALTHZ_TOKEN = os.getenv('HEALTHZ_TOKEN')
+
 # Session Configuration
 SESSION_ENGINE = 'django.contrib.sessions.backends.db'
 SESSION_COOKIE_AGE = 3600  # Increased to 1 hour
@@ -0,0 +1,53 @@
+import copy
+import logging
+import os
+import shutil
+import tempfile
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Runs the suite with TEST_SETTINGS applied on top of the project settings,
+    so a test run is configured explicitly rather than by inspecting
+    sys.argv. Tests that cover the production behaviour switch it back on
+    with override_settings().
+    """
+    TEST_SETTINGS = {
+        # Audit rows are written inside the request; AuditWriterTests and
+        # the log_event tests cover the buffered writer
+        'AUDIT_LOG_ASYNC': False,
+        # A view that runs more queries than its budget fails its test
+        'QUERY_BUDGET_ENFORCE': True,
+    }
+    # Per-request metric lines would bury the test output
+    QUIET_LOGGERS = ('egovernance.perf',)
+
+    def test_caches(self, root):
+        """
+        settings.CACHES with the file-based aliases moved under `root`, so the
+        suite runs on the configured backend without touching CACHE_DIR.
+        """
+        caches = copy.deepcopy(settings.CACHES)
+        for alias, config in caches.items():
+            if config['BACKEND'].endswith('.FileBasedCache'):
+                config['LOCATION'] = os.path.join(root, alias)
+        return caches
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._cache_dir = tempfile.mkdtemp(prefix='egovernance-test-cache-')
+        self._test_settings = override_settings(CACHES=self.test_caches(self._cache_dir), **self.TEST_SETTINGS)
+        self._test_settings.enable()
+        self._log_levels = {name: logging.getLogger(name).level for name in self.QUIET_LOGGERS}
+        for name in self.QUIET_LOGGERS:
+            logging.getLogger(name).setLevel(logging.WARNING)
+
+    def teardown_test_environment(self, **kwargs):
+        for name, level in self._log_levels.items():
+            logging.getLogger(name).setLevel(level)
+        self._test_settings.disable()
+        shutil.rmtree(self._cache_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -1,5 +1,6 @@
 from django import forms
-from core.models import Service, Department
+from core.models import Service, Department, Application
+from core.decorators import headed_department_ids
 
 class ServiceForm(forms.ModelForm):
     class Meta:
@@ -14,10 +15,26 @@ class ServiceForm(forms.ModelForm):
         user = kwargs.pop('user', None)
         super().__init__(*args, **kwargs)
         if user and user.role == 'department_head':
-            self.fields['department'].queryset = user.headed_departments.all()
+            self.fields['department'].queryset = Department.objects.filter(id__in=headed_department_ids(user))
         
         for field in self.fields:
             if field != 'is_active':
                 self.fields[field].widget.attrs.update({'class': 'form-control'})
         
         self.fields['is_active'].widget.attrs.update({'class': 'form-check-input'})
+
+class ReportFilterForm(forms.Form):
+    """
+    Optional filters for the application report export (all fields may be blank).
+    """
+    date_from = forms.DateField(required=False)
+    date_to = forms.DateField(required=False)
+    status = forms.ChoiceField(required=False, choices=(('', 'All'),) + Application.STATUS_CHOICES)
+    department = forms.ModelChoiceField(required=False, queryset=Department.objects.all())
+    compress = forms.BooleanField(required=False)
+
+    def __init__(self, *args, **kwargs):
+        user = kwargs.pop('user', None)
+        super().__init__(*args, **kwargs)
+        if user and user.role == 'department_head':
+            self.fields['department'].queryset = Department.objects.filter(id__in=headed_department_ids(user))
@@ -0,0 +1,171 @@
+"""
+Local, database-backed queue for MIS report generation.
+
+Views call `enqueue()`; `manage.py run_report_worker` claims queued jobs one at
+a time, writes the artifact to REPORT_ARTIFACT_DIR (outside the public media
+tree) and notifies the requester. No external broker is needed: jobs are
+claimed with a conditional UPDATE so several workers can poll the same table
+safely.
+
+While a job runs, its worker stamps heartbeat_at every HEARTBEAT_INTERVAL.
+Each poll puts jobs whose heartbeat is older than HEARTBEAT_TIMEOUT back in
+the queue, so a dead worker's job is retried however long a live one takes.
+"""
+import logging
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from django.core.files import File
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from core.models import ReportJob, Notification
+from .forms import ReportFilterForm
+from .reports import report_queryset, iter_csv
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_INTERVAL = 30
+HEARTBEAT_TIMEOUT = timedelta(minutes=5)
+
+
+def enqueue(user, parameters, report_type='applications', output_format='csv'):
+    """
+    Queues a report for `user`. `parameters` are the raw ReportFilterForm values.
+    """
+    return ReportJob.objects.create(
+        requested_by=user,
+        report_type=report_type,
+        output_format=output_format,
+        parameters=parameters,
+    )
+
+
+def claim_next():
+    """
+    Marks the oldest queued job as running and returns it, or None if the queue
+    is empty. A job another worker claimed first is skipped.
+    """
+    for job_id in ReportJob.objects.filter(status='queued').order_by('created_at', 'id').values_list('id', flat=True)[:10]:
+        now = timezone.now()
+        claimed = ReportJob.objects.filter(id=job_id, status='queued').update(
+            status='running', started_at=now, heartbeat_at=now
+        )
+        if claimed:
+            return ReportJob.objects.select_related('requested_by').get(id=job_id)
+    return None
+
+
+def requeue_stale(timeout=HEARTBEAT_TIMEOUT):
+    """
+    Puts jobs whose worker stopped sending heartbeats back in the queue.
+    """
+    cutoff = timezone.now() - timeout
+    return ReportJob.objects.filter(status='running').filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    ).update(status='queued', progress=0, rows_written=0, heartbeat_at=None)
+
+
+def stamp_heartbeat(job_id):
+    ReportJob.objects.filter(pk=job_id, status='running').update(heartbeat_at=timezone.now())
+
+
+@contextmanager
+def heartbeat(job, interval=HEARTBEAT_INTERVAL):
+    """
+    Calls stamp_heartbeat() from a background thread until the block exits.
+    """
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(interval):
+                stamp_heartbeat(job.pk)
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f'report-job-{job.pk}-heartbeat', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def generate_applications_report(job, output):
+    form = ReportFilterForm(job.parameters, user=job.requested_by)
+    if not form.is_valid():
+        raise ValueError(f"Invalid report parameters: {form.errors.as_text()}")
+    apps = report_queryset(job.requested_by, form.cleaned_data)
+    total = apps.count() or 1
+
+    def progress(rows):
+        ReportJob.objects.filter(pk=job.pk).update(
+            rows_written=rows, progress=min(99, rows * 100 // total)
+        )
+
+    for chunk in iter_csv(apps, compress=job.output_format == 'csv.gz', progress=progress):
+        output.write(chunk)
+
+
+# report_type -> function(job, binary file) that writes the artifact
+GENERATORS = {
+    'applications': generate_applications_report,
+}
+
+
+def run_job(job):
+    """
+    Generates the artifact for a claimed job and notifies the requester.
+    """
+    try:
+        generator = GENERATORS[job.report_type]
+        with heartbeat(job), tempfile.TemporaryFile() as output:
+            generator(job, output)
+            output.seek(0)
+            filename = f"{job.report_type}_report_{job.id}_{timezone.now():%Y%m%d}.{job.output_format}"
+            job.artifact.save(filename, File(output), save=False)
+    except Exception as e:
+        logger.exception(f"Report job {job.id} failed")
+        ReportJob.objects.filter(pk=job.pk).update(status='failed', error=str(e), finished_at=timezone.now())
+        Notification.objects.create(
+            user=job.requested_by,
+            title="Report generation failed",
+            message=f"Your {job.get_report_type_display()} (#{job.id}) could not be generated: {e}",
+            notification_type='error',
+        )
+        return False
+
+    job.refresh_from_db(fields=['rows_written'])
+    job.status = 'completed'
+    job.progress = 100
+    job.finished_at = timezone.now()
+    job.save(update_fields=['artifact', 'status', 'progress', 'finished_at'])
+    Notification.objects.create(
+        user=job.requested_by,
+        title="Report ready for download",
+        message=f"Your {job.get_report_type_display()} (#{job.id}, {job.rows_written} rows) is ready in MIS > Reports.",
+        notification_type='success',
+    )
+    return True
+
+
+def work(once=False, poll_interval=5):
+    """
+    Processes jobs until interrupted (or until the queue is empty if `once`).
+    Returns the number of jobs processed.
+    """
+    processed = 0
+    while True:
+        requeue_stale()
+        job = claim_next()
+        if job:
+            run_job(job)
+            processed += 1
+            continue
+        if once:
+            return processed
+        time.sleep(poll_interval)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from mis.jobs import work
+
+class Command(BaseCommand):
+    help = 'Runs the background worker that generates queued MIS reports'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty instead of polling')
+        parser.add_argument('--poll-interval', type=float, default=5, help='Seconds to wait between polls of an empty queue')
+
+    def handle(self, *args, **options):
+        if not options['once']:
+            self.stdout.write('Report worker started. Press Ctrl+C to stop.')
+        try:
+            processed = work(once=options['once'], poll_interval=options['poll_interval'])
+        except KeyboardInterrupt:
+            return
+        self.stdout.write(self.style.SUCCESS(f'{processed} report jobs processed.'))
@@ -1,3 +1,205 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import os
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
+from unittest import skipUnless
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from core.models import User, Department, Service, Application, OfficerAssignment, OfficerWorkload, ReportJob, Notification
+from core.utils.intelligent_routing import adjust_workload, assign_backlog, auto_assign_officer, rebuild_workloads
+from mis.jobs import enqueue, heartbeat, requeue_stale, work
+from mis.reports import REPORT_HEADER, iter_csv
 
-# Create your tests here.
+
+class MISDashboardTests(TestCase):
+    def setUp(self):
+        self.head = User.objects.create_user(username='mis_head', password='TestPass@123', role='department_head')
+        citizen = User.objects.create_user(username='mis_citizen', password='TestPass@123', role='citizen')
+        dept = Department.objects.create(department_name='Revenue', description='Revenue', contact_email='rev@example.com', head_officer=self.head)
+        service = Service.objects.create(
+            service_name='Income Certificate', department=dept,
+            description='Income', required_documents='Aadhaar', processing_days=10
+        )
+        self.pending = Application.objects.create(user=citizen, service=service, status='pending')
+        self.approved = Application.objects.create(user=citizen, service=service, status='approved')
+        self.client.login(username='mis_head', password='TestPass@123')
+
+    def test_dashboard_reads_rollup_stats(self):
+        response = self.client.get(reverse('mis:dashboard'))
+        self.assertEqual(response.status_code, 200)
+        stats = response.context['stats']
+        self.assertEqual((stats['total'], stats['approved'], stats['pending']), (2, 1, 1))
+        self.assertEqual(response.context['service_data'], [2])
+        self.assertEqual(response.context['monthly_data'][-1], 2)
+        self.assertEqual(response.context['dept_stats'][0]['department_name'], 'Revenue')
+
+    def test_officer_stats_come_from_workload_counters(self):
+        officer = User.objects.create_user(username='mis_officer', password='TestPass@123', role='officer')
+        self.assertEqual(assign_backlog(), 1)
+        decided, dropped = (Application.objects.create(user=self.pending.user, service=self.pending.service) for _ in range(2))
+        auto_assign_officer(decided)
+        decided.status = 'approved'
+        decided.save()
+        adjust_workload(decided, -1)
+        auto_assign_officer(dropped)
+        OfficerAssignment.objects.get(application=dropped).delete()
+        response = self.client.get(reverse('mis:dashboard'))
+        self.assertEqual(response.context['officer_stats'], [
+            {'name': 'mis_officer', 'assigned': 2, 'completed': 1, 'pending': 1, 'avg_days': 5},
+        ])
+        # The running counters agree with a recount from the assignment table
+        rebuild_workloads()
+        workload = OfficerWorkload.objects.get(officer=officer)
+        self.assertEqual((workload.total_assignments, workload.open_assignments), (2, 1))
+
+
+def _rss_bytes():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+class ExportReportsTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='export_admin', password='TestPass@123', role='admin')
+        self.citizen = User.objects.create_user(username='export_citizen', password='TestPass@123', role='citizen', first_name='Asha')
+        dept = Department.objects.create(department_name='Revenue', description='Revenue', contact_email='rev@example.com')
+        self.service = Service.objects.create(
+            service_name='Income Certificate', department=dept,
+            description='Income', required_documents='Aadhaar', processing_days=10
+        )
+        Application.objects.create(user=self.citizen, service=self.service, status='pending')
+        Application.objects.create(user=self.citizen, service=self.service, status='approved')
+        self.client.login(username='export_admin', password='TestPass@123')
+
+    def _download(self, **params):
+        response = self.client.get(reverse('mis:export_reports'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_streams_csv_with_filters(self):
+        rows = list(csv.reader(io.StringIO(self._download().decode())))
+        self.assertEqual(rows[0], REPORT_HEADER)
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[1][1], 'Asha')
+
+        rows = list(csv.reader(io.StringIO(self._download(status='approved').decode())))
+        self.assertEqual([r[4] for r in rows[1:]], ['Approved'])
+
+    def test_sla_column_uses_shared_buckets(self):
+        rows = list(csv.reader(io.StringIO(self._download().decode())))
+        # Fresh 10-day application is on time; a decided one is no longer "Delayed"/"On Time"
+        self.assertEqual(sorted(r[6] for r in rows[1:]), ['Completed', 'On Time'])
+
+    def test_gzip_output(self):
+        body = gzip.decompress(self._download(compress='on')).decode()
+        self.assertEqual(len(body.splitlines()), 3)
+
+    @skipUnless(os.path.exists('/proc/self/statm'), "needs /proc to sample resident memory")
+    def test_streaming_memory_is_constant(self):
+        """Exporting 500k rows must not buffer the report in memory."""
+        total = 500000
+        now = timezone.now()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO core_application "
+                "(application_number, lookup_key, user_id, service_id, status, applied_date, priority, sla_deadline) "
+                "WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < %s) "
+                "SELECT 'SYN-' || n, 'SYN' || n, %s, %s, 'pending', %s, 'normal', %s FROM seq",
+                [total, self.citizen.id, self.service.id, now, now]
+            )
+
+        rows = 0
+        baseline = peak = _rss_bytes()
+        for chunk in iter_csv(Application.objects.order_by('id')):
+            rows += chunk.count(b'\n')
+            peak = max(peak, _rss_bytes())
+        self.assertEqual(rows, total + 3)
+        self.assertLess(peak - baseline, 16 * 1024 * 1024)
+
+
+class ReportJobTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        self.artifacts = tempfile.TemporaryDirectory()
+        self.addCleanup(self.artifacts.cleanup)
+        override = override_settings(MEDIA_ROOT=self.media.name, REPORT_ARTIFACT_DIR=self.artifacts.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.head = User.objects.create_user(username='job_head', password='TestPass@123', role='department_head')
+        citizen = User.objects.create_user(username='job_citizen', password='TestPass@123', role='citizen')
+        dept = Department.objects.create(department_name='Revenue', description='Revenue', contact_email='rev@example.com', head_officer=self.head)
+        service = Service.objects.create(
+            service_name='Income Certificate', department=dept,
+            description='Income', required_documents='Aadhaar', processing_days=10
+        )
+        for status in ['pending', 'approved', 'rejected']:
+            Application.objects.create(user=citizen, service=service, status=status)
+        self.client.login(username='job_head', password='TestPass@123')
+
+    def test_queued_report_is_generated_by_worker(self):
+        self.client.post(reverse('mis:queue_report'), {'status': 'approved'})
+        job = ReportJob.objects.get()
+        self.assertEqual(job.status, 'queued')
+
+        call_command('run_report_worker', '--once', stdout=io.StringIO())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress, job.rows_written), ('completed', 100, 1))
+        self.assertTrue(Notification.objects.filter(user=self.head, title__icontains='ready').exists())
+
+        response = self.client.get(reverse('mis:download_report', args=[job.id]))
+        self.assertEqual(response.status_code, 200)
+        rows = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(rows), 2)
+        response.close()
+
+    def test_artifact_is_private_and_unguessable(self):
+        job = enqueue(self.head, {})
+        work(once=True)
+        job.refresh_from_db()
+        token, name = job.artifact.name.split('/')
+        self.assertRegex(token, r'^[0-9a-f]{32}$')
+        self.assertTrue(job.artifact.path.startswith(self.artifacts.name))
+        self.assertFalse(os.listdir(self.media.name))
+        self.assertEqual(self.client.get(f'/media/{job.artifact.name}').status_code, 404)
+
+        other = User.objects.create_user(username='job_other', password='TestPass@123', role='department_head')
+        self.client.force_login(other)
+        response = self.client.get(reverse('mis:download_report', args=[job.id]))
+        self.assertEqual(response.status_code, 302)
+
+    def test_only_jobs_without_recent_heartbeat_are_requeued(self):
+        now = timezone.now()
+        live = enqueue(self.head, {})
+        dead = enqueue(self.head, {})
+        ReportJob.objects.filter(pk=live.pk).update(status='running', started_at=now - timedelta(hours=3), heartbeat_at=now)
+        ReportJob.objects.filter(pk=dead.pk).update(status='running', started_at=now - timedelta(minutes=6),
+                                                    heartbeat_at=now - timedelta(minutes=6))
+        self.assertEqual(requeue_stale(), 1)
+        self.assertEqual(ReportJob.objects.get(pk=live.pk).status, 'running')
+        self.assertEqual(ReportJob.objects.get(pk=dead.pk).status, 'queued')
+
+    def test_heartbeat_is_stamped_while_a_job_runs(self):
+        job = enqueue(self.head, {})
+        with mock.patch('mis.jobs.stamp_heartbeat') as stamp:
+            with heartbeat(job, interval=0.01):
+                deadline = time.monotonic() + 5
+                while not stamp.called and time.monotonic() < deadline:
+                    time.sleep(0.01)
+        stamp.assert_called_with(job.pk)
+
+    def test_invalid_parameters_fail_job(self):
+        job = enqueue(self.head, {'date_from': 'not-a-date'})
+        self.assertEqual(work(once=True), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertTrue(Notification.objects.filter(user=self.head, notification_type='error').exists())
@@ -11,4 +11,7 @@ urlpatterns = [
     path('services/add/', views.service_create, name='service_create'),
     path('services/edit/<int:service_id>/', views.service_edit, name='service_edit'),
     path('reports/export/', views.export_reports, name='export_reports'),
+    path('reports/queue/', views.queue_report, name='queue_report'),
+    path('reports/', views.report_jobs, name='report_jobs'),
+    path('reports/<int:job_id>/download/', views.download_report, name='download_report'),
 ]
@@ -1,85 +1,66 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from core.models import Application, Department, User, Service, OfficerAssignment
-from django.db.models import Count, Q, Avg
+from core.models import Application, OfficerWorkload
+from django.db.models import Q
 from django.utils import timezone
 from datetime import timedelta
-from core.decorators import role_required
+from core.decorators import role_required, headed_department_ids, can_manage_department
+from core.utils import mis_rollup, application_stats
 
 @login_required
 @role_required(['department_head', 'admin'])
 def dashboard(request):
-    if request.user.role not in ['admin', 'department_head']:
-        messages.error(request, "Access denied. MIS restricted to management.")
-        return redirect('core:home')
-    
-    # Global Stats
-    total_apps = Application.objects.count()
-    approved_apps = Application.objects.filter(status='approved').count()
-    rejected_apps = Application.objects.filter(status='rejected').count()
-    pending_apps = Application.objects.filter(status='pending').count()
-    in_progress_apps = Application.objects.filter(status='under_review').count()
+    # Global Stats (served from the pre-aggregated rollup table)
+    totals = mis_rollup.status_totals()
+    total_apps = sum(totals.values())
+    approved_apps = totals.get('approved', 0)
+    rejected_apps = totals.get('rejected', 0)
+    pending_apps = totals.get('pending', 0)
+    in_progress_apps = totals.get('under_review', 0)
     
     # SLA Delayed (Apps where deadline passed and still not completed)
-    now = timezone.now()
-    delayed_apps = Application.objects.filter(
-        sla_deadline__lt=now
-    ).exclude(status__in=['approved', 'rejected']).count()
+    sla_buckets = application_stats.summarize(
+        Application.objects.exclude(status__in=application_stats.COMPLETED_STATUSES)
+    )
+    delayed_apps = sla_buckets['delayed']
     
     # Service-wise Distribution
-    service_stats = Service.objects.annotate(
-        app_count=Count('application')
-    ).filter(app_count__gt=0).order_by('-app_count')[:10]
-    service_labels = [s.service_name for s in service_stats]
-    service_data = [s.app_count for s in service_stats]
+    service_stats = mis_rollup.top_services(10)
+    service_labels = [s['service_name'] for s in service_stats]
+    service_data = [s['app_count'] for s in service_stats]
 
     # Trends (Last 7 Days)
-    seven_days_ago = timezone.now() - timedelta(days=7)
-    daily_stats = Application.objects.filter(
-        applied_date__gte=seven_days_ago
-    ).values('applied_date__date').annotate(count=Count('id')).order_by('applied_date__date')
+    today = timezone.localdate()
+    daily_stats = mis_rollup.daily_totals(today - timedelta(days=6))
     
     monthly_labels = []
     monthly_data = []
     for i in range(7):
-        day = (timezone.now() - timedelta(days=6-i)).date()
+        day = today - timedelta(days=6-i)
         monthly_labels.append(day.strftime('%b %d'))
-        count = 0
-        for entry in daily_stats:
-            if entry['applied_date__date'] == day:
-                count = entry['count']
-                break
-        monthly_data.append(count)
+        monthly_data.append(daily_stats.get(day, 0))
 
     # SLA and Officers
     total_completed = approved_apps + rejected_apps
     sla_data = [approved_apps, pending_apps + in_progress_apps, rejected_apps]
     sla_compliance = 100 if total_apps == 0 else round((total_completed / total_apps) * 100, 1)
 
-    # Officer Stats
-    officers = User.objects.filter(role='officer').annotate(
-        assigned_count=Count('assigned_tasks'),
-        completed_count=Count('assigned_tasks', filter=Q(assigned_tasks__application__status__in=['approved', 'rejected'])),
-        pending_count=Count('assigned_tasks', filter=Q(assigned_tasks__application__status__in=['pending', 'under_review']))
-    )
+    # Officer Stats (running counters kept by core.utils.intelligent_routing)
+    workloads = OfficerWorkload.objects.filter(officer__role='officer').select_related('officer').order_by('officer_id')
     
     officer_stats = []
-    for off in officers:
+    for workload in workloads:
         officer_stats.append({
-            'name': off.username,
-            'assigned': off.assigned_count,
-            'completed': off.completed_count,
-            'pending': off.pending_count,
+            'name': workload.officer.username,
+            'assigned': workload.total_assignments,
+            'completed': workload.total_assignments - workload.open_assignments,
+            'pending': workload.open_assignments,
             'avg_days': 5  # Placeholder or implement avg calculation
         })
     
     # Department-wise Stats
-    dept_stats = Department.objects.annotate(
-        app_count=Count('services__application'),
-        approved_count=Count('services__application', filter=Q(services__application__status='approved')),
-        pending_count=Count('services__application', filter=Q(services__application__status='pending'))
-    ).filter(app_count__gt=0)
+    dept_stats = mis_rollup.department_totals()
     
     stats = {
         'total': total_apps,
@@ -88,7 +69,6 @@ def dashboard(request):
         'approved': approved_apps,
         'rejected': rejected_apps,
         'delayed': delayed_apps,
-        'unassigned': Application.objects.filter(officer_assignments__isnull=True).count()
     }
     
     context = {
@@ -118,9 +98,8 @@ def contact_inbox(request):
         msgs = ContactMessage.objects.all().order_by('-created_at')
     else:
         # Get head's departments
-        my_depts = request.user.headed_departments.all()
         msgs = ContactMessage.objects.filter(
-            Q(department__in=my_depts) | Q(department__isnull=True)
+            Q(department_id__in=headed_department_ids(request.user)) | Q(department__isnull=True)
         ).order_by('-created_at')
 
     context = {
@@ -144,10 +123,9 @@ def reply_contact(request, msg_id):
     msg = get_object_or_404(ContactMessage, id=msg_id)
     
     # Permission check (Department Head can only reply to their dept msgs)
-    if request.user.role != 'admin' and msg.department:
-        if not request.user.headed_departments.filter(id=msg.department.id).exists():
-            messages.error(request, "You do not have permission to reply to this department's messages.")
-            return redirect('mis:contact_inbox')
+    if msg.department_id and not can_manage_department(request.user, msg.department_id):
+        messages.error(request, "You do not have permission to reply to this department's messages.")
+        return redirect('mis:contact_inbox')
 
     if request.method == 'POST':
         reply_text = request.POST.get('reply_message')
@@ -184,7 +162,7 @@ def service_list(request):
     if request.user.role == 'admin':
         services = Service.objects.all().select_related('department')
     else:
-        services = Service.objects.filter(department__in=request.user.headed_departments.all()).select_related('department')
+        services = Service.objects.filter(department_id__in=headed_department_ids(request.user)).select_related('department')
         
     return render(request, 'mis/service_list.html', {'services': services})
 
@@ -213,7 +191,7 @@ def service_edit(request, service_id):
     service = get_object_or_404(Service, id=service_id)
     
     # Permission check
-    if request.user.role != 'admin' and service.department not in request.user.headed_departments.all():
+    if not can_manage_department(request.user, service.department_id):
         messages.error(request, "You cannot edit services from other departments.")
         return redirect('mis:service_list')
         
@@ -231,32 +209,65 @@ def service_edit(request, service_id):
 @login_required
 @role_required(['department_head', 'admin'])
 def export_reports(request):
-    import csv
-    from django.http import HttpResponse
+    from django.http import StreamingHttpResponse
+    from .forms import ReportFilterForm
+    from .reports import report_queryset, iter_csv
     
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="application_report_{timezone.now().date()}.csv"'
+    form = ReportFilterForm(request.GET, user=request.user)
+    if not form.is_valid():
+        messages.error(request, "Invalid report filters. Please check the dates and selections.")
+        return redirect('mis:dashboard')
     
-    writer = csv.writer(response)
-    writer.writerow(['Application ID', 'Citizen', 'Service', 'Department', 'Status', 'Applied Date', 'SLA Status', 'Completed Date'])
+    compress = form.cleaned_data['compress']
+    apps = report_queryset(request.user, form.cleaned_data)
+    filename = f"application_report_{timezone.now().date()}.csv"
     
-    if request.user.role == 'admin':
-        apps = Application.objects.all().select_related('user', 'service', 'service__department')
-    else:
-        apps = Application.objects.filter(
-            service__department__in=request.user.headed_departments.all()
-        ).select_related('user', 'service', 'service__department')
-        
-    for app in apps:
-        writer.writerow([
-            app.application_number,
-            app.user.get_full_name() or app.user.username,
-            app.service.service_name,
-            app.service.department.department_name,
-            app.get_status_display(),
-            app.applied_date.strftime('%Y-%m-%d %H:%M'),
-            'On Time' if app.sla_deadline > timezone.now() else 'Delayed',
-            app.approved_date.strftime('%Y-%m-%d %H:%M') if app.approved_date else '-'
-        ])
-        
+    response = StreamingHttpResponse(
+        iter_csv(apps, compress=compress),
+        content_type='application/gzip' if compress else 'text/csv'
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}{".gz" if compress else ""}"'
     return response
+
+@login_required
+@role_required(['department_head', 'admin'])
+def queue_report(request):
+    from .forms import ReportFilterForm
+    from .jobs import enqueue
+    
+    if request.method != 'POST':
+        return redirect('mis:report_jobs')
+    
+    form = ReportFilterForm(request.POST, user=request.user)
+    if not form.is_valid():
+        messages.error(request, "Invalid report filters. Please check the dates and selections.")
+        return redirect('mis:dashboard')
+    
+    parameters = {name: request.POST[name] for name in form.fields if request.POST.get(name)}
+    job = enqueue(request.user, parameters, output_format='csv.gz' if form.cleaned_data['compress'] else 'csv')
+    messages.success(request, f"Report #{job.id} queued. You will be notified when it is ready.")
+    return redirect('mis:report_jobs')
+
+@login_required
+@role_required(['department_head', 'admin'])
+def report_jobs(request):
+    from core.models import ReportJob
+    
+    jobs = ReportJob.objects.filter(requested_by=request.user)[:50]
+    return render(request, 'mis/report_jobs.html', {'jobs': jobs})
+
+@login_required
+@role_required(['department_head', 'admin'])
+def download_report(request, job_id):
+    from django.http import FileResponse
+    from core.models import ReportJob
+    
+    job = get_object_or_404(ReportJob, id=job_id, status='completed')
+    if job.requested_by_id != request.user.id and request.user.role != 'admin':
+        messages.error(request, "You do not have permission to download this report.")
+        return redirect('mis:report_jobs')
+    if not job.artifact:
+        messages.error(request, "The report file is no longer available.")
+        return redirect('mis:report_jobs')
+    
+    return FileResponse(job.artifact.open('rb'), as_attachment=True, filename=job.artifact.name.rsplit('/', 1)[-1])
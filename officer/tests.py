@@ -1,3 +1,112 @@
+from datetime import timedelta
+from unittest import mock
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from core.models import User, Department, Service, Application, OfficerAssignment, OfficerWorkload
+from core.utils import worklist
+from core.utils.sla_calendar import near_deadline_at
+from core.utils.intelligent_routing import auto_assign_officer
 
-# Create your tests here.
+
+class ReviewApplicationTests(TestCase):
+    def setUp(self):
+        self.officer = User.objects.create_user(username='review_officer', password='TestPass@123', role='officer')
+        citizen = User.objects.create_user(username='review_citizen', password='TestPass@123', role='citizen')
+        dept = Department.objects.create(department_name='Revenue', description='Revenue', contact_email='rev@example.com')
+        service = Service.objects.create(
+            service_name='Income Certificate', department=dept,
+            description='Income', required_documents='Aadhaar', processing_days=10
+        )
+        self.application = Application.objects.create(user=citizen, service=service)
+        auto_assign_officer(self.application)
+        self.client.login(username='review_officer', password='TestPass@123')
+
+    def _workload(self):
+        return OfficerWorkload.objects.get(officer=self.officer).open_assignments
+
+    def test_approve_releases_workload_once(self):
+        url = reverse('officer:review', args=[self.application.id])
+        self.assertEqual(self._workload(), 1)
+        self.client.post(url, {'decision': 'approved', 'officer_remarks': 'OK'})
+        self.assertEqual(self._workload(), 0)
+        self.client.post(url, {'decision': 'rejected', 'officer_remarks': 'Changed'})
+        self.assertEqual(self._workload(), 0)
+        self.client.post(url, {'decision': 'review', 'officer_remarks': 'Reopened'})
+        self.assertEqual(self._workload(), 1)
+
+
+class OfficerWorklistTests(TestCase):
+    def setUp(self):
+        self.officer = User.objects.create_user(username='worklist_officer', password='TestPass@123', role='officer')
+        self.citizen = User.objects.create_user(username='worklist_citizen', password='TestPass@123', role='citizen')
+        dept = Department.objects.create(department_name='Revenue', description='Revenue', contact_email='rev@example.com')
+        self.service = Service.objects.create(
+            service_name='Income Certificate', department=dept,
+            description='Income', required_documents='Aadhaar', processing_days=10
+        )
+        self.client.login(username='worklist_officer', password='TestPass@123')
+
+    def _assign(self, days_left, status='pending'):
+        application = Application.objects.create(user=self.citizen, service=self.service, status=status)
+        deadline = timezone.now() + timedelta(days=days_left, hours=1)
+        Application.objects.filter(pk=application.pk).update(
+            sla_deadline=deadline, sla_near_at=near_deadline_at(self.service, deadline),
+        )
+        return OfficerAssignment.objects.create(officer=self.officer, application=application)
+
+    def test_keyset_pages_cover_every_assignment_once(self):
+        ids = {self._assign(5).id for _ in range(worklist.PAGE_SIZE + 5)}
+        first = self.client.get(reverse('officer:dashboard'))
+        self.assertEqual(len(first.context['assignments']), worklist.PAGE_SIZE)
+        second = self.client.get(reverse('officer:dashboard') + '?' + first.context['next_query'])
+        self.assertIsNone(second.context['next_query'])
+        seen = [a.id for a in first.context['assignments']] + [a.id for a in second.context['assignments']]
+        self.assertEqual(len(seen), len(ids))
+        self.assertEqual(set(seen), ids)
+
+    def test_sla_sort_puts_most_urgent_first(self):
+        done = self._assign(-3, status='approved')
+        on_time = self._assign(8)
+        near = self._assign(1)
+        late = self._assign(-2)
+        response = self.client.get(reverse('officer:dashboard'), {'sort': 'sla'})
+        page = response.context['assignments']
+        self.assertEqual([a.id for a in page], [late.id, near.id, on_time.id, done.id])
+        self.assertEqual([a.application.sla_status for a in page], ['delayed', 'near_deadline', 'on_time', 'completed'])
+        self.assertEqual(page[0].application.days_overdue, 2)
+
+        second = worklist.worklist_page(self.officer, sort='sla', cursor=worklist.encode_cursor(page[1], 'sla'))[0]
+        self.assertEqual([a.id for a in second], [on_time.id, done.id])
+
+    def test_history_does_not_grow_the_page(self):
+        for _ in range(5):
+            self._assign(5, status='approved')
+        response = self.client.get(reverse('officer:dashboard'), {'filter': 'pending'})
+        self.assertEqual(list(response.context['assignments']), [])
+        self.assertEqual(response.context['stats']['assigned'], 5)
+
+        for _ in range(worklist.PAGE_SIZE * 2):
+            self._assign(5, status='approved')
+        # The officer:dashboard query budget is enforced under tests
+        response = self.client.get(reverse('officer:dashboard'), {'filter': 'history'})
+        self.assertEqual(len(response.context['assignments']), worklist.PAGE_SIZE)
+
+    def test_unreadable_cursor_is_rejected(self):
+        self._assign(5)
+        for cursor in ('garbage', '2026-01-01T00:00:00_1', '1_2_3_4'):
+            for sort in ('newest', 'sla'):
+                response = self.client.get(reverse('officer:dashboard'), {'sort': sort, 'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
+
+    def test_sla_pages_keep_the_first_page_time(self):
+        sooner = self._assign(6)
+        later = self._assign(8)
+        first_at = timezone.now()
+        with mock.patch.object(worklist, 'PAGE_SIZE', 1):
+            page, cursor = worklist.worklist_page(self.officer, sort='sla', now=first_at)
+            self.assertEqual([a.id for a in page], [sooner.id])
+            # A week on, `later` ranks more urgent than where page one stopped and would be skipped
+            second, _ = worklist.worklist_page(self.officer, sort='sla', cursor=cursor, now=first_at + timedelta(days=7))
+        self.assertEqual([a.id for a in second], [later.id])
+        self.assertEqual(second[0].application.sla_status, 'on_time')
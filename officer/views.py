@@ -1,92 +1,67 @@
+from django.http import HttpResponseBadRequest
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from core.models import Application, OfficerAssignment, AuditLog, Document
+from core.models import Application, OfficerAssignment, Document
 from django.utils import timezone
-from django.db.models import Count, Q
-from datetime import datetime, timedelta
+from django.db.models import Q
 from core.decorators import role_required
+from core.utils import application_stats, sla, worklist
+from core.utils.intelligent_routing import OPEN_STATUSES, adjust_workload
+from core.utils.audit_writer import log_event
+from core.utils.audit_timeline import application_timeline_page
 
 @login_required
 @role_required(['officer', 'admin'])
 def dashboard(request):
-    if request.user.role not in ['officer', 'department_head', 'admin']:
-        messages.error(request, "Access denied.")
-        return redirect('core:home')
-    
     # Filtering logic for sidebar links
     filter_type = request.GET.get('filter', 'all')
     search_query = request.GET.get('q', '')
-    
-    # Get assignments for this officer
-    assignments = OfficerAssignment.objects.filter(
-        officer=request.user
-    ).select_related(
-        'application', 
-        'application__service',
-        'application__service__department',
-        'application__user'
-    ).order_by('-assigned_date')
-    
-    if search_query:
-        assignments = assignments.filter(
-            Q(application__application_number__icontains=search_query) |
-            Q(application__user__username__icontains=search_query) |
-            Q(application__user__email__icontains=search_query)
+    sort = request.GET.get('sort', 'newest')
+    if sort not in worklist.SORTS:
+        sort = 'newest'
+    
+    # One keyset page of this officer's assignments, SLA bucket computed in SQL
+    try:
+        assignments, next_cursor = worklist.worklist_page(
+            request.user, filter_type=filter_type, search=search_query,
+            sort=sort, cursor=request.GET.get('cursor'),
         )
-    
-    if filter_type == 'pending':
-        assignments = assignments.filter(application__status='pending')
-    elif filter_type == 'history':
-        assignments = assignments.filter(application__status__in=['approved', 'rejected'])
-    elif filter_type == 'in_progress':
-        assignments = assignments.filter(application__status='under_review')
-    
-    # Convert to list to persist attributes added effectively
-    assignments = list(assignments)
-    
-    # Calculate SLA status for each assignment
-    now = timezone.now()
-    for assignment in assignments:
-        app = assignment.application
-        if app.status in ['approved', 'rejected']:
-            app.sla_status = 'completed'
-        else:
-            time_diff = app.sla_deadline - now
-            days_remaining = time_diff.days
-            total_sla_days = app.service.processing_days
-            
-            if days_remaining < 0:
-                app.sla_status = 'delayed'
-                app.days_overdue = abs(days_remaining)
-            elif days_remaining <= (total_sla_days * 0.2):
-                app.sla_status = 'near_deadline'
-                app.days_left = days_remaining
-            else:
-                app.sla_status = 'on_time'
-                app.days_left = days_remaining
+    except ValueError:
+        # Serving the first page again would send a client round in circles
+        return HttpResponseBadRequest("Invalid page cursor.")
+    
+    params = request.GET.copy()
+    params.pop('cursor', None)
+    first_query = params.urlencode() if 'cursor' in request.GET else None
+    next_query = None
+    if next_cursor:
+        params['cursor'] = next_cursor
+        next_query = params.urlencode()
     
     # Statistics - Use localtime for 'today'
-    from django.utils import timezone as django_timezone
-    today = django_timezone.localtime(django_timezone.now()).date()
+    today = timezone.localdate()
     
     # We want ALL assignments stats even if view is filtered
-    all_my_assignments = OfficerAssignment.objects.filter(officer=request.user)
+    my_stats = application_stats.summarize(
+        Application.objects.filter(officer_assignments__officer=request.user),
+        extra={'approved_today': Q(status='approved', approved_date__date=today)}
+    )
     
     stats = {
-        'assigned': all_my_assignments.count(),
-        'in_progress': all_my_assignments.filter(application__status='under_review').count(),
-        'approved_today': all_my_assignments.filter(
-            application__status='approved',
-            application__approved_date__date=today
-        ).count(),
-        'pending': all_my_assignments.filter(application__status='pending').count(),
+        'assigned': my_stats['total'],
+        'in_progress': my_stats['under_review'],
+        'approved_today': my_stats['approved_today'],
+        'pending': my_stats['pending'],
     }
     
     return render(request, 'officer/dashboard_bootstrap.html', {
         'assignments': assignments,
         'stats': stats,
-        'filter_type': filter_type
+        'filter_type': filter_type,
+        'sort': sort,
+        'first_query': first_query,
+        'next_query': next_query,
     })
 
 @login_required
@@ -102,6 +77,7 @@ def review_application(request, app_id):
     if request.method == 'POST':
         decision = request.POST.get('decision')
         officer_remarks = request.POST.get('officer_remarks')
+        was_open = application.status in OPEN_STATUSES
         
         if decision == 'approved':
             application.status = 'approved'
@@ -140,8 +116,13 @@ def review_application(request, app_id):
         
         application.save()
         
+        # Keep the officers' routing workload in step with open/closed transitions
+        is_open = application.status in OPEN_STATUSES
+        if was_open != is_open:
+            adjust_workload(application, 1 if is_open else -1)
+        
         # Log Audit
-        AuditLog.objects.create(
+        log_event(
             user=request.user,
             action=audit_action,
             entity_type='Application',
@@ -154,26 +135,17 @@ def review_application(request, app_id):
         return redirect('officer:dashboard')
     
     # Calculate SLA status
-    now = timezone.now()
-    time_diff = application.sla_deadline - now
-    days_remaining = time_diff.days
-    total_sla_days = application.service.processing_days
-    
-    if days_remaining < 0:
-        application.sla_status = 'delayed'
-        application.days_overdue = abs(days_remaining)
-    elif days_remaining <= (total_sla_days * 0.2):
-        application.sla_status = 'near_deadline'
-        application.days_left = days_remaining
-    else:
-        application.sla_status = 'on_time'
-        application.days_left = days_remaining
+    sla.describe(application)
     
     documents = Document.objects.filter(application=application)
-    audit_logs = AuditLog.objects.filter(entity_id=application.id, entity_type='Application').order_by('-timestamp')
+    try:
+        audit_logs, older_history = application_timeline_page(application, cursor=request.GET.get('history'))
+    except ValueError:
+        return HttpResponseBadRequest("Invalid history cursor.")
     
     return render(request, 'officer/review_application_bootstrap.html', {
         'application': application,
         'documents': documents,
-        'audit_logs': audit_logs
+        'audit_logs': audit_logs,
+        'older_history': older_history,
     })
@@ -0,0 +1,85 @@
+"""
+Compares per-process (locmem) caching with the shared local backends when
+several worker processes serve the same keys, the way gunicorn workers do.
+
+Each worker reads keys from a fixed key space and "rebuilds" a missing value
+by sleeping --build-ms (standing in for the database queries it replaces).
+A shared backend rebuilds each key about once; a per-process cache rebuilds
+it once per worker.
+
+    python scripts/bench_cache.py --workers 4 --keys 200 --ops 5000
+"""
+import argparse
+import multiprocessing
+import random
+import shutil
+import tempfile
+import time
+
+import bench_common  # noqa: F401  (configures Django)
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+
+PAYLOAD = {'stats': list(range(50)), 'title': 'x' * 200}
+
+
+def make_backend(name, location):
+    params = {'TIMEOUT': 300, 'KEY_PREFIX': 'core', 'OPTIONS': {'MAX_ENTRIES': 100000}}
+    if name == 'filesystem':
+        return FileBasedCache(location, params)
+    return LocMemCache('bench', params)
+
+
+def worker(name, location, keys, ops, build_ms, seed, results):
+    backend = make_backend(name, location)
+    rng = random.Random(seed)
+    builds = 0
+    start = time.perf_counter()
+    for _ in range(ops):
+        key = f'fragment:{rng.randrange(keys)}'
+        if backend.get(key) is None:
+            time.sleep(build_ms / 1000)
+            backend.set(key, PAYLOAD)
+            builds += 1
+    results.put((builds, time.perf_counter() - start))
+
+
+def run(name, args):
+    location = tempfile.mkdtemp(prefix='bench_cache_')
+    results = multiprocessing.Queue()
+    try:
+        procs = [
+            multiprocessing.Process(target=worker, args=(name, location, args.keys, args.ops, args.build_ms, i, results))
+            for i in range(args.workers)
+        ]
+        wall = time.perf_counter()
+        for p in procs:
+            p.start()
+        outcomes = [results.get() for _ in procs]
+        for p in procs:
+            p.join()
+        wall = time.perf_counter() - wall
+    finally:
+        shutil.rmtree(location, ignore_errors=True)
+    builds = sum(b for b, _ in outcomes)
+    return builds, args.workers * args.ops / wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--keys', type=int, default=200)
+    parser.add_argument('--ops', type=int, default=5000, help='Reads per worker')
+    parser.add_argument('--build-ms', type=float, default=5.0, help='Cost of rebuilding a missing value')
+    args = parser.parse_args()
+
+    print(f"{args.workers} workers x {args.ops} reads over {args.keys} keys, {args.build_ms} ms per rebuild")
+    print(f"{'backend':<14} {'rebuilds':>10} {'hit ratio':>10} {'reads/s':>12}")
+    for name in ('locmem', 'filesystem'):
+        builds, throughput = run(name, args)
+        ratio = 1 - builds / (args.workers * args.ops)
+        print(f"{name:<14} {builds:>10} {ratio:>10.1%} {throughput:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
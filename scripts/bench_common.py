@@ -0,0 +1,116 @@
+"""
+Shared helpers for the benchmark scripts in this folder.
+
+Benchmarks run against a throwaway test database created from the configured
+DATABASES setting (SQLite by default, PostgreSQL when DATABASE_URL is set), so
+they never touch real data. Run them from the project root, e.g.
+    python scripts/bench_routing.py --assignments 1000000
+"""
+import os
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
+import django
+
+sys.path.append(os.getcwd())
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'egovernance.settings')
+django.setup()
+
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+
+@contextmanager
+def bench_database():
+    """
+    Creates a scratch test database for the duration of the block.
+    """
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+@contextmanager
+def timed(label, results=None):
+    """
+    Prints (and optionally records) the wall time of the block in milliseconds.
+    """
+    start = time.perf_counter()
+    yield
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"{label:<50} {elapsed:10.2f} ms")
+    if results is not None:
+        results[label] = elapsed
+
+
+def seed_base(officers=10, departments=3, services_per_department=3):
+    """
+    Creates a citizen, officers, departments and services. Returns
+    (citizen, officers, services).
+    """
+    from core.models import User, Department, Service
+
+    citizen = User.objects.create_user(username='bench_citizen', password='x', role='citizen')
+    officer_users = [
+        User.objects.create_user(username=f'bench_officer_{i}', password='x', role='officer')
+        for i in range(officers)
+    ]
+    services = []
+    for d in range(departments):
+        dept = Department.objects.create(
+            department_name=f'Bench Department {d}', description='Benchmark', contact_email=f'd{d}@example.com'
+        )
+        for s in range(services_per_department):
+            services.append(Service.objects.create(
+                service_name=f'Bench Service {d}.{s}', department=dept,
+                description='Benchmark', required_documents='-', processing_days=7 + s * 7
+            ))
+    return citizen, officer_users, services
+
+
+def bulk_applications(citizen, services, count, batch_size=5000, statuses=None, days_back=365):
+    """
+    Inserts `count` applications with bulk_create (bypassing Application.save and
+    its signals) spread across `services`, `statuses` and the last `days_back` days.
+    Yields each inserted batch so callers can attach assignments.
+    """
+    from core.models import Application, normalize_application_number
+    from core.utils.sla_calendar import near_deadline_at
+
+    statuses = statuses or ['pending', 'under_review', 'approved', 'rejected']
+    applied_field = Application._meta.get_field('applied_date')
+    now = timezone.now()
+    created = 0
+    # applied_date is auto_now_add; switch that off so the seeded spread survives
+    applied_field.auto_now_add = False
+    try:
+        while created < count:
+            batch = []
+            for i in range(created, min(created + batch_size, count)):
+                service = services[i % len(services)]
+                applied = now - timedelta(minutes=(i * 37) % (days_back * 24 * 60))
+                number = f'BENCH-{uuid.uuid4().hex[:16].upper()}'
+                deadline = applied + timedelta(days=service.processing_days)
+                batch.append(Application(
+                    application_number=number,
+                    lookup_key=normalize_application_number(number),
+                    user=citizen,
+                    service=service,
+                    status=statuses[i % len(statuses)],
+                    priority='normal',
+                    applied_date=applied,
+                    sla_deadline=deadline,
+                    sla_near_at=near_deadline_at(service, deadline),
+                ))
+            created += len(batch)
+            yield Application.objects.bulk_create(batch)
+    finally:
+        applied_field.auto_now_add = True
@@ -0,0 +1,134 @@
+"""
+Benchmarks the hot Application query shapes with and without the composite
+indexes from migration 0021, printing EXPLAIN plans and median latencies.
+
+Runs on whichever database is configured: SQLite by default, PostgreSQL when
+DATABASE_URL (or DB_NAME) is set.
+
+    python scripts/bench_indexes.py --rows 2000000
+    DATABASE_URL=postgres://... python scripts/bench_indexes.py --rows 2000000 --explain
+"""
+import argparse
+import statistics
+import time
+from datetime import timedelta
+
+from bench_common import bench_database, bulk_applications, seed_base
+
+INDEXED = [
+    ('application', ['app_user_applied_idx', 'app_status_sla_idx', 'app_open_sla_idx',
+                     'app_service_applied_idx', 'app_applied_idx']),
+    ('officerassignment', ['assign_officer_date_idx']),
+]
+
+
+def query_shapes(citizen, officer, department):
+    """
+    The query shapes issued by citizen/officer/MIS dashboards and export_reports.
+    """
+    from django.utils import timezone
+    from core.models import Application, OfficerAssignment
+
+    now = timezone.now()
+    return {
+        'citizen.dashboard (user, -applied_date)': lambda: list(
+            Application.objects.filter(user=citizen).order_by('-applied_date')[:50]
+        ),
+        'officer.dashboard (officer, -assigned_date)': lambda: list(
+            OfficerAssignment.objects.filter(officer=officer).order_by('-assigned_date')[:50]
+        ),
+        'mis.dashboard delayed (open, sla_deadline)': lambda: Application.objects.filter(
+            status__in=['pending', 'under_review'], sla_deadline__lt=now
+        ).count(),
+        'status filter (status, sla_deadline)': lambda: Application.objects.filter(
+            status='pending', sla_deadline__lt=now + timedelta(days=2)
+        ).count(),
+        'export_reports (department, applied_date)': lambda: Application.objects.filter(
+            service__department=department, applied_date__gte=now - timedelta(days=30)
+        ).count(),
+        'admin recent (-applied_date)': lambda: list(
+            Application.objects.order_by('-applied_date')[:5]
+        ),
+    }
+
+
+def querysets_for_explain(citizen, officer, department):
+    from django.utils import timezone
+    from core.models import Application, OfficerAssignment
+
+    now = timezone.now()
+    return {
+        'citizen.dashboard': Application.objects.filter(user=citizen).order_by('-applied_date')[:50],
+        'officer.dashboard': OfficerAssignment.objects.filter(officer=officer).order_by('-assigned_date')[:50],
+        'mis delayed': Application.objects.filter(status__in=['pending', 'under_review'], sla_deadline__lt=now),
+        'export_reports': Application.objects.filter(service__department=department, applied_date__gte=now - timedelta(days=30)),
+    }
+
+
+def set_indexes(enabled):
+    from django.apps import apps
+    from django.db import connection
+
+    with connection.schema_editor() as editor:
+        for model_name, names in INDEXED:
+            model = apps.get_model('core', model_name)
+            for index in model._meta.indexes:
+                if index.name in names:
+                    if enabled:
+                        editor.add_index(model, index)
+                    else:
+                        editor.remove_index(model, index)
+    # Refresh planner statistics so the plans reflect the current index set
+    if connection.vendor in ('postgresql', 'sqlite'):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+
+def run(shapes, repeats):
+    results = {}
+    for label, func in shapes.items():
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - start) * 1000)
+        results[label] = statistics.median(samples)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=500000, help='Applications to seed')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--explain', action='store_true', help='Print EXPLAIN plans before and after')
+    args = parser.parse_args()
+
+    with bench_database() as connection:
+        from core.models import OfficerAssignment
+
+        citizen, officers, services = seed_base(officers=20)
+        for batch in bulk_applications(citizen, services, args.rows, batch_size=10000):
+            OfficerAssignment.objects.bulk_create([
+                OfficerAssignment(officer=officers[app.pk % len(officers)], application=app)
+                for app in batch
+            ])
+        shapes = query_shapes(citizen, officers[0], services[0].department)
+        plans = querysets_for_explain(citizen, officers[0], services[0].department)
+
+        print(f"Database: {connection.vendor}, {args.rows} applications")
+        report = {}
+        for label, enabled in (('before', False), ('after', True)):
+            set_indexes(enabled)
+            if args.explain:
+                print(f"\n--- EXPLAIN ({label}) ---")
+                for name, qs in plans.items():
+                    print(f"[{name}]\n{qs.explain()}\n")
+            report[label] = run(shapes, args.repeats)
+
+        print(f"\n{'query':<48} {'before (ms)':>12} {'after (ms)':>12}")
+        for name in shapes:
+            print(f"{name:<48} {report['before'][name]:>12.2f} {report['after'][name]:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmarks officer selection on submit as the assignment history grows.
+
+Compares the legacy per-submit `Count('assigned_tasks')` annotation with the
+counter-based `auto_assign_officer`. Latency of the counter path should stay
+flat while the legacy join grows with the number of assignments.
+
+    python scripts/bench_routing.py --assignments 1000000 --submits 50
+"""
+import argparse
+import statistics
+import time
+
+from bench_common import bench_database, bulk_applications, seed_base
+
+
+def legacy_pick():
+    from django.db.models import Count, Q
+    from core.models import User
+    return User.objects.filter(role='officer', is_active=True).annotate(
+        open_count=Count('assigned_tasks', filter=Q(assigned_tasks__application__status__in=['pending', 'under_review']))
+    ).order_by('open_count').first()
+
+
+def measure(func, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--assignments', type=int, default=200000, help='Largest assignment history to test')
+    parser.add_argument('--submits', type=int, default=30, help='Submits timed per stage')
+    parser.add_argument('--officers', type=int, default=50)
+    args = parser.parse_args()
+
+    stages = [n for n in (1000, 10000, 100000, 1000000, 10000000) if n < args.assignments] + [args.assignments]
+
+    with bench_database():
+        from core.models import Application, OfficerAssignment
+        from core.utils.intelligent_routing import auto_assign_officer, rebuild_workloads
+
+        citizen, officers, services = seed_base(officers=args.officers)
+        seeded = 0
+        print(f"{'assignments':>12} {'legacy pick (ms)':>18} {'counter submit (ms)':>20}")
+        for stage in stages:
+            for batch in bulk_applications(citizen, services, stage - seeded):
+                OfficerAssignment.objects.bulk_create([
+                    OfficerAssignment(officer=officers[app.pk % len(officers)], application=app)
+                    for app in batch
+                ])
+            seeded = stage
+            rebuild_workloads()
+
+            def submit():
+                app = Application.objects.create(user=citizen, service=services[0])
+                auto_assign_officer(app)
+
+            legacy = measure(legacy_pick, args.submits)
+            counter = measure(submit, args.submits)
+            print(f"{stage:>12} {legacy:>18.2f} {counter:>20.2f}")
+
+
+if __name__ == '__main__':
+    main()
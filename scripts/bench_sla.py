@@ -0,0 +1,117 @@
+"""
+Compares SLA classification in SQL (core.utils.sla annotations) with the
+per-row Python loops the dashboards used to run, on the three things views
+need: counts per bucket, the most urgent page, and one bucket's rows.
+
+Seeds a spread of deadlines from well overdue to weeks ahead, so every
+bucket is populated. Runs on whichever database is configured.
+
+    python scripts/bench_sla.py --rows 1000000
+"""
+import argparse
+import statistics
+import time
+from collections import Counter
+from datetime import timedelta
+
+from bench_common import bench_database, bulk_applications, seed_base
+
+PAGE = 50
+
+
+def spread_deadlines():
+    """
+    Rewrites sla_deadline to cycle from 10 days overdue to 20 days ahead,
+    each application turning near_deadline two days before its deadline.
+    """
+    from django.db.models.functions import Mod
+    from django.utils import timezone
+    from core.models import Application
+
+    now = timezone.now()
+    for offset in range(30):
+        deadline = now + timedelta(days=offset - 10, hours=offset % 7)
+        Application.objects.annotate(slot=Mod('id', 30)).filter(slot=offset).update(
+            sla_deadline=deadline, sla_near_at=deadline - timedelta(days=2),
+        )
+
+
+def python_shapes(now):
+    from core.models import Application
+    from core.utils import sla
+
+    def classified():
+        return [(sla.classify(app, now), app) for app in Application.objects.select_related('service').iterator(chunk_size=5000)]
+
+    def urgent_page():
+        rows = classified()
+        rows.sort(key=lambda pair: (sla.BUCKETS.index(pair[0]), pair[1].sla_deadline, pair[1].id))
+        return rows[:PAGE]
+
+    return {
+        'counts per bucket': lambda: Counter(bucket for bucket, _ in classified()),
+        f'top {PAGE} by urgency': urgent_page,
+        'near_deadline rows (count)': lambda: sum(1 for bucket, _ in classified() if bucket == 'near_deadline'),
+    }
+
+
+def sql_shapes(now):
+    from core.models import Application
+    from core.utils import application_stats, sla
+
+    annotated = lambda: sla.annotate_sla(Application.objects.all(), now)
+    return {
+        'counts per bucket': lambda: application_stats.summarize(now=now),
+        f'top {PAGE} by urgency': lambda: list(annotated().order_by('sla_rank', 'sla_deadline', 'id')[:PAGE]),
+        'near_deadline rows (count)': lambda: Application.objects.filter(sla.bucket_q('near_deadline', now)).count(),
+    }
+
+
+def run(shapes, repeats):
+    results = {}
+    for label, func in shapes.items():
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - start) * 1000)
+        results[label] = statistics.median(samples)
+    return results
+
+
+def check_agreement(now):
+    from core.models import Application
+    from core.utils import sla
+
+    sample = sla.annotate_sla(Application.objects.select_related('service'), now).order_by('?')[:2000]
+    mismatches = sum(1 for app in sample if sla.BUCKETS[app.sla_rank] != sla.classify(app, now))
+    print(f"SQL vs Python classification mismatches in 2000 sampled rows: {mismatches}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000, help='Applications to seed')
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    with bench_database() as connection:
+        from django.utils import timezone
+
+        citizen, _, services = seed_base(officers=1)
+        for _ in bulk_applications(citizen, services, args.rows, batch_size=10000):
+            pass
+        spread_deadlines()
+        now = timezone.now()
+
+        print(f"Database: {connection.vendor}, {args.rows} applications")
+        check_agreement(now)
+        python = run(python_shapes(now), args.repeats)
+        sql = run(sql_shapes(now), args.repeats)
+
+        print(f"\n{'shape':<32} {'python (ms)':>12} {'sql (ms)':>12} {'speedup':>9}")
+        for name in python:
+            print(f"{name:<32} {python[name]:>12.2f} {sql[name]:>12.2f} {python[name] / sql[name]:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()